@@ -0,0 +1,3 @@
+"""Benchmarks of fakepilot on the bundled test corpus."""
+
+# SPDX-License-Identifier: MIT
@@ -0,0 +1,56 @@
+"""
+Time the review aggregates on synthetic arrays of ten million reviews.
+
+Run with ``python -m benchmarks.bench_analytics``.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import numpy as np
+
+from fakepilot import analytics
+
+from .common import best_of, report
+
+NREVIEWS = 10_000_000
+NCOMPANIES = 100_000
+
+
+def synthetic_arrays(seed=0):
+    """Return random arrays of reviews."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2015-01-01T00:00:00", "s").astype(np.int64)
+    end = np.datetime64("2025-05-01T00:00:00", "s").astype(np.int64)
+
+    return analytics.ReviewArrays(
+        [f"company-{i}.com" for i in range(NCOMPANIES)],
+        company=np.sort(rng.integers(0, NCOMPANIES, NREVIEWS, dtype=np.int32)),
+        star_rating=rng.integers(1, 6, NREVIEWS, dtype=np.int8),
+        date=rng.integers(start, end, NREVIEWS).astype("datetime64[s]"),
+        is_verified=rng.random(NREVIEWS) < 0.4,
+        author_nreviews=rng.geometric(0.3, NREVIEWS).astype(np.int32),
+        rating_distribution=np.full((NCOMPANIES, 5), 20.0),
+    )
+
+
+def main():
+    """Run the benchmark."""
+    arrays = synthetic_arrays()
+    rows = [
+        (name, best_of(lambda func=func: func(arrays), repeat=3))
+        for name, func in (
+            ("rating_histogram", analytics.rating_histogram),
+            ("monthly_scores", analytics.monthly_scores),
+            ("verified_split", analytics.verified_split),
+            ("author_nreviews_distribution", analytics.author_nreviews_distribution),
+            ("check_rating_distribution", analytics.check_rating_distribution),
+        )
+    ]
+    report(
+        f"Aggregates of {NREVIEWS:,} reviews of {NCOMPANIES:,} companies (best of 3)",
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compare extracting the pages of the bundled corpus one by one, with a pool
+of threads and with a pool of processes.
+
+The threads only extract in parallel where the GIL is released, e.g. on
+free-threaded builds of CPython.
+
+Run with ``python -m benchmarks.bench_batch``.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import os
+import sys
+
+from fakepilot import extract_info
+from fakepilot.batch import BatchExtractor
+
+from .common import best_of, corpus_pages, report
+
+ROUNDS = 4
+
+
+def sequential(paths):
+    """Extract the pages one by one."""
+    for path in paths:
+        with open(path, encoding="utf-8") as file:
+            extract_info(file, with_reviews=True, nreviews=20)
+
+
+def main():
+    """Run the benchmark."""
+    workers = min(4, os.cpu_count() or 1)
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+
+    with corpus_pages() as paths:
+        paths = paths * ROUNDS
+        rows = [("sequential", best_of(lambda: sequential(paths), repeat=3))]
+
+        for mode, label in (("thread", "threads"), ("process", "processes")):
+            # The pool is started once, as a long batch would do
+            with BatchExtractor(mode, workers) as extractor:
+                list(extractor.map(paths[:workers]))
+                rows.append(
+                    (
+                        f"{workers} {label}",
+                        best_of(
+                            lambda: list(
+                                extractor.map(paths, with_reviews=True, nreviews=20)
+                            ),
+                            repeat=3,
+                        ),
+                    )
+                )
+
+    report(
+        f"Extraction of {len(paths)} pages (best of 3, GIL "
+        f"{'enabled' if gil else 'disabled'})",
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
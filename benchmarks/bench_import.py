@@ -0,0 +1,56 @@
+"""
+Measure the time to import fakepilot with ``python -X importtime``.
+
+Every measure is made in a new interpreter, so the modules imported by a
+previous measure aren't cached. Run with ``python -m benchmarks.bench_import``.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import subprocess
+import sys
+
+from .common import report
+
+STATEMENTS = (
+    ("import fakepilot", "fakepilot"),
+    ("import bs4", "bs4"),
+)
+
+
+def import_time(statement, module, repeat=10):
+    """
+    Return the minimum cumulative import time, in seconds, of ``module``
+    when ``statement`` is run in a new interpreter.
+    """
+
+    timings = []
+
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", statement],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+
+        for line in completed.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            fields = line.split("|")
+
+            if len(fields) == 3 and fields[2].strip() == module:
+                timings.append(int(fields[1]) / 1e6)
+
+    return min(timings)
+
+
+def main():
+    """Run the benchmark."""
+    rows = [
+        (statement, import_time(statement, module)) for statement, module in STATEMENTS
+    ]
+    report("Cumulative import time (best of 10)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Compare the time and the RSS of the workers extracting the bundled corpus
+several times, with and without a memory budget.
+
+The peak RSS of a worker, the highest increase of its RSS while it
+extracts a page and its RSS between pages are the figures used to size the
+workers.
+
+Run with ``python -m benchmarks.bench_memory``.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import time
+
+from fakepilot import memory
+from fakepilot.batch import BatchExtractor
+
+from .common import corpus_pages, report
+
+ROUNDS = 3
+WORKERS = 2
+
+
+def run(paths, memory_budget):
+    """
+    Return the time of the extraction of ``paths`` and the summary of the
+    RSS of the workers.
+    """
+
+    with BatchExtractor("process", WORKERS, memory_budget=memory_budget) as extractor:
+        start = time.perf_counter()
+        reports = [
+            page_report
+            for _, page_report in extractor.map(
+                paths, with_reviews=True, nreviews=20, with_memory=True
+            )
+        ]
+        seconds = time.perf_counter() - start
+
+    return seconds, memory.summarize(reports)
+
+
+def megabytes(value):
+    """Return a number of bytes in megabytes, as text."""
+    return "n/a" if value is None else f"{value / 2**20:.1f} MB"
+
+
+def main():
+    """Run the benchmark."""
+    with corpus_pages() as paths:
+        paths = paths * ROUNDS
+        runs = [
+            ("unbounded", run(paths, None)),
+            ("budget of 32 MB", run(paths, 32 * 2**20)),
+        ]
+
+    report(
+        f"Extraction of {len(paths)} pages by {WORKERS} processes",
+        [(label, seconds) for label, (seconds, _) in runs],
+    )
+
+    for label, (_, summary) in runs:
+        print(
+            f"  {label}: peak {megabytes(summary['peak_rss'])}, "
+            f"per page {megabytes(summary['page_rss'])}, "
+            f"steady {megabytes(summary['steady_rss'])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compare the lookups made by the extractors through a :class:`PageIndex`
+against BeautifulSoup's regular expression searches over the whole tree.
+
+Run with ``python -m benchmarks.bench_page_index``.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import re
+
+from fakepilot import xray
+
+from .common import best_of, corpus_pages, read_pages, report
+
+# The lookups of the extractors, split as they were made before the index:
+# the first match (``find``) or every match (``find_all``) of a page
+COMPANY_CLASSES_FIRST = (
+    "link_internal",
+    "title_displayName",
+    "styles_businessInfoSideBar",
+    "styles_reviewListContainer",
+)
+COMPANY_CLASSES_ALL = (
+    "styles_itemRow",
+    "styles_contactInfoElement",
+    "rating-distribution-row_barValue",
+)
+COMPANY_ATTRS_FIRST = (
+    "data-reviews-count-typography",
+    "data-rating-typography",
+)
+COMPANY_ATTRS_ALL = ("data-business-unit-info-category-typography",)
+REVIEW_ATTRS = (
+    "data-consumer-name-typography",
+    "data-consumer-profile-link",
+    "data-review-label-tooltip-trigger-typography",
+    "data-service-review-rating",
+    "data-service-review-date-time-ago",
+    "data-service-review-title-typography",
+    "data-service-review-text-typography",
+    "data-consumer-reviews-count",
+    "data-consumer-country-typography",
+    "data-service-review-date-of-experience-typography",
+)
+CARD_ATTR = "data-service-review-card-paper"
+
+
+def regex_lookups(page):
+    """Make the extractors' lookups with BeautifulSoup searches."""
+    for prefix in COMPANY_CLASSES_FIRST:
+        page.find(class_=re.compile(prefix))
+    for prefix in COMPANY_CLASSES_ALL:
+        page.find_all(class_=re.compile(prefix))
+    for attr in COMPANY_ATTRS_FIRST:
+        page.find(xray.has_attr(attr))
+    for attr in COMPANY_ATTRS_ALL:
+        page.find_all(xray.has_attr(attr))
+    for card in page.find_all(xray.has_attr(CARD_ATTR)):
+        for attr in REVIEW_ATTRS:
+            card.find(xray.has_attr(attr))
+
+
+def index_lookups(page):
+    """Build the page's index and make the extractors' lookups with it."""
+    index = xray.PageIndex(page)
+
+    for prefix in COMPANY_CLASSES_FIRST:
+        index.find(page, xray.Lookup(class_=prefix))
+    for prefix in COMPANY_CLASSES_ALL:
+        index.find_all(page, xray.Lookup(class_=prefix))
+    for attr in COMPANY_ATTRS_FIRST:
+        index.find(page, xray.Lookup(data_attr=attr))
+    for attr in COMPANY_ATTRS_ALL:
+        index.find_all(page, xray.Lookup(data_attr=attr))
+    for card in index.find_all(page, xray.Lookup(data_attr=CARD_ATTR)):
+        for attr in REVIEW_ATTRS:
+            index.find(card, xray.Lookup(data_attr=attr))
+
+
+def main():
+    """Run the benchmark."""
+    with corpus_pages() as paths:
+        pages = [xray.parse_page(page) for page in read_pages(paths)]
+
+    rows = [
+        ("regex searches", best_of(lambda: [regex_lookups(p) for p in pages])),
+        ("page index", best_of(lambda: [index_lookups(p) for p in pages])),
+    ]
+    report(f"Extractor lookups over {len(pages)} pages (best of 5)", rows)
+
+
+if __name__ == "__main__":
+    main()
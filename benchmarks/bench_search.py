@@ -0,0 +1,77 @@
+"""
+Time the queries of the inverted index of reviews on synthetic reviews.
+
+Run with ``python -m benchmarks.bench_search``.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import itertools
+import random
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from fakepilot.search import ReviewIndex, ReviewIndexWriter
+
+from .common import best_of, report
+
+NREVIEWS = 200_000
+VOCABULARY = 20_000
+QUERIES = (
+    ("one frequent term", {"query": "w1"}),
+    ("two terms", {"query": "w1 w2"}),
+    ("rare term", {"query": "w19999"}),
+    ("terms and filters", {"query": "w1 w5", "star_rating": [1, 2], "country": "ES"}),
+    (
+        "date range",
+        {"date_from": datetime(2024, 1, 1), "date_to": datetime(2024, 2, 1)},
+    ),
+)
+
+
+def synthetic_reviews(seed=0):
+    """Yield random reviews with Zipf-distributed words."""
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(VOCABULARY)]
+    cum_weights = list(
+        itertools.accumulate(1 / (rank + 1) for rank in range(VOCABULARY))
+    )
+    start = datetime(2020, 1, 1)
+
+    for i in range(NREVIEWS):
+        yield (
+            f"company-{i % 1000}.com",
+            {
+                "author_id": str(i),
+                "title": " ".join(rng.choices(words, cum_weights=cum_weights, k=4)),
+                "content": " ".join(rng.choices(words, cum_weights=cum_weights, k=40)),
+                "star_rating": float(rng.randint(1, 5)),
+                "country": rng.choice(("ES", "DK", "FR", "NO", "GB")),
+                "date": start + timedelta(minutes=rng.randrange(5 * 365 * 24 * 60)),
+            },
+        )
+
+
+def main():
+    """Run the benchmark."""
+    index_dir = tempfile.mkdtemp(prefix="fakepilot-bench-")
+
+    try:
+        with ReviewIndexWriter(index_dir, segment_size=50_000) as writer:
+            for company, review in synthetic_reviews():
+                writer.add_review(company, review)
+
+        index = ReviewIndex(index_dir)
+        rows = [
+            (label, best_of(lambda kwargs=kwargs: index.count(**kwargs)))
+            for label, kwargs in QUERIES
+        ]
+    finally:
+        shutil.rmtree(index_dir)
+
+    report(f"Counting queries over {NREVIEWS:,} reviews (best of 5)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Compare re-extracting a single review by parsing its whole page against
+reading and parsing only its card through the page's sidecar index.
+
+Run with ``python -m benchmarks.bench_sidecar``.
+"""
+
+# SPDX-License-Identifier: MIT
+
+from fakepilot import ExtractOptions, extract_info
+from fakepilot.sidecar import load_sidecar, read_review, sidecar_path
+
+from .common import best_of, corpus_pages, report
+
+
+def full_page(path, position):
+    """Extract the review at ``position`` by parsing the whole page."""
+    with open(path, "rb") as file:
+        return extract_info(file, with_reviews=True, nreviews=position + 1)["reviews"][
+            position
+        ]
+
+
+def main():
+    """Run the benchmark."""
+    with corpus_pages() as paths:
+        sidecars = []
+
+        for path in paths:
+            with open(path, "rb") as file:
+                extract_info(file, options=ExtractOptions(sidecar=sidecar_path(path)))
+            sidecars.append(load_sidecar(sidecar_path(path)))
+
+        # The last review of every page, the worst case of the full parse
+        lookups = [
+            (path, len(sidecar["cards"]) - 1, sidecar)
+            for path, sidecar in zip(paths, sidecars)
+            if sidecar["cards"]
+        ]
+
+        rows = [
+            (
+                "parse the page",
+                best_of(lambda: [full_page(p, pos) for p, pos, _ in lookups]),
+            ),
+            (
+                "parse the card",
+                best_of(
+                    lambda: [read_review(p, pos, sidecar=s) for p, pos, s in lookups]
+                ),
+            ),
+        ]
+
+    report(f"Re-extraction of one review of {len(lookups)} pages (best of 5)", rows)
+
+
+if __name__ == "__main__":
+    main()
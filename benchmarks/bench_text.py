@@ -0,0 +1,71 @@
+"""
+Compare joining the strings of synthetic reviews split in thousands of text
+nodes by repeated concatenation, as ``xray.concat_strings`` did, against
+``xray.node_text``.
+
+Run with ``python -m benchmarks.bench_text``.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import operator
+from functools import reduce
+
+from fakepilot import xray
+
+from .common import best_of, report
+
+SIZES = (1000, 5000, 20000)
+
+
+def review_page(nlines):
+    """Return a review card whose content has ``nlines`` lines."""
+    lines = "".join(
+        f"Line {n} of the review, quite long.<br/>\n" for n in range(nlines)
+    )
+    return (
+        '<article data-service-review-card-paper="true">'
+        f'<p data-service-review-text-typography="true">{lines}</p>'
+        "</article>"
+    )
+
+
+def concatenated(node):
+    """Return the content of a review by repeated concatenation."""
+    return reduce(operator.add, node.strings).replace("\n", "").strip()
+
+
+def timings(nlines):
+    """Return the timings of the content of a review with ``nlines`` lines."""
+    page = xray.parse_page(review_page(nlines))
+    index = xray.PageIndex(page)
+    node = page.p
+    nstrings = len(list(node.strings))
+
+    assert concatenated(node) == xray.extract_review_content(page, index)
+
+    return [
+        (f"{nstrings} strings, concatenation", best_of(lambda: concatenated(node))),
+        (
+            f"{nstrings} strings, node_text",
+            best_of(lambda: xray.extract_review_content(page, index)),
+        ),
+        (
+            f"{nstrings} strings, node_text with line breaks",
+            best_of(lambda: xray.extract_review_content(page, index, line_breaks=True)),
+        ),
+    ]
+
+
+def main():
+    """Run the benchmark."""
+    rows = []
+
+    for nlines in SIZES:
+        rows.extend(timings(nlines))
+
+    report("Content of a review split in many strings (best of 5)", rows)
+
+
+if __name__ == "__main__":
+    main()
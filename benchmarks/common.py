@@ -0,0 +1,70 @@
+"""
+Helpers shared by the benchmarks.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import contextlib
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+CORPUS_ZIP = BASE_DIR / "tests" / "data" / "text_files.zip"
+
+
+@contextlib.contextmanager
+def corpus_pages():
+    """
+    Extract the bundled corpus to a temporary directory and yield the
+    sorted list of paths of its pages.
+    """
+
+    temp_dir = tempfile.mkdtemp(prefix="fakepilot-bench-")
+
+    try:
+        shutil.unpack_archive(str(CORPUS_ZIP), temp_dir)
+        yield sorted(
+            os.path.join(temp_dir, filename) for filename in os.listdir(temp_dir)
+        )
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def read_pages(paths):
+    """Return the content of the pages in ``paths``."""
+    pages = []
+
+    for path in paths:
+        with open(path, encoding="utf-8") as file:
+            pages.append(file.read())
+
+    return pages
+
+
+def best_of(func, repeat=5):
+    """Return the minimum wall-clock time, in seconds, of ``repeat`` calls."""
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def report(title, rows):
+    """
+    Print a table of timings.
+
+    :param rows: Pairs of a label and a time in seconds.
+    """
+
+    print(title)
+    width = max(len(label) for label, _ in rows)
+
+    for label, seconds in rows:
+        print(f"  {label:<{width}}  {seconds * 1000:10.2f} ms")
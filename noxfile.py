@@ -25,6 +25,7 @@ ARTIFACT_PATHS = (
     NOXFILE_PATH / "src" / "__pycache__",
     NOXFILE_PATH / "src" / PACKAGE_NAME / "__pycache__",
     NOXFILE_PATH / "tests" / "__pycache__",
+    NOXFILE_PATH / "benchmarks" / "__pycache__",
 )
 
 
@@ -74,9 +75,11 @@ def tests_with_coverage(session, bs4):
     Run the package's unit tests, with coverage report.
     """
 
+    # The analytics extra is installed so its modules are tested, the session
+    # with lxml tests the package without it
     session.install(
         f"beautifulsoup4~={bs4}",
-        ".",
+        ".[analytics]",
         "coverage",
         'tomli; python_full_version < "3.11.0a7"',
     )
@@ -135,6 +138,44 @@ def tests_with_lxml(session):
     clean()
 
 
+@nox.session(python=["3.13t"], tags=["tests"])
+def tests_free_threaded(session):
+    """
+    Run the package's unit tests on the free-threaded build of CPython, where the
+    thread workers of fakepilot.batch parse the pages in parallel.
+    """
+
+    session.install("beautifulsoup4~=4.13", ".")
+    session.run(
+        os.path.join(session.bin, "python"),
+        "-Wonce::DeprecationWarning",
+        "-X",
+        "gil=0",
+        "-m",
+        "unittest",
+        "discover",
+    )
+    clean()
+
+
+# Benchmarks.
+# -----------------------------------------------------------------------------------
+
+
+@nox.session(python=["3.12"], tags=["benchmarks"])
+def benchmarks(session):
+    """
+    Run the benchmarks on the bundled test corpus.
+    """
+
+    session.install(".[lxml,analytics]")
+    for path in sorted(NOXFILE_PATH.joinpath("benchmarks").glob("bench_*.py")):
+        session.run(
+            os.path.join(session.bin, "python"), "-m", f"benchmarks.{path.stem}"
+        )
+    clean()
+
+
 # Tasks which test the package's documentation.
 # -----------------------------------------------------------------------------------
 
@@ -2,47 +2,136 @@
 
 # SPDX-License-Identifier: MIT
 
-import re
+import warnings
+from typing import TYPE_CHECKING, NamedTuple, Optional, Union
 
 from . import xray
 
+if TYPE_CHECKING:
+    # They're imported on first use, so that importing fakepilot stays cheap
+    from .selector_cache import SelectorCache
+    from .spec import ExtractionPlan
 
-def get_reviews(company_page, nreviews):
+
+class ExtractOptions(NamedTuple):
+    """
+    Options of the extraction of a page by :func:`extract_info`.
+
+    :param selector_cache: Cache of the selectors that matched on pages with
+           the same structure. It's looked up with the page's fingerprint and
+           updated with the selectors found on the page.
+    :type selector_cache: :class:`fakepilot.selector_cache.SelectorCache`,
+           optional
+    :param spec: Spec of the extracted fields, as an extraction plan, a spec
+           or the path of a JSON spec, which is loaded again when it's
+           modified. By default, the built-in spec. See :mod:`fakepilot.spec`.
+    :type spec: :class:`fakepilot.spec.ExtractionPlan` or dict(str, ) or str,
+           optional
+    :param sidecar: Path where the byte ranges of the page's review cards are
+           written. See :mod:`fakepilot.sidecar`. The ranges are offsets in
+           the page's bytes, so the file should be opened in binary mode.
+    :type sidecar: str, optional
+    :param dispose: Whether the parsed page is decomposed once its
+           information is extracted, so its memory is freed at once.
+    :type dispose: bool, optional
+    :param sample: Sampling mode of the reviews. ``'uniform'`` selects
+           `nreviews` reviews of the page at random, and ``'stratified'``
+           selects `nreviews` reviews of every star rating at random. See
+           :mod:`fakepilot.sampling`.
+    :type sample: str, optional
+    :param seed: Seed of the random sampling.
+    :type seed: int, optional
+    """
+
+    selector_cache: Optional["SelectorCache"] = None
+    spec: Union["ExtractionPlan", dict, str, None] = None
+    sidecar: Optional[str] = None
+    dispose: bool = False
+    sample: Optional[str] = None
+    seed: Optional[int] = None
+
+
+def _options(options, deprecated, func_name):
+    """
+    Return ``options``, or the default options, with the ``deprecated``
+    keyword arguments of ``func_name``, the options passed before
+    :class:`ExtractOptions`.
+    """
+
+    if options is None:
+        options = ExtractOptions()
+
+    if deprecated:
+        unknown = set(deprecated) - set(ExtractOptions._fields)
+
+        if unknown:
+            raise TypeError(
+                f"{func_name}() got unexpected keyword arguments {sorted(unknown)}."
+            )
+
+        warnings.warn(
+            f"The keyword arguments {sorted(deprecated)} of {func_name}() are "
+            "deprecated, pass them in options=ExtractOptions(...).",
+            DeprecationWarning,
+            stacklevel=3,
+        )
+        options = options._replace(**deprecated)
+
+    return options
+
+
+def get_reviews(
+    company_page, nreviews, index=None, selectors=None, options=None, **deprecated
+):
     """
     Get the reviews' data included in a company's Trustpilot page.
 
     The number of extracted reviews is the minimum of `nreviews` and
-    the number of reviews in the company's page.
+    the number of reviews in the company's page. By default, they are the
+    first reviews of the page.
 
     :param company_page: HTML company's page where the reviews are extracted
            from.
     :type company_page: :class:`bs4.BeautifulSoup`
     :param nreviews: Number of reviews to be extracted.
     :type nreviews: int
+    :param index: Index of ``company_page``. It is built if it isn't given.
+    :type index: :class:`fakepilot.xray.PageIndex`, optional
+    :param selectors: Selectors that matched on pages with the same structure.
+           See :func:`fakepilot.xray.select_all`.
+    :type selectors: dict(str, str), optional
+    :param options: Options of the extraction. Its ``spec``, ``sample`` and
+           ``seed`` are used. See :class:`ExtractOptions`.
+    :type options: :class:`ExtractOptions`, optional
+    :param deprecated: Fields of :class:`ExtractOptions`, which replace
+           those of ``options``. Deprecated, pass them in ``options``.
     :return: Reviews of a company.
     :rtype: list(dict(str,))
     """
 
-    def has_attr_data_service_review_card_paper(tag):
-        """
-        Check if ``tag`` has the attribute ``'data-service-review-card-paper'``.
-        """
-        return tag.has_attr("data-service-review-card-paper")
+    from .spec import get_plan  # pylint: disable=import-outside-toplevel
+
+    options = _options(options, deprecated, "get_reviews")
+    index = xray.get_index(company_page, index)
+    plan = get_plan(options.spec)
+    sample = options.sample
 
-    reviews_section = company_page.find(class_=re.compile("styles_reviewListContainer"))
+    if sample is not None:
+        from .sampling import SAMPLERS  # pylint: disable=import-outside-toplevel
 
-    # For 2023 pages
-    if not reviews_section:
-        reviews_section = company_page
+        if sample not in SAMPLERS:
+            raise ValueError(f"Unknown sampling mode: {sample!r}.")
 
-    review_tags = reviews_section.find_all(
-        has_attr_data_service_review_card_paper, limit=nreviews
-    )
-    reviews = [xray.extract_review_info(tag) for tag in review_tags]
+        sampler = SAMPLERS[sample](nreviews, options.seed, plan)
+        sampler.add_page(company_page, index, selectors)
+        return [review for _source, review in sampler.sample()]
+
+    review_tags = plan.review_cards(company_page, index, selectors, nreviews)
+    reviews = [plan.extract_review(tag, index) for tag in review_tags]
     return reviews
 
 
-def extract_info(file, with_reviews=False, nreviews=5):
+def extract_info(file, with_reviews=False, nreviews=5, options=None, **deprecated):
     """
     Return the information of a company page.
 
@@ -54,6 +143,11 @@ def extract_info(file, with_reviews=False, nreviews=5):
     :param nreviews: Number of reviews to be extracted. Ignored if `with_reviews`
            is ``False``.
     :type nreviews: int, optional
+    :param options: Options of the extraction, e.g. its spec. By default,
+           the defaults of :class:`ExtractOptions`.
+    :type options: :class:`ExtractOptions`, optional
+    :param deprecated: Fields of :class:`ExtractOptions`, which replace
+           those of ``options``. Deprecated, pass them in ``options``.
     :return: Company's information: name (``'name'``), URL (``'url'``),
             number of reviews in Trustpilot (``'nreviews'``),
             score (``'address'``) and if the company's profile is claimed
@@ -74,10 +168,59 @@ def extract_info(file, with_reviews=False, nreviews=5):
     :rtype: dict(str, )
     """
 
+    options = _options(options, deprecated, "extract_info")
+    selector_cache = options.selector_cache
+
+    if options.sidecar is not None:
+        data = file if isinstance(file, (str, bytes)) else file.read()
+        encoding = None
+
+        if isinstance(data, str):
+            # A text page is parsed as text, and its ranges are computed in
+            # the encoding it was read with
+            encoding = getattr(file, "encoding", None) or "utf-8"
+            file, data = data, data.encode(encoding)
+        else:
+            file = data
+
+    from .spec import get_plan  # pylint: disable=import-outside-toplevel
+
+    plan = get_plan(options.spec)
     company_page = xray.parse_page(file)
-    company = xray.extract_company_info(company_page)
 
-    if with_reviews:
-        company["reviews"] = get_reviews(company_page, nreviews)
+    try:
+        index = xray.PageIndex(company_page)
+        selectors = None
+
+        if selector_cache is not None:
+            fingerprint = selector_cache.fingerprint(index)
+            selectors = selector_cache.get(fingerprint)
+
+        company = plan.extract_company(company_page, index, selectors)
+
+        if with_reviews:
+            # The spec of a file is loaded once per page
+            company["reviews"] = get_reviews(
+                company_page, nreviews, index, selectors, options._replace(spec=plan)
+            )
+
+        if selector_cache is not None:
+            selector_cache.update(fingerprint, selectors)
+
+        if options.sidecar is not None:
+            from .sidecar import write_sidecar  # pylint: disable=import-outside-toplevel
+
+            write_sidecar(
+                options.sidecar,
+                data,
+                index,
+                plan.review_cards(company_page, index, selectors),
+                encoding=encoding,
+            )
+    finally:
+        if options.dispose:
+            # The tree's elements reference each other, so without breaking
+            # the cycles it would be freed only by the garbage collector
+            company_page.decompose()
 
     return company
@@ -0,0 +1,35 @@
+"""
+Imports of the optional dependencies, which fail with the extra that
+installs them.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import importlib
+
+
+def require(module_name, extra, feature):
+    """
+    Import and return an optional dependency.
+
+    :param module_name: Name of the dependency's module, e.g. ``'numpy'``.
+    :type module_name: str
+    :param extra: Extra of fakepilot that installs it.
+    :type extra: str
+    :param feature: Name of what requires it, used in the error message.
+    :type feature: str
+    :raises ImportError: If it isn't installed.
+    """
+
+    try:
+        return importlib.import_module(module_name)
+    except ImportError as exc:
+        raise ImportError(
+            f"{feature} requires {module_name}. "
+            f"Install it with 'pip install fakepilot[{extra}]'."
+        ) from exc
+
+
+def require_numpy(feature):
+    """Import and return NumPy. See :func:`require`."""
+    return require("numpy", "analytics", feature)
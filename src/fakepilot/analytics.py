@@ -0,0 +1,310 @@
+"""
+Aggregates of the extracted reviews of many companies, computed with NumPy.
+
+The reviews returned by :func:`fakepilot.extract_info` are stored in
+columnar arrays, :class:`ReviewArrays`, with one element per review and the
+index of its company. Every aggregate is computed for all the companies at
+once with vectorized operations, so they scale to tens of millions of
+reviews.
+
+It requires the ``analytics`` extra, which installs NumPy, as do
+:mod:`fakepilot.dedup`, :mod:`fakepilot.authors` and :mod:`fakepilot.search`.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import datetime
+from array import array
+
+from ._optional import require_numpy
+
+np = require_numpy(__name__)
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_SECOND = datetime.timedelta(seconds=1)
+
+#: Lower edges of the default bins of the authors' number of reviews.
+AUTHOR_NREVIEWS_BINS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class ReviewArrays:
+    """
+    Columnar arrays of the reviews of several companies.
+
+    :ivar companies: Key of each company, by default its URL.
+    :ivar company: Index in ``companies`` of the company of each review.
+    :ivar star_rating: Rating, from 1 to 5, of each review.
+    :ivar date: Publication date of each review, as ``datetime64[s]``.
+    :ivar is_verified: Whether each review is verified.
+    :ivar author_nreviews: Number of reviews made by the author of each
+          review.
+    :ivar rating_distribution: Percentage of reviews of each rating stated by
+          each company's page, with shape ``(len(companies), 5)``. It's NaN
+          when the page doesn't include it.
+    """
+
+    # The arrays are keyword-only, so they can't be passed in the wrong order
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        companies,
+        *,
+        company,
+        star_rating,
+        date,
+        is_verified,
+        author_nreviews,
+        rating_distribution,
+    ):
+        self.companies = list(companies)
+        self.company = company
+        self.star_rating = star_rating
+        self.date = date
+        self.is_verified = is_verified
+        self.author_nreviews = author_nreviews
+        self.rating_distribution = rating_distribution
+
+    def __len__(self):
+        return len(self.company)
+
+    @property
+    def ncompanies(self):
+        """Number of companies."""
+        return len(self.companies)
+
+    @classmethod
+    def from_companies(cls, companies, key="url"):
+        """
+        Build the arrays of the reviews of ``companies``.
+
+        :param companies: Companies' information returned by
+               :func:`fakepilot.extract_info` with their reviews.
+        :type companies: iterable(dict(str, ))
+        :param key: Field of a company used as its key.
+        :type key: str, optional
+        :rtype: :class:`ReviewArrays`
+        """
+
+        builder = ReviewArraysBuilder(key)
+
+        for company in companies:
+            builder.add(company)
+
+        return builder.build()
+
+    @classmethod
+    def concatenate(cls, parts):
+        """
+        Join the arrays built from disjoint sets of companies, e.g. one per
+        shard of a corpus.
+
+        :type parts: iterable(:class:`ReviewArrays`)
+        :rtype: :class:`ReviewArrays`
+        """
+
+        parts = list(parts)
+
+        if not parts:
+            return ReviewArraysBuilder().build()
+
+        offsets = np.cumsum([0] + [part.ncompanies for part in parts[:-1]])
+
+        return cls(
+            [key for part in parts for key in part.companies],
+            company=np.concatenate(
+                [part.company + offset for part, offset in zip(parts, offsets)]
+            ).astype(np.int32),
+            star_rating=np.concatenate([part.star_rating for part in parts]),
+            date=np.concatenate([part.date for part in parts]),
+            is_verified=np.concatenate([part.is_verified for part in parts]),
+            author_nreviews=np.concatenate([part.author_nreviews for part in parts]),
+            rating_distribution=np.concatenate(
+                [part.rating_distribution for part in parts]
+            ).reshape(-1, 5),
+        )
+
+
+class ReviewArraysBuilder:
+    """
+    Incremental builder of :class:`ReviewArrays`.
+
+    The reviews are appended to compact typed arrays, so the memory used
+    while the companies are added is a few bytes per review.
+
+    :param key: Field of a company used as its key.
+    :type key: str, optional
+    """
+
+    def __init__(self, key="url"):
+        self.key = key
+        self._companies = []
+        # The columns of the reviews, and the rating distributions of the
+        # companies, flattened
+        self._columns = {
+            "company": array("i"),
+            "star_rating": array("b"),
+            "date": array("q"),
+            "is_verified": array("b"),
+            "author_nreviews": array("i"),
+            "rating_distribution": array("d"),
+        }
+
+    def add(self, company):
+        """Add a company and its reviews."""
+        columns = self._columns
+        company_index = len(self._companies)
+        self._companies.append(company[self.key])
+        distribution = company.get("rating_distribution") or {}
+
+        for nstars in range(1, 6):
+            percentage = distribution.get(nstars)
+            columns["rating_distribution"].append(
+                float("nan") if percentage is None else percentage
+            )
+
+        for review in company.get("reviews", ()):
+            columns["company"].append(company_index)
+            columns["star_rating"].append(int(review["star_rating"]))
+            columns["date"].append((review["date"] - _EPOCH) // _SECOND)
+            columns["is_verified"].append(bool(review["is_verified"]))
+            columns["author_nreviews"].append(review["nreviews"])
+
+    def build(self):
+        """Return the arrays of the added companies."""
+        columns = {
+            name: np.frombuffer(column, dtype=column.typecode)
+            for name, column in self._columns.items()
+        }
+
+        return ReviewArrays(
+            self._companies,
+            company=columns["company"].copy(),
+            star_rating=columns["star_rating"].copy(),
+            date=columns["date"].astype("datetime64[s]"),
+            is_verified=columns["is_verified"].astype(bool),
+            author_nreviews=columns["author_nreviews"].copy(),
+            rating_distribution=columns["rating_distribution"].reshape(-1, 5).copy(),
+        )
+
+
+def _grouped_count(arrays, groups, ngroups, weights=None):
+    """
+    Return a ``(ncompanies, ngroups)`` matrix with the number of reviews, or
+    the sum of ``weights``, of each company in each group.
+    """
+
+    flat = arrays.company.astype(np.int64) * ngroups + groups
+    counts = np.bincount(flat, weights=weights, minlength=arrays.ncompanies * ngroups)
+    return counts.reshape(arrays.ncompanies, ngroups)
+
+
+def rating_histogram(arrays):
+    """
+    Return the number of reviews of each rating of each company.
+
+    :type arrays: :class:`ReviewArrays`
+    :return: Matrix with shape ``(ncompanies, 5)``. The column ``i`` has the
+             number of reviews with ``i + 1`` stars.
+    :rtype: :class:`numpy.ndarray`
+    """
+
+    return _grouped_count(arrays, arrays.star_rating.astype(np.int64) - 1, 5)
+
+
+def monthly_scores(arrays):
+    """
+    Return the mean rating of the reviews published each month by each
+    company.
+
+    :type arrays: :class:`ReviewArrays`
+    :return: The months, as ``datetime64[M]``, the matrix of the mean
+             ratings with shape ``(ncompanies, nmonths)``, NaN if a company
+             has no reviews in a month, and the matrix of the number of
+             reviews.
+    :rtype: tuple(:class:`numpy.ndarray`, :class:`numpy.ndarray`,
+            :class:`numpy.ndarray`)
+    """
+
+    if len(arrays) == 0:
+        empty = np.zeros((arrays.ncompanies, 0))
+        return np.array([], dtype="datetime64[M]"), empty, empty.astype(np.int64)
+
+    months = arrays.date.astype("datetime64[M]")
+    first = months.min()
+    month_index = (months - first).astype(np.int64)
+    nmonths = int(month_index.max()) + 1
+
+    counts = _grouped_count(arrays, month_index, nmonths).astype(np.int64)
+    sums = _grouped_count(arrays, month_index, nmonths, weights=arrays.star_rating)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+
+    return first + np.arange(nmonths), means, counts
+
+
+def verified_split(arrays):
+    """
+    Return the number of unverified and verified reviews of each company
+    and their mean ratings.
+
+    :type arrays: :class:`ReviewArrays`
+    :return: The matrix of the number of reviews and the matrix of the mean
+             ratings, NaN if there are no reviews, both with shape
+             ``(ncompanies, 2)``. The first column is for the unverified
+             reviews and the second for the verified ones.
+    :rtype: tuple(:class:`numpy.ndarray`, :class:`numpy.ndarray`)
+    """
+
+    groups = arrays.is_verified.astype(np.int64)
+    counts = _grouped_count(arrays, groups, 2).astype(np.int64)
+    sums = _grouped_count(arrays, groups, 2, weights=arrays.star_rating)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+
+    return counts, means
+
+
+def author_nreviews_distribution(arrays, bins=AUTHOR_NREVIEWS_BINS):
+    """
+    Return the distribution of the number of reviews made by the authors of
+    the reviews of each company.
+
+    Authors with few reviews are a usual sign of fake reviews.
+
+    :type arrays: :class:`ReviewArrays`
+    :param bins: Increasing lower edges of the bins. The last bin has no
+           upper edge. The reviews whose author has less reviews than the
+           first edge are counted in the first bin.
+    :type bins: sequence(int), optional
+    :return: Matrix with shape ``(ncompanies, len(bins))`` with the number
+             of reviews in each bin.
+    :rtype: :class:`numpy.ndarray`
+    """
+
+    edges = np.asarray(bins)
+    groups = np.clip(
+        np.searchsorted(edges, arrays.author_nreviews, "right") - 1, 0, None
+    )
+    return _grouped_count(arrays, groups, len(edges))
+
+
+def check_rating_distribution(arrays):
+    """
+    Compare the rating distribution stated by each company's page with the
+    one of its extracted reviews.
+
+    :type arrays: :class:`ReviewArrays`
+    :return: Matrix with shape ``(ncompanies, 5)`` of the observed minus the
+             stated percentage of reviews of each rating. It's NaN if the
+             page doesn't state the distribution or there are no reviews.
+    :rtype: :class:`numpy.ndarray`
+    """
+
+    histogram = rating_histogram(arrays)
+    totals = histogram.sum(axis=1, keepdims=True)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        observed = 100 * histogram / totals
+
+    return observed - arrays.rating_distribution
@@ -0,0 +1,347 @@
+"""
+Index of the reviews' authors across companies.
+
+The author id returned by :func:`fakepilot.xray.extract_review_author_id`
+is the same for all the reviews of an author, so it links the reviews
+of different companies. Groups of authors that review the same companies,
+or many reviews of a company in a short time, are usual signs of
+reviewer rings.
+
+The reviews are appended to compact typed arrays of author, company,
+rating and date codes. On the first query after an update, the new
+reviews are sorted with NumPy into a run. The runs are merged as in a
+log-structured merge tree: a run is merged with the previous one while
+the previous one isn't larger, so there are at most a logarithmic number
+of runs and every review is merged a logarithmic number of times. A query
+searches every run.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import datetime
+from array import array
+
+from ._optional import require_numpy
+
+np = require_numpy(__name__)
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_SECOND = datetime.timedelta(seconds=1)
+
+# The sort keys pack a company code and an author code, or a company code
+# and a date, in 63 bits. The dates are between the years 1697 and 2242.
+_AUTHOR_BITS = 31
+_DATE_BITS = 34
+_DATE_OFFSET = 2 ** (_DATE_BITS - 1)
+
+# Columns of the reviews, and their type codes while they're added
+_COLUMNS = {"author": "i", "company": "i", "rating": "b", "date": "q"}
+
+# Sorted views of the reviews, and the function that returns their sort key
+_ORDERS = {
+    "by_author": lambda company, author, date: (company << _AUTHOR_BITS) | author,
+    "by_date": lambda company, author, date: (
+        (company << _DATE_BITS) | (date + _DATE_OFFSET)
+    ),
+    "of_author": lambda company, author, date: author,
+}
+
+
+def _to_datetime(seconds):
+    """Return the date of a number of seconds since the epoch."""
+    return _EPOCH + datetime.timedelta(seconds=int(seconds))
+
+
+def _merge_runs(older, newer):
+    """Return the run of the reviews of two runs, with the older ones first."""
+    merged = {name: np.concatenate((older[name], newer[name])) for name in _COLUMNS}
+    offset = len(older["author"])
+
+    for name in _ORDERS:
+        keys = np.concatenate((older[name + "_keys"], newer[name + "_keys"]))
+        positions = np.concatenate((older[name], newer[name] + offset))
+
+        # The stable sort of two sorted runs is a linear merge (Timsort)
+        # and it keeps the older reviews first
+        order = np.argsort(keys, kind="stable")
+        merged[name + "_keys"] = keys[order]
+        merged[name] = positions[order]
+
+    return merged
+
+
+class AuthorIndex:
+    """
+    Index from author ids to the companies, ratings and dates of their
+    reviews.
+
+    The same review shouldn't be added twice, e.g. from two crawls of the
+    same page.
+    """
+
+    def __init__(self):
+        self.authors = []
+        self.companies = []
+        self._author_codes = {}
+        self._company_codes = {}
+        # The reviews added since the last query, and the sorted runs of the
+        # older ones, from the oldest
+        self._pending = {name: array(code) for name, code in _COLUMNS.items()}
+        self._runs = []
+
+    def __len__(self):
+        return len(self._pending["author"]) + sum(
+            len(run["author"]) for run in self._runs
+        )
+
+    @staticmethod
+    def _code(codes, names, name):
+        """Return the code of ``name``, adding it if it's new."""
+        code = codes.get(name)
+
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+
+        return code
+
+    def add(self, company, key="url"):
+        """
+        Add the reviews of a company.
+
+        :param company: Company's information returned by
+               :func:`fakepilot.extract_info` with its reviews.
+        :type company: dict(str, )
+        :param key: Field of the company used as its key.
+        :type key: str, optional
+        """
+
+        self.add_reviews(company[key], company.get("reviews", ()))
+
+    def add_reviews(self, company, reviews):
+        """
+        Add reviews of a company.
+
+        :param company: Key of the company, e.g. its URL.
+        :type company: str
+        :param reviews: Reviews returned by
+               :func:`fakepilot.xray.extract_review_info`.
+        :type reviews: iterable(dict(str, ))
+        """
+
+        company_code = self._code(self._company_codes, self.companies, company)
+        pending = self._pending
+
+        for review in reviews:
+            date = (review["date"] - _EPOCH) // _SECOND
+
+            if not -_DATE_OFFSET <= date < _DATE_OFFSET:
+                raise ValueError(f"The date {review['date']} is out of range.")
+
+            pending["author"].append(
+                self._code(self._author_codes, self.authors, review["author_id"])
+            )
+            pending["company"].append(company_code)
+            pending["rating"].append(int(review["star_rating"]))
+            pending["date"].append(date)
+
+    def _sorted_runs(self):
+        """
+        Return the runs of the reviews, after sorting the reviews added since
+        the last query into a new run.
+
+        A run has the columns of its reviews and, for every order of
+        ``_ORDERS``, the positions of its reviews in that order and their
+        sorted keys.
+        """
+
+        runs = self._runs
+
+        if not self._pending["author"]:
+            return runs
+
+        run = {
+            name: np.array(values, dtype=np.int64)
+            for name, values in self._pending.items()
+        }
+        self._pending = {name: array(code) for name, code in _COLUMNS.items()}
+
+        for name, sort_key in _ORDERS.items():
+            keys = sort_key(run["company"], run["author"], run["date"])
+            order = np.argsort(keys, kind="stable")
+            run[name] = order
+            run[name + "_keys"] = keys[order]
+
+        runs.append(run)
+
+        while len(runs) > 1 and len(runs[-2]["author"]) <= len(runs[-1]["author"]):
+            run = runs.pop()
+            runs[-1] = _merge_runs(runs[-1], run)
+
+        return runs
+
+    def _reviews(self, order, low, high):
+        """
+        Return the columns of the reviews whose key in ``order`` is between
+        ``low``, included, and ``high``, excluded, in that order in every run
+        and run by run.
+        """
+
+        parts = {name: [np.zeros(0, dtype=np.int64)] for name in _COLUMNS}
+
+        for run in self._sorted_runs():
+            start, end = np.searchsorted(run[order + "_keys"], (low, high))
+            positions = run[order][start:end]
+
+            for name, values in parts.items():
+                values.append(run[name][positions])
+
+        return {name: np.concatenate(values) for name, values in parts.items()}
+
+    def _company_reviews(self, company, order):
+        """
+        Return the columns of the reviews of a company, by author or, sorted
+        and from the oldest added, by date.
+        """
+
+        code = self._company_codes.get(company)
+
+        if code is None:
+            return {name: np.zeros(0, dtype=np.int64) for name in _COLUMNS}
+
+        sort_key = _ORDERS[order]
+        reviews = self._reviews(
+            order,
+            sort_key(code, 0, -_DATE_OFFSET),
+            sort_key(code + 1, 0, -_DATE_OFFSET),
+        )
+
+        if order == "by_date":
+            # The runs are from the oldest, so the stable sort keeps the
+            # reviews of the same date in the order they were added
+            dates = np.argsort(reviews["date"], kind="stable")
+            reviews = {name: values[dates] for name, values in reviews.items()}
+
+        return reviews
+
+    def reviews_of(self, author_id):
+        """
+        Return the reviews of an author.
+
+        :return: Tuples of the company, the rating and the date of every
+                 review, in the order they were added.
+        :rtype: list(tuple(str, int, :class:`datetime.datetime`))
+        """
+
+        code = self._author_codes.get(author_id)
+
+        if code is None:
+            return []
+
+        reviews = self._reviews("of_author", code, code + 1)
+
+        return [
+            (self.companies[company], int(rating), _to_datetime(date))
+            for company, rating, date in zip(
+                reviews["company"], reviews["rating"], reviews["date"]
+            )
+        ]
+
+    def authors_of(self, company):
+        """Return the ids of the authors of the reviews of a company."""
+        codes = np.unique(self._company_reviews(company, "by_author")["author"])
+        return [self.authors[code] for code in codes]
+
+    def shared_authors(self, company_a, company_b):
+        """
+        Return the ids of the authors that reviewed both companies.
+
+        :rtype: list(str)
+        """
+
+        shared = np.intersect1d(
+            self._company_reviews(company_a, "by_author")["author"],
+            self._company_reviews(company_b, "by_author")["author"],
+        )
+        return [self.authors[code] for code in shared]
+
+    def in_window(self, company, start, end):
+        """
+        Return the reviews of a company published between two dates.
+
+        :param start: First date of the window, included.
+        :type start: :class:`datetime.datetime`
+        :param end: Last date of the window, excluded.
+        :type end: :class:`datetime.datetime`
+        :return: Tuples of the author id, the rating and the date of every
+                 review, from the oldest to the newest.
+        :rtype: list(tuple(str, int, :class:`datetime.datetime`))
+        """
+
+        reviews = self._company_reviews(company, "by_date")
+        dates = reviews["date"]
+        low = np.searchsorted(dates, (start - _EPOCH) // _SECOND, "left")
+        high = np.searchsorted(dates, (end - _EPOCH) // _SECOND, "left")
+
+        return [
+            (self.authors[author], int(rating), _to_datetime(date))
+            for author, rating, date in zip(
+                reviews["author"][low:high],
+                reviews["rating"][low:high],
+                dates[low:high],
+            )
+        ]
+
+    def bursts(self, company, window, min_reviews):
+        """
+        Return the periods in which a company received at least
+        ``min_reviews`` reviews within ``window``.
+
+        The periods are searched from the oldest review and don't overlap.
+
+        :type window: :class:`datetime.timedelta`
+        :type min_reviews: int
+        :return: Tuples of the date of the first review of every period and
+                 its number of reviews.
+        :rtype: list(tuple(:class:`datetime.datetime`, int))
+        """
+
+        dates = self._company_reviews(company, "by_date")["date"]
+        ends = np.searchsorted(dates, dates + window // _SECOND, "left")
+        counts = ends - np.arange(len(dates))
+        found = []
+        first = 0
+
+        for pos in np.flatnonzero(counts >= min_reviews):
+            if pos >= first:
+                found.append((_to_datetime(dates[pos]), int(counts[pos])))
+                first = ends[pos]
+
+        return found
+
+    def author_company_counts(self):
+        """
+        Return the number of reviews of every author for every company, as
+        the coordinates of a sparse matrix.
+
+        They can be given to the constructors of SciPy's sparse matrices,
+        e.g. ``scipy.sparse.csr_matrix((counts, (rows, columns)))``.
+
+        :return: The row (the author's position in :attr:`authors`), the
+                 column (the company's position in :attr:`companies`) and
+                 the number of reviews of every non-zero element.
+        :rtype: tuple(:class:`numpy.ndarray`, :class:`numpy.ndarray`,
+                :class:`numpy.ndarray`)
+        """
+
+        ncompanies = max(len(self.companies), 1)
+        pairs = np.concatenate(
+            [np.zeros(0, dtype=np.int64)]
+            + [
+                run["author"] * ncompanies + run["company"]
+                for run in self._sorted_runs()
+            ]
+        )
+        pairs, counts = np.unique(pairs, return_counts=True)
+
+        return pairs // ncompanies, pairs % ncompanies, counts
@@ -0,0 +1,294 @@
+"""
+Extraction of many pages with a pool of threads or processes.
+
+With processes, every worker has its own copy of the parser and the
+extractors, and the results are pickled back to the caller. With threads,
+the pages are extracted in the caller's process and the results aren't
+copied. The extractors of :mod:`fakepilot.xray` don't share mutable state,
+so they can run concurrently. The parsing is only run in parallel by
+threads where the GIL is released, e.g. by ``lxml`` or on free-threaded
+builds of CPython.
+
+With a ``memory_budget``, the extraction is memory-bounded: every parsed page
+is decomposed once its information is extracted, instead of being left to
+the garbage collector, and pages are submitted while the estimated memory of
+the pages in flight fits in the budget. The memory of a page is estimated as
+its size times ``page_expansion``. :meth:`BatchExtractor.map` can also
+report the RSS of the workers while they extract every page, see
+:mod:`fakepilot.memory`.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import NamedTuple
+
+from . import ExtractOptions, extract_info, memory, xray
+from .selector_cache import SelectorCache
+from .spec import get_plan
+
+#: Kinds of pool of :class:`BatchExtractor`.
+MODES = ("thread", "process")
+
+#: Default ratio of the memory of a parsed page to its size. Parsed pages of
+#: the test corpus take from 8 to 13 times their size.
+PAGE_EXPANSION = 16
+
+# State of every worker process
+_WORKER = {"options": ExtractOptions()}
+
+
+def _compile(spec):
+    """
+    Return the plan of ``spec``, or the path of a spec, which is checked on
+    every page so the spec can be swapped.
+    """
+
+    if isinstance(spec, (str, os.PathLike)):
+        return spec
+    return get_plan(spec)
+
+
+def _init_process(spec=None):
+    """
+    Import the parser, create the selector cache of a worker process and
+    compile the plan of ``spec``.
+    """
+
+    xray.parse_page("<html></html>")
+    _WORKER["options"] = ExtractOptions(SelectorCache(), _compile(spec))
+
+
+class _PageTask(NamedTuple):
+    """
+    Arguments of the extraction of every page of :meth:`BatchExtractor.map`.
+    """
+
+    with_reviews: bool
+    nreviews: int
+    encoding: str
+    options: ExtractOptions
+    with_memory: bool
+
+
+def _extract_path(path, task):
+    """
+    Extract the information of the page in ``path``, along with the RSS
+    while it's extracted if ``task.with_memory`` is set.
+
+    The selector cache and the spec missing in ``task.options`` are those of
+    the worker process.
+    """
+
+    worker = _WORKER["options"]
+    options = task.options
+
+    if options.selector_cache is None:
+        options = options._replace(selector_cache=worker.selector_cache)
+    if options.spec is None:
+        options = options._replace(spec=worker.spec)
+
+    with open(path, encoding=task.encoding) as file:
+        if task.with_memory:
+            return memory.measure(
+                extract_info, file, task.with_reviews, task.nreviews, options
+            )
+
+        return extract_info(file, task.with_reviews, task.nreviews, options)
+
+
+def _result(future, return_exceptions, with_memory):
+    """Return the result of a page, or raise its exception."""
+    if return_exceptions and future.exception() is not None:
+        return (future.exception(), None) if with_memory else future.exception()
+    return future.result()
+
+
+class BatchExtractor:
+    """
+    Extracts the information of many pages with a pool of workers.
+
+    :param mode: Kind of workers, ``'thread'`` or ``'process'``.
+    :type mode: str, optional
+    :param workers: Number of workers. By default, the number of CPUs.
+    :type workers: int, optional
+    :param selector_cache: Selector cache shared by the threads. By default,
+           a new one. Every worker process has its own.
+    :type selector_cache: :class:`fakepilot.selector_cache.SelectorCache`,
+           optional
+    :param window: Maximum number of pages submitted to the workers and not
+           yet returned. By default, four per worker.
+    :type window: int, optional
+    :param memory_budget: Maximum estimated memory, in bytes, of the pages
+           submitted to the workers and not yet returned. A page is always
+           submitted if there are no others. By default, the memory isn't
+           bounded.
+    :type memory_budget: int, optional
+    :param page_expansion: Ratio of the estimated memory of a page to its size.
+    :type page_expansion: float, optional
+    :param spec: Spec of the extracted fields. See
+           :func:`fakepilot.extract_info`. It's compiled once, and sent once
+           to every worker process.
+    :type spec: :class:`fakepilot.spec.ExtractionPlan` or dict(str, ) or
+           str, optional
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        mode="thread",
+        workers=None,
+        selector_cache=None,
+        window=None,
+        *,
+        memory_budget=None,
+        page_expansion=PAGE_EXPANSION,
+        spec=None,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}, it must be one of {MODES}.")
+
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.window = window or 4 * self.workers
+        self.memory_budget = memory_budget
+        self.page_expansion = page_expansion
+
+        # With a memory budget, every page is decomposed once it's extracted
+        dispose = memory_budget is not None
+
+        if mode == "thread":
+            if selector_cache is None:
+                selector_cache = SelectorCache()
+
+            self.options = ExtractOptions(selector_cache, _compile(spec), None, dispose)
+            xray.parse_page("<html></html>")
+            self._executor = ThreadPoolExecutor(
+                self.workers, thread_name_prefix="fakepilot"
+            )
+        else:
+            # The worker processes have their own selector cache and spec
+            self.options = ExtractOptions(dispose=dispose)
+            self._executor = ProcessPoolExecutor(
+                self.workers, initializer=_init_process, initargs=(spec,)
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Wait for the submitted pages and stop the workers."""
+        self._executor.shutdown()
+
+    def page_memory(self, path):
+        """
+        Return the estimated memory, in bytes, of extracting the page in
+        ``path``.
+        """
+
+        try:
+            return os.path.getsize(path) * self.page_expansion
+        except OSError:
+            # Its extraction fails without parsing it
+            return 0
+
+    def _full(self, npending, in_flight, page_memory):
+        """
+        Return whether a page doesn't fit in the window or budget, with
+        ``npending`` pages of ``in_flight`` memory in flight.
+        """
+
+        if npending >= self.window:
+            return True
+        return (
+            self.memory_budget is not None
+            and in_flight + page_memory > self.memory_budget
+        )
+
+    def map(  # pylint: disable=too-many-arguments
+        self,
+        paths,
+        with_reviews=False,
+        nreviews=5,
+        encoding="utf-8",
+        *,
+        return_exceptions=False,
+        spec=None,
+        with_memory=False,
+    ):
+        """
+        Yield the information of the pages in ``paths``, in their order.
+
+        See :func:`fakepilot.extract_info`. If the extraction of a page
+        fails, its exception is raised when its result would be yielded.
+
+        :param paths: Paths of the company's pages.
+        :type paths: iterable(str)
+        :param encoding: Encoding of the pages.
+        :type encoding: str, optional
+        :param return_exceptions: Whether the exception of a page that fails
+               is yielded as its result, instead of raised.
+        :type return_exceptions: bool, optional
+        :param spec: Spec of the extracted fields, instead of the
+               extractor's. See :func:`fakepilot.extract_info`. With
+               processes, it's sent along with every page.
+        :type spec: :class:`fakepilot.spec.ExtractionPlan` or dict(str, ) or
+               str, optional
+        :param with_memory: Whether every result is yielded along with the
+               RSS of its worker while it extracted the page, as returned by
+               :func:`fakepilot.memory.measure`. The RSS of a page whose
+               extraction fails is ``None``.
+        :type with_memory: bool, optional
+        :rtype: iterator(dict(str, )) or iterator(tuple)
+        """
+
+        task = _PageTask(with_reviews, nreviews, encoding, self.options, with_memory)
+
+        if spec is not None:
+            task = task._replace(options=self.options._replace(spec=_compile(spec)))
+
+        # Futures of the pages in flight, along with their estimated memory
+        pending = deque()
+        in_flight = 0
+
+        try:
+            for path in paths:
+                page_memory = (
+                    0 if self.memory_budget is None else self.page_memory(path)
+                )
+
+                while pending and self._full(len(pending), in_flight, page_memory):
+                    future, future_memory = pending.popleft()
+                    in_flight -= future_memory
+                    yield _result(future, return_exceptions, with_memory)
+
+                pending.append(
+                    (self._executor.submit(_extract_path, path, task), page_memory)
+                )
+                in_flight += page_memory
+
+            while pending:
+                yield _result(pending.popleft()[0], return_exceptions, with_memory)
+        finally:
+            for future, _ in pending:
+                future.cancel()
+
+
+def extract_many(paths, mode="thread", workers=None, **kwargs):
+    """
+    Return the information of the pages in ``paths``, in their order.
+
+    :param mode: Kind of workers. See :class:`BatchExtractor`.
+    :type mode: str, optional
+    :param workers: Number of workers.
+    :type workers: int, optional
+    :param kwargs: Arguments of :meth:`BatchExtractor.map`.
+    :rtype: list(dict(str, ))
+    """
+
+    with BatchExtractor(mode, workers) as extractor:
+        return list(extractor.map(paths, **kwargs))
@@ -0,0 +1,301 @@
+"""
+Changes of companies between two extractions, e.g. two crawls of their
+pages.
+
+:func:`diff_companies` compares two results of :func:`fakepilot.extract_info`
+and returns a delta with only what changed: the company's fields, the
+percentages of the rating distribution and the new and removed reviews.
+Every review is identified by a hash of its author, date, rating, title and
+content, so comparing the reviews is linear in their number. A review whose
+text was edited is both removed and new.
+
+Only the reviews included in both results are compared. If a page includes
+the latest ``nreviews`` reviews, the older reviews that are no longer among
+them are removed reviews too.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import hashlib
+
+from . import extract_info
+
+#: Fields of a company compared by :func:`diff_companies`.
+COMPARED_FIELDS = (
+    "name",
+    "score",
+    "nreviews",
+    "categories",
+    "is_claimed",
+    "email",
+    "phone",
+    "address",
+)
+
+
+def review_hash(review):
+    """
+    Return the hash of a review's author id, date, rating, title and content.
+
+    The author's number of reviews and country aren't included, because they
+    change without the review changing.
+
+    :param review: Review returned by :func:`fakepilot.xray.extract_review_info`.
+    :type review: dict(str, )
+    :rtype: bytes
+    """
+
+    digest = hashlib.blake2b(digest_size=16)
+
+    for value in (
+        review.get("author_id"),
+        review.get("date"),
+        review.get("star_rating"),
+        review.get("title"),
+        review.get("content"),
+    ):
+        digest.update(repr(value).encode("utf-8"))
+        digest.update(b"\0")
+
+    return digest.digest()
+
+
+def summarize(company):
+    """
+    Return what :func:`diff_companies` compares of a company: its compared
+    fields, its rating distribution and the hashes of its reviews, with the
+    author id and date of every review.
+
+    A summary is smaller than the company's information, so it's what
+    :func:`diff_streams` keeps of the old companies.
+
+    :rtype: dict(str, )
+    """
+
+    summary = {field: company.get(field) for field in COMPARED_FIELDS}
+    summary["rating_distribution"] = company.get("rating_distribution")
+
+    if "reviews" in company:
+        summary["reviews"] = {
+            review_hash(review): {
+                "author_id": review.get("author_id"),
+                "date": review.get("date"),
+            }
+            for review in company["reviews"]
+        }
+
+    return summary
+
+
+def _diff(key, old, new):
+    """
+    Return the delta from the summary ``old`` of a company to its
+    information ``new``, or ``None`` if nothing changed.
+    """
+
+    delta = {"key": key, "status": "changed"}
+    fields = {
+        field: (old[field], new.get(field))
+        for field in COMPARED_FIELDS
+        if old[field] != new.get(field)
+    }
+
+    old_distribution = old["rating_distribution"] or {}
+    new_distribution = new.get("rating_distribution") or {}
+    distribution = {
+        nstars: (old_distribution.get(nstars), new_distribution.get(nstars))
+        for nstars in sorted(old_distribution.keys() | new_distribution.keys())
+        if old_distribution.get(nstars) != new_distribution.get(nstars)
+    }
+
+    if fields:
+        delta["fields"] = fields
+
+    if distribution:
+        delta["rating_distribution"] = distribution
+
+    if "reviews" in old and "reviews" in new:
+        new_hashes = set()
+        new_reviews = []
+
+        for review in new["reviews"]:
+            digest = review_hash(review)
+            new_hashes.add(digest)
+
+            if digest not in old["reviews"]:
+                new_reviews.append(review)
+
+        removed_reviews = [
+            review
+            for digest, review in old["reviews"].items()
+            if digest not in new_hashes
+        ]
+
+        if new_reviews:
+            delta["new_reviews"] = new_reviews
+
+        if removed_reviews:
+            delta["removed_reviews"] = removed_reviews
+
+    return delta if len(delta) > 2 else None
+
+
+def diff_companies(old, new, key="url"):
+    """
+    Return the changes of a company between two extractions.
+
+    :param old: Company's information returned by
+           :func:`fakepilot.extract_info`.
+    :type old: dict(str, )
+    :param new: Newer company's information.
+    :type new: dict(str, )
+    :param key: Field of the company returned in the delta.
+    :type key: str, optional
+    :return: ``None`` if nothing changed. Otherwise, the delta: the key of
+             the company (``'key'``), ``'changed'`` as status (``'status'``),
+             the old and new values of the changed fields (``'fields'``) and
+             of the changed percentages of the rating distribution
+             (``'rating_distribution'``), the new reviews (``'new_reviews'``)
+             and the author id and date of the removed reviews
+             (``'removed_reviews'``). The reviews are only compared if both
+             have them, and only the items with changes are included.
+    :rtype: dict(str, )
+    """
+
+    return _diff(new.get(key), summarize(old), new)
+
+
+def diff_streams(old, new, key="url", sorted_by_key=False):
+    """
+    Yield the changes of the companies of two extractions of many pages.
+
+    By default, the old companies are consumed first and the summary of
+    every one of them, returned by :func:`summarize`, is kept in memory:
+    its compared fields and rating distribution, and the hash, author id
+    and date of every review. The new ones are compared while they are
+    consumed, so ``new`` can be a generator of a crawl in progress.
+
+    If both extractions are sorted by ``key``, e.g. the companies of a
+    snapshot returned by :meth:`fakepilot.store.SnapshotStore.companies`,
+    they are merged instead and only one company of each is kept in memory.
+
+    :param old: Companies' information of the old extraction.
+    :type old: iterable(dict(str, ))
+    :param new: Companies' information of the new extraction.
+    :type new: iterable(dict(str, ))
+    :param key: Field that identifies a company in both extractions.
+    :type key: str, optional
+    :param sorted_by_key: Whether both extractions are sorted by ``key``,
+           without repeated keys.
+    :type sorted_by_key: bool, optional
+    :return: The delta of every changed company, as returned by
+             :func:`diff_companies`, in the order of ``new``. Then, the
+             companies only in the old extraction, with ``'removed'`` as
+             status. The companies only in the new extraction have
+             ``'added'`` as status and their information under
+             ``'company'``. If the extractions are sorted, all the deltas
+             are in the order of their keys.
+    :rtype: iterator(dict(str, ))
+    :raises ValueError: If ``sorted_by_key`` is true and an extraction
+            isn't sorted.
+    """
+
+    if sorted_by_key:
+        yield from _merge_sorted(old, new, key)
+        return
+
+    summaries = {company[key]: summarize(company) for company in old}
+
+    for company in new:
+        summary = summaries.pop(company[key], None)
+
+        if summary is None:
+            yield _added(company, key)
+            continue
+
+        delta = _diff(company[key], summary, company)
+
+        if delta is not None:
+            yield delta
+
+    for removed in summaries:
+        yield _removed(removed)
+
+
+def _added(company, key):
+    """Return the delta of a company only in the new extraction."""
+    return {"key": company[key], "status": "added", "company": company}
+
+
+def _removed(key):
+    """Return the delta of a company only in the old extraction."""
+    return {"key": key, "status": "removed"}
+
+
+def _next_sorted(companies, previous, key):
+    """
+    Return the next company of an extraction sorted by ``key``, or ``None``
+    at its end.
+    """
+
+    company = next(companies, None)
+
+    if company is not None and company[key] <= previous[key]:
+        raise ValueError(
+            f"The companies aren't sorted by {key}: {company[key]!r} is after "
+            f"{previous[key]!r}."
+        )
+
+    return company
+
+
+def _merge_sorted(old, new, key):
+    """Yield the changes of two extractions sorted by ``key``."""
+    old, new = iter(old), iter(new)
+    old_company, new_company = next(old, None), next(new, None)
+
+    while old_company is not None or new_company is not None:
+        if new_company is None or (
+            old_company is not None and old_company[key] < new_company[key]
+        ):
+            yield _removed(old_company[key])
+            old_company = _next_sorted(old, old_company, key)
+        elif old_company is None or new_company[key] < old_company[key]:
+            yield _added(new_company, key)
+            new_company = _next_sorted(new, new_company, key)
+        else:
+            delta = diff_companies(old_company, new_company, key)
+
+            if delta is not None:
+                yield delta
+
+            old_company = _next_sorted(old, old_company, key)
+            new_company = _next_sorted(new, new_company, key)
+
+
+def diff_page(store, file, snapshot=None, with_reviews=False, nreviews=5):
+    """
+    Return the changes of a company between a stored snapshot and its page.
+
+    :param store: Store with the old information of the company.
+    :type store: :class:`fakepilot.store.SnapshotStore`
+    :param file: Company's page. See :func:`fakepilot.extract_info`.
+    :param snapshot: Id of the stored snapshot. By default, the newest one
+           with the company.
+    :type snapshot: int, optional
+    :param with_reviews: Whether to compare the reviews.
+    :type with_reviews: bool, optional
+    :param nreviews: Maximum number of extracted reviews.
+    :type nreviews: int, optional
+    :return: The delta, as returned by :func:`diff_companies`. If the
+             company isn't in the snapshot, its status is ``'added'``.
+    :rtype: dict(str, )
+    """
+
+    company = extract_info(file, with_reviews, nreviews)
+    stored = store.load_company(company["url"], snapshot)
+
+    if stored is None:
+        return {"key": company["url"], "status": "added", "company": company}
+
+    return diff_companies(stored, company)
@@ -0,0 +1,451 @@
+"""
+Long-running extraction daemon and its client.
+
+Starting an interpreter and importing the parser costs more than extracting
+a small page, so jobs that extract pages one at a time can send them to a
+daemon that keeps a pool of warm worker processes.
+
+The protocol is line-delimited JSON, encoded by
+:mod:`fakepilot.serialization`, over a Unix domain socket or a localhost TCP
+socket. Every request is an object with an ``id``, either the ``page``
+itself or the ``path`` of a page, and optionally ``with_reviews`` and
+``nreviews``, as in :func:`fakepilot.extract_info`. Paths are only read if
+the daemon is given a root directory, and they must be in it. Every response
+has the ``id`` of its request and either the ``result`` or an ``error``. A
+client may send several requests without waiting for their responses, which
+are sent back as soon as they are ready, not necessarily in order. The
+daemon stops reading new requests while ``max_in_flight`` of them are being
+extracted. A line longer than :data:`MAX_LINE_LENGTH` is answered with an
+error and the connection is closed.
+
+The daemon doesn't authenticate its clients, so it only listens on the
+loopback interface unless it's explicitly allowed to listen on others.
+
+Run the daemon with::
+
+    python -m fakepilot.daemon --socket /tmp/fakepilot.sock --root /data/pages
+"""
+
+# SPDX-License-Identifier: MIT
+
+import argparse
+import asyncio
+import ipaddress
+import itertools
+import os
+import signal
+import socket
+import stat
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from .serialization import dumps, loads
+
+DEFAULT_MAX_IN_FLIGHT = 64
+
+# Pages may be sent in the requests, so the lines can be large
+MAX_LINE_LENGTH = 2**26
+
+# State of a worker process, set by its initializer
+_WORKER = {"selector_cache": None}
+
+
+class DaemonError(RuntimeError):
+    """Error raised by the daemon while extracting a page."""
+
+
+def _init_worker():
+    """
+    Import the parser and the extractors in a worker process, so the first
+    request doesn't pay for them.
+    """
+
+    from . import xray  # pylint: disable=import-outside-toplevel
+    from .selector_cache import (  # pylint: disable=import-outside-toplevel
+        SelectorCache,
+    )
+
+    xray.parse_page("<html></html>")
+    _WORKER["selector_cache"] = SelectorCache()
+
+
+def _ping():
+    """Do nothing. Used to start the worker processes."""
+    return os.getpid()
+
+
+def _extract(request):
+    """Extract the information of the page of a request in a worker."""
+    from . import (  # pylint: disable=import-outside-toplevel
+        ExtractOptions,
+        extract_info,
+    )
+
+    args = (
+        bool(request.get("with_reviews", False)),
+        int(request.get("nreviews", 5)),
+        ExtractOptions(_WORKER["selector_cache"]),
+    )
+
+    if "path" in request:
+        with open(request["path"], encoding=request.get("encoding", "utf-8")) as file:
+            return extract_info(file, *args)
+
+    return extract_info(request["page"], *args)
+
+
+def is_loopback(host):
+    """Indicate if ``host`` is ``localhost`` or a loopback address."""
+    if host == "localhost":
+        return True
+
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class ExtractionServer:
+    """
+    Daemon that extracts pages with a pool of worker processes.
+
+    :param address: Path of a Unix domain socket or a ``(host, port)``
+           pair of a TCP socket.
+    :type address: str or tuple(str, int)
+    :param workers: Number of worker processes. By default, the number of
+           CPUs.
+    :type workers: int, optional
+    :param max_in_flight: Maximum number of requests being extracted at the
+           same time, for all the connections.
+    :type max_in_flight: int, optional
+    :param root: Directory of the pages whose paths can be requested. Without
+           it, only the pages sent in the requests are extracted.
+    :type root: str, optional
+    :param allow_remote: Whether the TCP socket can listen on a host that
+           isn't a loopback address.
+    :type allow_remote: bool, optional
+    :raises ValueError: If the host isn't a loopback address and
+            ``allow_remote`` isn't set.
+    """
+
+    def __init__(
+        self,
+        address,
+        workers=None,
+        max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+        root=None,
+        allow_remote=False,
+    ):
+        if not isinstance(address, str) and not allow_remote:
+            if not is_loopback(address[0]):
+                raise ValueError(
+                    f"Refusing to listen on {address[0]!r}, which isn't a loopback "
+                    "address."
+                )
+
+        self.address = address
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight
+        self.root = None if root is None else os.path.realpath(root)
+        self.ready = threading.Event()
+        self._loop = None
+        self._stop = None
+
+    def run(self):
+        """Serve until :meth:`shutdown` is called or a signal is received."""
+        asyncio.run(self.serve())
+
+    def shutdown(self):
+        """Stop the daemon. It can be called from any thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    async def serve(self):
+        """Serve until :meth:`shutdown` is called or a signal is received."""
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    self._loop.add_signal_handler(signum, self._stop.set)
+                except NotImplementedError:
+                    pass
+
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker) as pool:
+            await asyncio.gather(
+                *(self._loop.run_in_executor(pool, _ping) for _ in range(self.workers))
+            )
+
+            def handle(reader, writer):
+                """Serve a connection with the pool."""
+                return self._handle(reader, writer, pool, in_flight)
+
+            if isinstance(self.address, str):
+                self._remove_socket()
+                server = await asyncio.start_unix_server(
+                    handle, self.address, limit=MAX_LINE_LENGTH
+                )
+            else:
+                host, port = self.address
+                server = await asyncio.start_server(
+                    handle, host, port, limit=MAX_LINE_LENGTH
+                )
+
+            self.ready.set()
+
+            try:
+                await self._stop.wait()
+            finally:
+                server.close()
+                await server.wait_closed()
+
+                if isinstance(self.address, str):
+                    self._remove_socket()
+
+    def _remove_socket(self):
+        """Remove the Unix domain socket file left by a previous daemon."""
+        try:
+            if stat.S_ISSOCK(os.stat(self.address).st_mode):
+                os.unlink(self.address)
+        except FileNotFoundError:
+            pass
+
+    async def _handle(self, reader, writer, pool, in_flight):
+        """Serve the requests of a connection."""
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # The rest of the line can't be told from the next ones
+                    await self._send_error(writer, write_lock, "The line is too long.")
+                    break
+
+                if not line:
+                    break
+
+                # The connection isn't read while the limit is reached
+                await in_flight.acquire()
+                task = asyncio.ensure_future(
+                    self._respond(line, writer, write_lock, pool, in_flight)
+                )
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, line, writer, write_lock, pool, in_flight):
+        """Extract the page of a request and send the response."""
+        request_id = None
+
+        try:
+            request = loads(line)
+            request_id = request.get("id")
+            self._check_path(request)
+            result = await self._loop.run_in_executor(pool, _extract, request)
+            response = {"id": request_id, "result": result}
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            response = {"id": request_id, "error": f"{type(exc).__name__}: {exc}"}
+        finally:
+            in_flight.release()
+
+        async with write_lock:
+            writer.write(dumps(response))
+            await writer.drain()
+
+    @staticmethod
+    async def _send_error(writer, write_lock, error):
+        """Send an error that doesn't answer a request."""
+        async with write_lock:
+            writer.write(dumps({"id": None, "error": error}))
+            await writer.drain()
+
+    def _check_path(self, request):
+        """
+        Check that the path of a request, if any, is in the root directory
+        and make it absolute.
+
+        :raises PermissionError: If it isn't.
+        """
+
+        if "path" not in request:
+            return
+
+        if self.root is None:
+            raise PermissionError("The daemon doesn't read paths, send the page.")
+
+        path = os.path.realpath(os.path.join(self.root, request["path"]))
+
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise PermissionError(f"{request['path']!r} isn't in the daemon's root.")
+
+        request["path"] = path
+
+
+class DaemonClient:
+    """
+    Client of an :class:`ExtractionServer`.
+
+    :param address: Address the daemon listens on.
+    :type address: str or tuple(str, int)
+    :param timeout: Timeout, in seconds, of the socket operations.
+    :type timeout: float, optional
+    """
+
+    def __init__(self, address, timeout=None):
+        if isinstance(address, str):
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+        self._sock.settimeout(timeout)
+        self._sock.connect(address)
+        self._file = self._sock.makefile("rb")
+        self._ids = itertools.count()
+
+    def close(self):
+        """Close the connection."""
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _request(source, with_reviews, nreviews):
+        """Return the request of a page's path or file object."""
+        request = {"with_reviews": with_reviews, "nreviews": nreviews}
+
+        if hasattr(source, "read"):
+            request["page"] = source.read()
+        else:
+            request["path"] = os.path.abspath(os.fspath(source))
+
+        return request
+
+    def _send(self, request):
+        """Send a request and return its id."""
+        request["id"] = next(self._ids)
+        self._sock.sendall(dumps(request))
+        return request["id"]
+
+    def _receive(self):
+        """Receive a response."""
+        line = self._file.readline()
+
+        if not line:
+            raise ConnectionError("The daemon closed the connection.")
+
+        return loads(line)
+
+    @staticmethod
+    def _result(response):
+        """Return the result of a response or raise its error."""
+        if "error" in response:
+            raise DaemonError(response["error"])
+        return response["result"]
+
+    def extract_info(self, source, with_reviews=False, nreviews=5):
+        """
+        Return the information of a company page, as
+        :func:`fakepilot.extract_info`.
+
+        :param source: Path of the page, in the daemon's root, or a file
+               object whose content is sent.
+        :type source: str or file object
+        :raises DaemonError: If the page couldn't be extracted.
+        """
+
+        return next(self.map([source], with_reviews, nreviews))
+
+    def map(self, sources, with_reviews=False, nreviews=5, window=16):
+        """
+        Return an iterator over the information of several company pages,
+        in the order of ``sources``.
+
+        Up to ``window`` requests are sent before waiting for their
+        responses.
+
+        :raises DaemonError: If a page couldn't be extracted.
+        """
+
+        sources = iter(sources)
+        pending = []
+        responses = {}
+
+        while True:
+            while len(pending) < window:
+                source = next(sources, None)
+
+                if source is None:
+                    break
+
+                pending.append(
+                    self._send(self._request(source, with_reviews, nreviews))
+                )
+
+            if not pending:
+                return
+
+            while pending[0] not in responses:
+                response = self._receive()
+                responses[response["id"]] = response
+
+            yield self._result(responses.pop(pending.pop(0)))
+
+
+def main(argv=None):
+    """Run the daemon from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="python -m fakepilot.daemon", description="Serve page extraction."
+    )
+    address = parser.add_mutually_exclusive_group(required=True)
+    address.add_argument("--socket", help="path of the Unix domain socket")
+    address.add_argument("--port", type=int, help="TCP port on localhost")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP host")
+    parser.add_argument(
+        "--allow-remote",
+        action="store_true",
+        help="allow a TCP host that isn't a loopback address",
+    )
+    parser.add_argument(
+        "--root", help="directory of the pages whose paths can be requested"
+    )
+    parser.add_argument("--workers", type=int, help="number of worker processes")
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=DEFAULT_MAX_IN_FLIGHT,
+        help="maximum number of requests being extracted at the same time",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        server = ExtractionServer(
+            args.socket if args.socket else (args.host, args.port),
+            workers=args.workers,
+            max_in_flight=args.max_in_flight,
+            root=args.root,
+            allow_remote=args.allow_remote,
+        )
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    server.run()
+
+
+if __name__ == "__main__":
+    main()
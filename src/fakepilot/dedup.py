@@ -0,0 +1,425 @@
+"""
+Near-duplicate detection of review texts with MinHash and locality-sensitive
+hashing (LSH).
+
+Copy-pasted or lightly edited reviews are a strong sign of fake reviews.
+The text of every review is normalized and split into overlapping byte
+shingles, and the MinHash signature of its set of shingles is computed, so
+that the fraction of equal values of two signatures estimates the Jaccard
+similarity of the texts. The signatures are computed in batches with NumPy.
+
+The signatures are divided into bands, and two texts are candidates if all
+the values of some band are equal. Every band is indexed by a sorted array
+of band hashes, so a query is a binary search per band instead of a
+comparison with every indexed review.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import json
+import re
+import unicodedata
+
+from ._optional import require_numpy
+
+np = require_numpy(__name__)
+
+_MAX_HASH = np.uint32(0xFFFFFFFF)
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_text(text):
+    """
+    Return ``text`` in NFKC normal form, case-folded, and with its words
+    separated by single spaces, without punctuation.
+    """
+
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(_WORD_RE.findall(text))
+
+
+def review_text(review):
+    """
+    Return the text of a review used to compare it: its title and content.
+
+    :param review: Review returned by :func:`fakepilot.xray.extract_review_info`.
+    :type review: dict(str, )
+    """
+
+    return f"{review.get('title') or ''}\n{review.get('content') or ''}"
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures of texts.
+
+    The hash functions are of the multiply-add-shift family over the 32-bit
+    hashes of the shingles.
+
+    :param num_perm: Number of hash functions, the length of the signatures.
+    :type num_perm: int, optional
+    :param shingle_size: Number of bytes of the normalized UTF-8 text in every
+           shingle.
+    :type shingle_size: int, optional
+    :param seed: Seed of the hash functions. Signatures are only comparable
+           if they were computed with the same seed.
+    :type seed: int, optional
+    :param batch_size: Maximum number of texts whose shingles are kept in
+           memory at the same time.
+    :type batch_size: int, optional
+    :param max_block: Maximum number of shingles hashed at the same time by
+           every hash function.
+    :type max_block: int, optional
+    """
+
+    def __init__(
+        self, num_perm=128, shingle_size=9, seed=1, batch_size=10000, max_block=2**15
+    ):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.batch_size = batch_size
+        self.max_block = max_block
+
+        rng = np.random.default_rng(seed)
+        # The multipliers must be odd
+        self._a = rng.integers(0, 2**64, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**64, num_perm, dtype=np.uint64)
+
+    def shingle_hashes(self, texts):
+        """
+        Return the 32-bit hashes of the shingles of ``texts``, concatenated,
+        and the number of shingles of every text.
+
+        A text shorter than a shingle, but not empty, has a single shingle.
+
+        :rtype: tuple(:class:`numpy.ndarray`, :class:`numpy.ndarray`)
+        """
+
+        size = self.shingle_size
+        encoded = [normalize_text(text).encode("utf-8") for text in texts]
+        encoded = [data.ljust(size) if data else data for data in encoded]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        counts = np.maximum(lengths - size + 1, 0)
+        total = int(counts.sum())
+
+        if not total:
+            return np.zeros(0, dtype=np.uint64), counts
+
+        buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        text_starts = np.cumsum(lengths) - lengths
+        shingle_offsets = np.cumsum(counts) - counts
+        starts = (
+            np.arange(total)
+            - np.repeat(shingle_offsets, counts)
+            + np.repeat(text_starts, counts)
+        )
+
+        # FNV-1a of every shingle, computed for all of them byte by byte
+        hashes = np.full(total, _FNV_OFFSET, dtype=np.uint64)
+
+        with np.errstate(over="ignore"):
+            for pos in range(size):
+                hashes ^= buffer[starts + pos]
+                hashes *= _FNV_PRIME
+
+        return (hashes >> np.uint64(32)) ^ (hashes & np.uint64(0xFFFFFFFF)), counts
+
+    def signatures(self, texts):
+        """
+        Return the MinHash signatures of ``texts``.
+
+        The signature of an empty text has the maximum value in every
+        position.
+
+        :type texts: iterable(str)
+        :return: Matrix with shape ``(len(texts), num_perm)``.
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        texts = list(texts)
+        signatures = np.full((len(texts), self.num_perm), _MAX_HASH, dtype=np.uint32)
+
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start : start + self.batch_size]
+            signatures[start : start + len(batch)] = self._batch_signatures(batch)
+
+        return signatures
+
+    def _batch_signatures(self, texts):
+        """Return the MinHash signatures of a batch of texts."""
+        signatures = np.full((len(texts), self.num_perm), _MAX_HASH, dtype=np.uint32)
+        hashes, counts = self.shingle_hashes(texts)
+        nonempty = np.flatnonzero(counts)
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        ends = offsets[nonempty + 1]
+        first = 0
+
+        # The texts are hashed in blocks of up to max_block shingles. A text
+        # with more shingles is hashed alone.
+        while first < len(nonempty):
+            low = offsets[nonempty[first]]
+            last = int(np.searchsorted(ends, low + self.max_block, "right"))
+            last = max(last, first + 1)
+            high = ends[last - 1]
+            block = nonempty[first:last]
+
+            with np.errstate(over="ignore"):
+                permuted = (
+                    self._a[:, None] * hashes[None, low:high] + self._b[:, None]
+                ) >> np.uint64(32)
+
+            minimums = np.minimum.reduceat(permuted, offsets[block] - low, axis=1)
+            signatures[block] = minimums.T.astype(np.uint32)
+            first = last
+
+        return signatures
+
+
+def _band_hashes(signatures, bands):
+    """
+    Return the hash of every band of every signature, with shape
+    ``(bands, len(signatures))``.
+    """
+
+    rows = signatures.shape[1] // bands
+    hashes = np.full((bands, len(signatures)), _FNV_OFFSET, dtype=np.uint64)
+
+    with np.errstate(over="ignore"):
+        for band in range(bands):
+            for column in range(band * rows, (band + 1) * rows):
+                hashes[band] ^= signatures[:, column]
+                hashes[band] *= _FNV_PRIME
+
+    return hashes
+
+
+def _merge_runs(older, newer):
+    """
+    Return the run of the band hashes and ids of two runs, with the older
+    ones first among equal hashes.
+    """
+
+    hashes = np.concatenate((older[0], newer[0]), axis=1)
+    ids = np.concatenate((older[1], newer[1]), axis=1)
+
+    # The stable sort of two sorted runs is a linear merge (Timsort)
+    order = np.argsort(hashes, axis=1, kind="stable")
+    return np.take_along_axis(hashes, order, axis=1), np.take_along_axis(
+        ids, order, axis=1
+    )
+
+
+class LSHIndex:
+    """
+    Index of review texts that finds the near-duplicates of a text.
+
+    Texts can be added at any time. The band hashes of the new texts are
+    kept unsorted until the next query, which sorts them into a run. As in a
+    log-structured merge tree, a run is merged with the previous one while
+    the previous one isn't larger, and a query searches every run. So there
+    are at most a logarithmic number of runs, and adding texts takes an
+    amortized logarithmic time per text, instead of a query after some
+    additions taking a time linear in the size of the index. The blocks of
+    signatures of the added texts are joined in the same way.
+
+    :param num_perm: Length of the MinHash signatures.
+    :type num_perm: int, optional
+    :param bands: Number of bands. It must divide ``num_perm``. With more
+           bands, texts with a lower similarity become candidates.
+    :type bands: int, optional
+    :param shingle_size: See :class:`MinHasher`.
+    :type shingle_size: int, optional
+    :param seed: See :class:`MinHasher`.
+    :type seed: int, optional
+    """
+
+    def __init__(self, num_perm=128, bands=32, shingle_size=9, seed=1):
+        if num_perm % bands:
+            raise ValueError("The number of bands must divide num_perm.")
+
+        self.bands = bands
+        self.hasher = MinHasher(num_perm, shingle_size, seed)
+        self.keys = []
+        # Blocks of signatures, from the first texts
+        self._signatures = []
+        # Sorted runs of the band hashes and ids of the texts, from the
+        # oldest, and those of the texts added since the last query
+        self._runs = []
+        self._pending = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def signatures(self):
+        """Signatures of the indexed texts, in the order they were added."""
+        if len(self._signatures) != 1:
+            empty = np.zeros((0, self.hasher.num_perm), dtype=np.uint32)
+            self._signatures = [np.concatenate([empty] + self._signatures)]
+
+        return self._signatures[0]
+
+    def _signatures_of(self, ids):
+        """Return the signatures of the indexed texts ``ids``."""
+        found = np.empty((len(ids), self.hasher.num_perm), dtype=np.uint32)
+        start = 0
+
+        for block in self._signatures:
+            selected = (ids >= start) & (ids < start + len(block))
+            found[selected] = block[ids[selected] - start]
+            start += len(block)
+
+        return found
+
+    def add(self, texts, keys=None):
+        """
+        Add texts to the index.
+
+        :param texts: Texts to be added.
+        :type texts: iterable(str)
+        :param keys: Key of every text, e.g. the company's URL and the
+               author's id, returned by the queries. By default, the position
+               of the text in the index.
+        :type keys: iterable, optional
+        """
+
+        self.add_signatures(self.hasher.signatures(texts), keys)
+
+    def add_reviews(self, reviews, keys=None):
+        """Add the texts of reviews to the index. See :func:`review_text`."""
+        self.add((review_text(review) for review in reviews), keys)
+
+    def add_signatures(self, signatures, keys=None):
+        """Add texts to the index by their signatures."""
+        signatures = np.array(signatures, dtype=np.uint32)
+        first = len(self.keys)
+        keys = range(first, first + len(signatures)) if keys is None else list(keys)
+
+        if len(keys) != len(signatures):
+            raise ValueError("There must be a key for every text.")
+
+        self.keys.extend(keys)
+        blocks = self._signatures
+        blocks.append(signatures)
+
+        while len(blocks) > 1 and len(blocks[-2]) <= len(blocks[-1]):
+            block = blocks.pop()
+            blocks[-1] = np.concatenate((blocks[-1], block))
+
+        # The empty texts aren't candidates of any text
+        ids = first + np.flatnonzero((signatures != _MAX_HASH).any(axis=1))
+        self._pending.append((_band_hashes(signatures[ids - first], self.bands), ids))
+
+    def _sorted_runs(self):
+        """
+        Return the runs of band hashes and ids, sorted by hash in every band,
+        after sorting those of the texts added since the last query into a
+        new run.
+        """
+
+        runs = self._runs
+
+        if not self._pending:
+            return runs
+
+        hashes = np.concatenate([hashes for hashes, _ in self._pending], axis=1)
+        ids = np.concatenate([ids for _, ids in self._pending])
+        self._pending = []
+
+        # The texts may all be empty
+        if ids.size == 0:
+            return runs
+
+        order = np.argsort(hashes, axis=1, kind="stable")
+        runs.append((np.take_along_axis(hashes, order, axis=1), ids[order]))
+
+        while len(runs) > 1 and runs[-2][1].shape[1] <= runs[-1][1].shape[1]:
+            newer = runs.pop()
+            runs[-1] = _merge_runs(runs[-1], newer)
+
+        return runs
+
+    def candidates(self, signature):
+        """
+        Return the positions of the indexed texts that share a band with
+        ``signature``.
+
+        :rtype: :class:`numpy.ndarray`
+        """
+
+        hashes = _band_hashes(signature[None, :], self.bands)[:, 0]
+        found = [np.zeros(0, dtype=np.int64)]
+
+        for run_hashes, run_ids in self._sorted_runs():
+            for band, band_hash in enumerate(hashes):
+                low = np.searchsorted(run_hashes[band], band_hash, "left")
+                high = np.searchsorted(run_hashes[band], band_hash, "right")
+                found.append(run_ids[band, low:high])
+
+        return np.unique(np.concatenate(found))
+
+    def query(self, text, threshold=0.8):
+        """
+        Return the indexed texts similar to ``text``.
+
+        :param threshold: Minimum estimated Jaccard similarity of the
+               shingles.
+        :type threshold: float, optional
+        :return: Pairs of the key of a text and its estimated similarity,
+                 from the most to the least similar.
+        :rtype: list(tuple)
+        """
+
+        return self.query_signature(self.hasher.signatures([text])[0], threshold)
+
+    def query_signature(self, signature, threshold=0.8):
+        """Return the indexed texts similar to a signature. See :meth:`query`."""
+        if (signature == _MAX_HASH).all():
+            return []
+
+        ids = self.candidates(signature)
+        similarities = (self._signatures_of(ids) == signature).mean(axis=1)
+        selected = similarities >= threshold
+        ids, similarities = ids[selected], similarities[selected]
+        order = np.argsort(-similarities, kind="stable")
+
+        return [(self.keys[ids[i]], float(similarities[i])) for i in order]
+
+    def save(self, path):
+        """
+        Save the index to a NumPy ``.npz`` file.
+
+        The keys must be serializable as JSON. The band arrays are not
+        saved, but rebuilt by :meth:`load`.
+        """
+
+        np.savez_compressed(
+            path,
+            signatures=self.signatures,
+            keys=np.array(json.dumps(list(self.keys))),
+            params=np.array(
+                [
+                    self.hasher.num_perm,
+                    self.bands,
+                    self.hasher.shingle_size,
+                    self.hasher.seed,
+                ]
+            ),
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with :meth:`save`."""
+        with np.load(path) as data:
+            num_perm, bands, shingle_size, seed = (int(v) for v in data["params"])
+            index = cls(num_perm, bands, shingle_size, seed)
+            keys = [
+                tuple(key) if isinstance(key, list) else key
+                for key in json.loads(str(data["keys"]))
+            ]
+            index.add_signatures(data["signatures"], keys)
+
+        return index
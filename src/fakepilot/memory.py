@@ -0,0 +1,142 @@
+"""
+Resident set size (RSS) of the process, to size the memory of the workers
+that extract the pages.
+
+The current RSS is read from ``/proc/self/statm`` and the peak RSS from
+:func:`resource.getrusage`. On Linux, the peak is reset through
+``/proc/self/clear_refs`` before every measure, so it's the peak while the
+measured function ran. Elsewhere, it's the peak since the process started,
+and the values that can't be read are ``None``.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import os
+import sys
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    # Not available on Windows
+    resource = None
+
+
+def current_rss():
+    """
+    Return the current RSS of the process, in bytes, or ``None`` if it
+    can't be read.
+
+    :rtype: int
+    """
+
+    try:
+        with open("/proc/self/statm", encoding="ascii") as file:
+            resident = int(file.read().split()[1])
+    except OSError:
+        return None
+
+    return resident * os.sysconf("SC_PAGE_SIZE")
+
+
+def peak_rss():
+    """
+    Return the peak RSS of the process, in bytes, or ``None`` if it can't be
+    read.
+
+    :rtype: int
+    """
+
+    if resource is None:
+        return None
+
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # It's in kilobytes, except on macOS
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def reset_peak_rss():
+    """
+    Reset the peak RSS of the process to its current RSS.
+
+    :return: Whether it was reset.
+    :rtype: bool
+    """
+
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as file:
+            file.write("5")
+    except OSError:
+        return False
+
+    return True
+
+
+def measure(func, *args, **kwargs):
+    """
+    Call ``func`` and return its result along with the RSS of the process.
+
+    The peak RSS is the peak of the whole process, so the peaks of functions
+    that run concurrently in several threads aren't separated.
+
+    :return: The result and the RSS, in bytes, before the call
+             (``'rss_before'``), its peak during the call (``'peak_rss'``)
+             and after it (``'rss'``), and the process id (``'pid'``).
+    :rtype: tuple(, dict(str, int))
+    """
+
+    reset_peak_rss()
+    rss_before = current_rss()
+    result = func(*args, **kwargs)
+    peak = peak_rss()
+    rss = current_rss()
+
+    # Linux updates the peak lazily, so it may be behind the current RSS
+    if peak is not None and rss is not None:
+        peak = max(peak, rss)
+
+    return result, {
+        "rss_before": rss_before,
+        "peak_rss": peak,
+        "rss": rss,
+        "pid": os.getpid(),
+    }
+
+
+def summarize(reports):
+    """
+    Summarize the RSS reports of the pages extracted by some workers.
+
+    :param reports: Reports returned by :func:`measure`.
+    :type reports: iterable(dict(str, int))
+    :return: The number of pages (``'pages'``), the highest peak RSS of a
+             worker (``'peak_rss'``), the highest increase of the RSS of a
+             worker while it extracted a page (``'page_rss'``), and the
+             highest RSS of a worker after its last page (``'steady_rss'``).
+             The values that can't be computed are ``None``.
+    :rtype: dict(str, int)
+    """
+
+    npages = 0
+    peaks = []
+    increases = []
+    last_rss = {}
+
+    for report in reports:
+        npages += 1
+
+        if report["peak_rss"] is not None:
+            peaks.append(report["peak_rss"])
+
+            if report["rss_before"] is not None:
+                increases.append(report["peak_rss"] - report["rss_before"])
+
+        if report["rss"] is not None:
+            last_rss[report["pid"]] = report["rss"]
+
+    return {
+        "pages": npages,
+        "peak_rss": max(peaks, default=None),
+        "page_rss": max(increases, default=None),
+        "steady_rss": max(last_rss.values(), default=None),
+    }
@@ -0,0 +1,546 @@
+"""
+Extraction of a corpus of pages split in shards, shared by several nodes.
+
+The corpus is listed in a manifest, a text file with the path of a page in
+every line. The relative paths are relative to the manifest's directory,
+and the pages are identified by their paths as written in the manifest, so
+the nodes may mount the corpus in different directories. Every page is
+assigned to a shard by a hash of its path, so every node computes the same
+partition.
+
+The nodes run :class:`ShardRunner` on the same work directory, e.g. on a
+shared file system, and coordinate through files in it:
+
+* ``manifest.json`` has the number of shards and the digest of the
+  manifest. The first node writes it, and the others check that they run
+  the same corpus.
+* ``shard-NNNNN.lock`` is held by the node that extracts the shard. The
+  node touches it after every batch, and a lock that hasn't been touched
+  for ``lock_timeout`` seconds is stale and can be taken by another node.
+* ``shard-NNNNN.jsonl`` has the results of the shard, one per line. Every
+  line has the path of the page under ``'page'`` and either its
+  information, under ``'company'``, or the error of its extraction, under
+  ``'error'``. While the shard is extracted, its results are written to
+  ``shard-NNNNN.jsonl.NODE.tmp``, a file of the node that holds the lock,
+  which is renamed to ``shard-NNNNN.jsonl`` when the shard is done.
+* ``shard-NNNNN.checkpoint`` has the number of pages of the shard done, the
+  file of their results and its size up to them. It's replaced atomically
+  after every batch, once its results are written and the node checked
+  that it still holds the lock. A node that takes the shard copies the
+  results up to that size to its own file and resumes after those pages,
+  so a node that lost the lock never writes to the results of another.
+
+Run a node with::
+
+    python -m fakepilot.runner manifest.txt work_dir --shards 64
+"""
+
+# SPDX-License-Identifier: MIT
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import tempfile
+import time
+import uuid
+from typing import NamedTuple
+
+from .batch import BatchExtractor
+from .serialization import dumps, loads
+
+
+class LockLost(RuntimeError):
+    """Error raised when the lock of a shard was taken by another node."""
+
+
+def read_manifest(path):
+    """
+    Return the paths of the pages listed in a manifest, as written in it.
+
+    Blank lines and lines starting with ``#`` are skipped.
+
+    :rtype: list(str)
+    """
+
+    with open(path, encoding="utf-8") as file:
+        lines = (line.strip() for line in file)
+        return [line for line in lines if line and not line.startswith("#")]
+
+
+def shard_of(page, nshards):
+    """
+    Return the shard of a page.
+
+    The shard depends only on the page's path and the number of shards, so
+    it's the same in every node and run.
+
+    :type page: str
+    :type nshards: int
+    :rtype: int
+    """
+
+    digest = hashlib.blake2b(page.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % nshards
+
+
+def partition(pages, nshards):
+    """
+    Return the pages of every shard, in the order of ``pages``.
+
+    :rtype: list(list(str))
+    """
+
+    shards = [[] for _ in range(nshards)]
+
+    for page in pages:
+        shards[shard_of(page, nshards)].append(page)
+
+    return shards
+
+
+def _write_atomic(path, content):
+    """Replace the file in ``path`` with ``content``, atomically."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _copy_prefix(source, target, size):
+    """Copy the first ``size`` bytes of the file ``source`` to ``target``."""
+    while size > 0:
+        chunk = source.read(min(size, 2**20))
+
+        if not chunk:
+            break
+
+        target.write(chunk)
+        size -= len(chunk)
+
+
+def _write_records(output, pages, results):
+    """Write the records of some pages and their results, durably."""
+    for page, result in zip(pages, results):
+        if isinstance(result, Exception):
+            record = {"page": page, "error": repr(result)}
+        else:
+            record = {"page": page, "company": result}
+        output.write(dumps(record))
+
+    output.flush()
+    os.fsync(output.fileno())
+
+
+class ShardLock:
+    """
+    Lock of a shard held by a node, as a file created exclusively.
+
+    :param path: Path of the lock file.
+    :type path: str
+    :param owner: Id of the node.
+    :type owner: str
+    :param timeout: Seconds since the lock was last touched after which it's
+           stale.
+    :type timeout: float
+    """
+
+    def __init__(self, path, owner, timeout):
+        self.path = path
+        self.owner = owner
+        self.timeout = timeout
+
+    def _create(self):
+        """Create the lock file, if it doesn't exist."""
+        try:
+            fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump({"owner": self.owner, "acquired": time.time()}, file)
+
+        return True
+
+    def _is_stale(self, path):
+        """Return whether the lock file in ``path`` is stale."""
+        try:
+            return time.time() - os.stat(path).st_mtime > self.timeout
+        except FileNotFoundError:
+            return False
+
+    def acquire(self):
+        """
+        Take the lock if it's free or stale.
+
+        :return: Whether the lock was taken.
+        :rtype: bool
+        """
+
+        if self._create():
+            return True
+
+        if not self._is_stale(self.path):
+            return False
+
+        # Only one node can rename the stale lock. If it was replaced by a
+        # fresh one in the meantime, it's put back.
+        taken = f"{self.path}.{uuid.uuid4().hex}"
+
+        try:
+            os.rename(self.path, taken)
+        except FileNotFoundError:
+            return False
+
+        if not self._is_stale(taken):
+            try:
+                os.link(taken, self.path)
+            except FileExistsError:
+                pass
+            os.remove(taken)
+            return False
+
+        os.remove(taken)
+        return self._create()
+
+    def owner_of(self):
+        """Return the id of the node that holds the lock, or ``None``."""
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                return json.load(file)["owner"]
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def refresh(self):
+        """
+        Touch the lock, so it doesn't become stale.
+
+        :raises LockLost: If another node took the lock.
+        """
+
+        if self.owner_of() != self.owner:
+            raise LockLost(f"The lock {self.path} was taken by another node.")
+
+        os.utime(self.path)
+
+    def release(self):
+        """Remove the lock, if it's still held."""
+        if self.owner_of() == self.owner:
+            os.remove(self.path)
+
+
+class NodeSettings(NamedTuple):
+    """
+    Settings of the locks and checkpoints of a node of :class:`ShardRunner`.
+
+    :param node_id: Id of the node. By default, its host name and process id.
+    :type node_id: str, optional
+    :param batch_size: Number of pages extracted between checkpoints.
+    :type batch_size: int, optional
+    :param lock_timeout: Seconds without a checkpoint after which the lock of a
+           shard is stale. It must be longer than the extraction of a batch.
+    :type lock_timeout: float, optional
+    """
+
+    node_id: str = None
+    batch_size: int = 100
+    lock_timeout: float = 600
+
+
+class ShardRunner:
+    """
+    Extracts the shards of a corpus that aren't done or held by another node.
+
+    :param manifest: Path of the manifest of the corpus.
+    :type manifest: str
+    :param work_dir: Directory shared by the nodes. It's created if it doesn't
+           exist.
+    :type work_dir: str
+    :param nshards: Number of shards. All the nodes must use the same.
+    :type nshards: int
+    :param node: Settings of the locks and checkpoints of this node.
+    :type node: :class:`NodeSettings`, optional
+    :param mode: Kind of workers. See :class:`fakepilot.batch.BatchExtractor`.
+    :type mode: str, optional
+    :param workers: Number of workers.
+    :type workers: int, optional
+    :param memory_budget: Memory budget of the pages in flight, in bytes. See
+           :class:`fakepilot.batch.BatchExtractor`.
+    :type memory_budget: int, optional
+    :param extract_kwargs: Arguments of :meth:`fakepilot.batch.BatchExtractor.map`,
+           e.g. ``with_reviews``.
+    :ivar node: Settings of this node, with its id.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        manifest,
+        work_dir,
+        nshards,
+        *,
+        node=None,
+        mode="thread",
+        workers=1,
+        memory_budget=None,
+        **extract_kwargs,
+    ):
+        self.pages = read_manifest(manifest)
+        self.base_dir = os.path.dirname(os.path.abspath(manifest))
+        self.work_dir = work_dir
+        self.nshards = nshards
+        node = node or NodeSettings()
+        self.node = node._replace(
+            node_id=node.node_id or f"{socket.gethostname()}-{os.getpid()}"
+        )
+        # The spec is sent once to the workers
+        self._extractor_kwargs = {
+            "mode": mode,
+            "workers": workers,
+            "memory_budget": memory_budget,
+            "spec": extract_kwargs.pop("spec", None),
+        }
+        self.extract_kwargs = extract_kwargs
+
+        os.makedirs(work_dir, exist_ok=True)
+        self._check_manifest()
+
+    def _path(self, shard, suffix):
+        """Return the path of a file of a shard."""
+        return os.path.join(self.work_dir, f"shard-{shard:05d}.{suffix}")
+
+    def _check_manifest(self):
+        """Check that all the nodes run the same corpus and shards."""
+        path = os.path.join(self.work_dir, "manifest.json")
+        digest = hashlib.blake2b("\n".join(self.pages).encode("utf-8"))
+        info = {"nshards": self.nshards, "digest": digest.hexdigest()}
+
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            with open(path, encoding="utf-8") as file:
+                stored = json.load(file)
+
+            if stored != info:
+                raise ValueError(
+                    f"{self.work_dir} is used by a run of another manifest or "
+                    "number of shards."
+                ) from None
+        else:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(info, file)
+
+    def checkpoint(self, shard):
+        """
+        Return the checkpoint of a shard.
+
+        :return: The number of pages done (``'done'``), the name of the file
+                 of their results in the work directory (``'results'``),
+                 their size (``'offset'``) and whether the shard is done
+                 (``'complete'``).
+        :rtype: dict(str, )
+        """
+
+        try:
+            with open(self._path(shard, "checkpoint"), encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {"done": 0, "results": None, "offset": 0, "complete": False}
+
+    def run(self):
+        """
+        Extract the shards that aren't done, until all of them are done or
+        held by other nodes.
+
+        Every node tries the shards from a different one, to avoid waiting
+        for the same locks.
+
+        :return: The shards extracted by this node.
+        :rtype: list(int)
+        """
+
+        shards = partition(self.pages, self.nshards)
+        first = shard_of(self.node.node_id, self.nshards)
+        done = []
+
+        with BatchExtractor(**self._extractor_kwargs) as extractor:
+            for offset in range(self.nshards):
+                shard = (first + offset) % self.nshards
+
+                if self.checkpoint(shard)["complete"]:
+                    continue
+
+                lock = ShardLock(
+                    self._path(shard, "lock"), self.node.node_id, self.node.lock_timeout
+                )
+
+                if not lock.acquire():
+                    continue
+
+                try:
+                    # It may have been completed before the lock was taken
+                    if not self.checkpoint(shard)["complete"]:
+                        self._run_shard(shard, shards[shard], extractor, lock)
+                        done.append(shard)
+                except LockLost:
+                    continue
+                finally:
+                    lock.release()
+
+        return done
+
+    def _run_shard(self, shard, pages, extractor, lock):
+        """Extract the pages of a shard that aren't done."""
+        checkpoint = self.checkpoint(shard)
+        start = checkpoint["done"]
+        results = os.path.basename(self._path(shard, f"jsonl.{self.node.node_id}.tmp"))
+        path = os.path.join(self.work_dir, results)
+
+        with self._open_results(checkpoint, path) as output:
+            while start < len(pages):
+                batch = pages[start : start + self.node.batch_size]
+                records = extractor.map(
+                    [os.path.join(self.base_dir, page) for page in batch],
+                    return_exceptions=True,
+                    **self.extract_kwargs,
+                )
+
+                _write_records(output, batch, records)
+                start += len(batch)
+                lock.refresh()
+                self._save_checkpoint(shard, start, results, output.tell(), False)
+
+            size = output.tell()
+
+        lock.refresh()
+        os.replace(path, self._path(shard, "jsonl"))
+        self._save_checkpoint(
+            shard, start, os.path.basename(self._path(shard, "jsonl")), size, True
+        )
+
+    def _open_results(self, checkpoint, path):
+        """
+        Open the file of results of this node in ``path``, with the results
+        of the pages done in ``checkpoint``.
+
+        The node resumes its own results, or copies the results of the node
+        that held the lock before. The results written after the checkpoint
+        are extracted again.
+        """
+
+        if checkpoint["results"] == os.path.basename(path):
+            output = open(path, "r+b")  # pylint: disable=consider-using-with
+            output.truncate(checkpoint["offset"])
+            output.seek(0, os.SEEK_END)
+            return output
+
+        output = open(path, "wb")  # pylint: disable=consider-using-with
+
+        if checkpoint["results"] is not None:
+            previous = os.path.join(self.work_dir, checkpoint["results"])
+
+            with open(previous, "rb") as file:
+                _copy_prefix(file, output, checkpoint["offset"])
+
+            os.remove(previous)
+
+        return output
+
+    def _save_checkpoint(self, shard, done, results, offset, complete):
+        """Replace the checkpoint of a shard."""
+        _write_atomic(
+            self._path(shard, "checkpoint"),
+            json.dumps(
+                {
+                    "done": done,
+                    "results": results,
+                    "offset": offset,
+                    "complete": complete,
+                }
+            ),
+        )
+
+    def is_complete(self):
+        """Return whether all the shards are done."""
+        return all(self.checkpoint(shard)["complete"] for shard in range(self.nshards))
+
+    def results(self):
+        """
+        Yield the results of the pages done, shard by shard.
+
+        :return: The records of the pages. See the module's documentation.
+        :rtype: iterator(dict(str, ))
+        """
+
+        for shard in range(self.nshards):
+            data = self._read_results(shard)
+
+            for line in data.splitlines():
+                yield loads(line)
+
+    def _read_results(self, shard):
+        """Return the results of the pages of a shard done."""
+        while True:
+            checkpoint = self.checkpoint(shard)
+
+            if not checkpoint["offset"]:
+                return b""
+
+            path = os.path.join(self.work_dir, checkpoint["results"])
+
+            try:
+                with open(path, "rb") as file:
+                    return file.read(checkpoint["offset"])
+            except FileNotFoundError:
+                # The node that holds the shard moved its results after the
+                # checkpoint was read
+                continue
+
+
+def main(argv=None):
+    """Run a node from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="python -m fakepilot.runner",
+        description="Extract the shards of a corpus of pages.",
+    )
+    parser.add_argument("manifest", help="file with the path of a page per line")
+    parser.add_argument("work_dir", help="directory shared by the nodes")
+    parser.add_argument("--shards", type=int, required=True, help="number of shards")
+    parser.add_argument("--node", help="id of this node")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--lock-timeout", type=float, default=600)
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--memory-budget", type=int, help="memory of the pages in flight, in bytes"
+    )
+    parser.add_argument("--with-reviews", action="store_true")
+    parser.add_argument("--nreviews", type=int, default=5)
+    parser.add_argument("--spec", help="JSON file with the spec of the fields")
+    args = parser.parse_args(argv)
+
+    runner = ShardRunner(
+        args.manifest,
+        args.work_dir,
+        args.shards,
+        node=NodeSettings(args.node, args.batch_size, args.lock_timeout),
+        mode=args.mode,
+        workers=args.workers,
+        memory_budget=args.memory_budget,
+        with_reviews=args.with_reviews,
+        nreviews=args.nreviews,
+        spec=args.spec,
+    )
+    done = runner.run()
+    print(f"Extracted {len(done)} shards. All done: {runner.is_complete()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Random samples of the reviews of one or several pages.
+
+:func:`fakepilot.get_reviews` extracts the first reviews of a page, which
+are the newest ones. The samplers select the reviews of every card of the
+pages added to them instead, in a single pass and keeping at most the
+sample in memory:
+
+* :class:`ReservoirSampler` selects ``k`` reviews uniformly at random.
+* :class:`StratifiedSampler` selects ``k`` reviews of every star rating
+  uniformly at random.
+
+The cards are selected with reservoir sampling before being extracted.
+Only the selected cards that are still in the sample when the page has
+been added are extracted, with the extraction plan of the sampler's spec.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import random
+
+from . import xray
+from .spec import get_plan
+
+
+def _offer(reservoir, item, rng):
+    """
+    Add the next item of a stream to its uniform sample, a reservoir with the
+    ``'size'`` of the sample, its ``'items'`` and the number of items
+    ``'seen'``, with its probability (algorithm R).
+    """
+
+    size = reservoir["size"]
+    items = reservoir["items"]
+
+    if len(items) < size:
+        items.append(item)
+    elif size:
+        pos = rng.randrange(reservoir["seen"] + 1)
+
+        if pos < size:
+            items[pos] = item
+
+    reservoir["seen"] += 1
+
+
+class ReservoirSampler:
+    """
+    Uniform random sample of the reviews of a stream of pages.
+
+    Every review of the added pages has the same probability of being in
+    the sample.
+
+    :param k: Size of the sample.
+    :type k: int
+    :param seed: Seed of the random number generator. The same pages added
+           with the same seed give the same sample.
+    :type seed: int, optional
+    :param spec: Spec of the extracted fields. See
+           :func:`fakepilot.extract_info`.
+    :type spec: :class:`fakepilot.spec.ExtractionPlan` or dict(str, ) or
+           str, optional
+    """
+
+    #: Whether the reviews are sampled by star rating.
+    stratified = False
+
+    def __init__(self, k, seed=None, spec=None):
+        self.k = k
+        self.plan = get_plan(spec)
+        # The samples aren't used for security, only their reproducibility
+        # matters
+        self._rng = random.Random(seed)  # nosec B311
+        self._reservoirs = {}
+        self._nadded = 0
+
+    @property
+    def seen(self):
+        """Number of reviews of the added pages."""
+        return sum(reservoir["seen"] for reservoir in self._reservoirs.values())
+
+    def _size(self, stratum):
+        """
+        Return the size of the sample of a stratum, the star rating of its
+        reviews, or ``None`` if they aren't stratified.
+        """
+
+        return self.k.get(stratum, 0) if isinstance(self.k, dict) else self.k
+
+    def _reservoir(self, stratum):
+        """Return the sample of a stratum, created on its first review."""
+        reservoir = self._reservoirs.get(stratum)
+
+        if reservoir is None:
+            reservoir = {"size": self._size(stratum), "items": [], "seen": 0}
+            self._reservoirs[stratum] = reservoir
+
+        return reservoir
+
+    def add_page(self, company_page, index=None, selectors=None, source=None):
+        """
+        Add the reviews of a page to the stream.
+
+        :param company_page: Parsed company's page.
+        :type company_page: :class:`bs4.BeautifulSoup`
+        :param index: Index of the page. It is built if it isn't given.
+        :type index: :class:`fakepilot.xray.PageIndex`, optional
+        :param selectors: Selectors that matched on pages with the same
+               structure. See :func:`fakepilot.xray.select_all`.
+        :type selectors: dict(str, str), optional
+        :param source: Value returned with the sampled reviews of the page,
+               e.g. the company's URL.
+        """
+
+        index = xray.get_index(company_page, index)
+        plan = self.plan
+
+        for card in plan.review_cards(company_page, index, selectors):
+            if self.stratified:
+                review = plan.extract_review(card, index, ("star_rating",))
+                stratum = int(review["star_rating"])
+            else:
+                stratum = None
+
+            _offer(self._reservoir(stratum), (self._nadded, source, card), self._rng)
+            self._nadded += 1
+
+        # Only the cards of this page still in the sample are extracted, while
+        # the page is in memory
+        for reservoir in self._reservoirs.values():
+            items = reservoir["items"]
+
+            for pos, (order, item_source, item) in enumerate(items):
+                if not isinstance(item, dict):
+                    items[pos] = (order, item_source, plan.extract_review(item, index))
+
+    def sample(self):
+        """
+        Return the sampled reviews.
+
+        :return: Pairs of the ``source`` of the page of a review and the
+                 review, as returned by
+                 :func:`fakepilot.xray.extract_review_info`, in the order of
+                 the stream.
+        :rtype: list(tuple)
+        """
+
+        items = sorted(
+            item
+            for reservoir in self._reservoirs.values()
+            for item in reservoir["items"]
+        )
+        return [(source, review) for _order, source, review in items]
+
+
+class StratifiedSampler(ReservoirSampler):
+    """
+    Random sample of the reviews of a stream of pages, stratified by their
+    star rating.
+
+    Every review with a given rating has the same probability of being in
+    the sample. The rating of every card is extracted to select it, as in
+    the sampler's spec.
+
+    :param k: Size of the sample of every rating, or a dictionary with the
+           size of the sample of every rating, from 1 to 5. The ratings that
+           aren't in the dictionary aren't sampled.
+    :type k: int or dict(int, int)
+    :param seed: Seed of the random number generator.
+    :type seed: int, optional
+    :param spec: Spec of the extracted fields.
+    :type spec: :class:`fakepilot.spec.ExtractionPlan` or dict(str, ) or
+           str, optional
+    """
+
+    stratified = True
+
+
+#: Samplers by the name of their sampling mode.
+SAMPLERS = {"uniform": ReservoirSampler, "stratified": StratifiedSampler}
+
+
+def sample_pages(files, k, sample="uniform", seed=None, spec=None):
+    """
+    Return a random sample of the reviews of several pages.
+
+    :param files: Company's pages. See :func:`fakepilot.extract_info`.
+    :type files: iterable(file object)
+    :param k: Size of the sample. See :class:`ReservoirSampler` and
+           :class:`StratifiedSampler`.
+    :type k: int or dict(int, int)
+    :param sample: Sampling mode, ``'uniform'`` or ``'stratified'`` by star
+           rating.
+    :type sample: str, optional
+    :param seed: Seed of the random number generator.
+    :type seed: int, optional
+    :param spec: Spec of the extracted fields. See
+           :func:`fakepilot.extract_info`.
+    :type spec: :class:`fakepilot.spec.ExtractionPlan` or dict(str, ) or
+           str, optional
+    :return: Pairs of the position of the page of a review in ``files`` and
+             the review.
+    :rtype: list(tuple(int, dict(str, )))
+    """
+
+    sampler = SAMPLERS[sample](k, seed, spec)
+
+    for pos, file in enumerate(files):
+        sampler.add_page(xray.parse_page(file), source=pos)
+
+    return sampler.sample()
@@ -0,0 +1,590 @@
+"""
+On-disk inverted index of the extracted reviews.
+
+The reviews returned by :func:`fakepilot.extract_info` are added to a
+:class:`ReviewIndexWriter`, which writes them to the index directory in
+immutable segments. Every segment has the sorted array of the terms of the
+normalized title and content of its reviews, the postings list of every
+term, the arrays of the ratings, countries and dates used as filters, and
+the stored reviews. The arrays are NumPy files opened as memory maps by
+:class:`ReviewIndex`, so a query only reads the pages of the postings lists
+of its terms.
+
+Every segment is named after the number given to it by its writer, e.g.
+``segment-000007``, and a writer claims a number by creating a file
+exclusively, so concurrent writers never take the same one. Small
+consecutive segments are merged by :meth:`ReviewIndexWriter.merge` into a
+segment named after their range of numbers, e.g. ``segment-000003-000007``,
+which hides them until they are removed.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import datetime
+import json
+import mmap
+import os
+import shutil
+import tempfile
+
+from ._optional import require_numpy
+from .dedup import normalize_text
+
+np = require_numpy(__name__)
+
+#: Maximum number of characters of an indexed term. Longer terms are cut.
+MAX_TERM_LENGTH = 32
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_SECOND = datetime.timedelta(seconds=1)
+_SEGMENT_PREFIX = "segment-"
+
+
+def tokenize(text):
+    """Return the normalized terms of ``text``."""
+    return [term[:MAX_TERM_LENGTH] for term in normalize_text(text or "").split()]
+
+
+def _seconds(date):
+    """Return the seconds since the epoch of a date."""
+    return (date - _EPOCH) // _SECOND
+
+
+def _segment_name(first, last=None):
+    """Return the name of a segment from its range of numbers."""
+    if last is None:
+        return f"{_SEGMENT_PREFIX}{first:06d}"
+
+    return f"{_SEGMENT_PREFIX}{first:06d}-{last:06d}"
+
+
+def _segment_range(name):
+    """Return the first and last numbers of a segment, or ``None``."""
+    if not name.startswith(_SEGMENT_PREFIX):
+        return None
+
+    numbers = name[len(_SEGMENT_PREFIX) :].split("-")
+
+    if len(numbers) > 2 or not all(number.isdigit() for number in numbers):
+        return None
+
+    return int(numbers[0]), int(numbers[-1])
+
+
+def _ranges(names):
+    """Yield the names of the segments among ``names`` and their ranges."""
+    for name in names:
+        numbers = _segment_range(name)
+
+        if numbers is not None:
+            yield name, numbers
+
+
+def _segments(path):
+    """
+    Return the names of the segments of an index directory, in the order
+    they were written, and the names of the segments hidden by a merge.
+    """
+
+    ranges = sorted(
+        (numbers[0], -numbers[1], name) for name, numbers in _ranges(os.listdir(path))
+    )
+    visible = []
+    hidden = []
+    covered = -1
+
+    for _, last, name in ranges:
+        if -last <= covered:
+            hidden.append(name)
+        else:
+            visible.append(name)
+            covered = -last
+
+    return visible, hidden
+
+
+def _create_exclusive(path):
+    """
+    Create an empty file, if it doesn't exist.
+
+    :return: Whether it was created.
+    :rtype: bool
+    """
+
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+    except FileExistsError:
+        return False
+
+    return True
+
+
+class ReviewIndexWriter:
+    """
+    Adds reviews to an index directory.
+
+    The reviews are kept in memory until ``segment_size`` of them are
+    added, or :meth:`flush` or :meth:`close` are called, and then they are
+    written as a new segment. A segment is written to a temporary directory
+    and renamed, so readers never see a partial segment.
+
+    :param path: Index directory. It's created if it doesn't exist.
+    :type path: str
+    :param segment_size: Number of reviews of every segment.
+    :type segment_size: int, optional
+    """
+
+    def __init__(self, path, segment_size=100000):
+        self.path = path
+        self.segment_size = segment_size
+        self._docs = []
+        os.makedirs(path, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, company, key="url"):
+        """
+        Add the reviews of a company.
+
+        :param company: Company's information returned by
+               :func:`fakepilot.extract_info` with its reviews.
+        :type company: dict(str, )
+        :param key: Field of the company stored with its reviews.
+        :type key: str, optional
+        """
+
+        for review in company.get("reviews", ()):
+            self.add_review(company[key], review)
+
+    def add_review(self, company, review):
+        """
+        Add a review of a company.
+
+        :param company: Key of the company, e.g. its URL.
+        :type company: str
+        :param review: Review returned by
+               :func:`fakepilot.xray.extract_review_info`.
+        :type review: dict(str, )
+        """
+
+        self._docs.append((company, review))
+
+        if len(self._docs) >= self.segment_size:
+            self.flush()
+
+    def flush(self):
+        """Write the reviews in memory as a new segment."""
+        if not self._docs:
+            return
+
+        docs, self._docs = self._docs, []
+        temp_path = self._write_temp_segment(docs)
+        number, claim = self._claim_number()
+
+        try:
+            os.rename(temp_path, os.path.join(self.path, _segment_name(number)))
+        finally:
+            os.remove(claim)
+
+    def close(self):
+        """Write the reviews in memory."""
+        self.flush()
+
+    def merge(self, min_size=None):
+        """
+        Merge every run of consecutive segments with fewer than ``min_size``
+        reviews into one segment.
+
+        The merged segment hides its sources, which are then removed. The
+        readers that still use them keep reading them until they are
+        refreshed. Only one writer merges at a time: if the index is being
+        merged, nothing is done. A merge that was interrupted leaves the
+        file ``.merge.lock`` in the index directory, which has to be
+        removed before the next merge.
+
+        :param min_size: Number of reviews of a segment that isn't merged.
+               By default, the ``segment_size`` of the writer.
+        :type min_size: int, optional
+        :return: The number of merged segments.
+        :rtype: int
+        """
+
+        if min_size is None:
+            min_size = self.segment_size
+
+        lock = os.path.join(self.path, ".merge.lock")
+
+        if not _create_exclusive(lock):
+            return 0
+
+        try:
+            runs = self._small_runs(min_size)
+
+            for run in runs:
+                self._merge_run(run)
+
+            return sum(len(run) for run in runs)
+        finally:
+            os.remove(lock)
+
+    def _claim_number(self):
+        """
+        Claim the number of a new segment.
+
+        :return: The number and the file that claims it, to be removed once
+                 the segment is renamed to its number.
+        :rtype: tuple(int, str)
+        """
+
+        while True:
+            # The claims are the names of the segments starting with a dot
+            names = (name.lstrip(".") for name in os.listdir(self.path))
+            number = 1 + max((numbers[1] for _, numbers in _ranges(names)), default=-1)
+            claim = os.path.join(self.path, f".{_segment_name(number)}")
+
+            if not _create_exclusive(claim):
+                continue
+
+            # The number may have been used and merged after it was chosen
+            # and before it was claimed
+            visible, hidden = _segments(self.path)
+            if all(_segment_range(name)[1] < number for name in visible + hidden):
+                return number, claim
+
+            os.remove(claim)
+
+    def _small_runs(self, min_size):
+        """
+        Return the runs of at least two consecutive segments with fewer than
+        ``min_size`` reviews, as lists of their names.
+        """
+
+        runs = [[]]
+        last = None
+
+        for name in _segments(self.path)[0]:
+            numbers = _segment_range(name)
+            size = len(np.load(self._star_rating_path(name), mmap_mode="r"))
+
+            if size >= min_size or (runs[-1] and numbers[0] != last + 1):
+                runs.append([])
+
+            if size < min_size:
+                runs[-1].append(name)
+
+            last = numbers[1]
+
+        return [run for run in runs if len(run) > 1]
+
+    def _star_rating_path(self, name):
+        """Return the path of the ratings of a segment."""
+        return os.path.join(self.path, name, "star_rating.npy")
+
+    def _merge_run(self, run):
+        """Merge a run of consecutive segments and remove them."""
+        docs = []
+
+        for name in run:
+            segment = _Segment(os.path.join(self.path, name))
+
+            for doc in segment.documents(range(len(segment))):
+                docs.append((doc.pop("company"), doc))
+
+        first, last = _segment_range(run[0])[0], _segment_range(run[-1])[1]
+        os.rename(
+            self._write_temp_segment(docs),
+            os.path.join(self.path, _segment_name(first, last)),
+        )
+
+        # The segments hidden by an interrupted merge are removed as well
+        for name in _segments(self.path)[1]:
+            numbers = _segment_range(name)
+            if first <= numbers[0] and numbers[1] <= last:
+                shutil.rmtree(os.path.join(self.path, name))
+
+    def _write_temp_segment(self, docs):
+        """Write a segment to a new temporary directory and return its path."""
+        temp_path = tempfile.mkdtemp(dir=self.path, prefix=".tmp-")
+
+        try:
+            self._write_segment(temp_path, docs)
+        except BaseException:
+            shutil.rmtree(temp_path)
+            raise
+
+        return temp_path
+
+    @staticmethod
+    def _write_segment(path, docs):
+        """Write the files of a segment."""
+        postings, columns = _write_documents(path, docs)
+        _write_postings(path, postings)
+
+        for name, column in columns.items():
+            np.save(os.path.join(path, f"{name}.npy"), column)
+
+
+def _write_documents(path, docs):
+    """
+    Write the stored reviews of a segment and the names of its countries.
+
+    :return: The ids of the reviews of every term, and the columns of the
+             segment by name.
+    :rtype: tuple(dict(str, list(int)), dict(str, :class:`numpy.ndarray`))
+    """
+
+    postings = {}
+    countries = {}
+    country_codes = np.empty(len(docs), dtype=np.int32)
+    doc_offsets = np.empty(len(docs) + 1, dtype=np.int64)
+    doc_offsets[0] = 0
+
+    with open(os.path.join(path, "docs.jsonl"), "wb") as file:
+        for doc_id, (company, review) in enumerate(docs):
+            terms = tokenize(review.get("title")) + tokenize(review.get("content"))
+
+            for term in set(terms):
+                postings.setdefault(term, []).append(doc_id)
+
+            country_codes[doc_id] = countries.setdefault(
+                review.get("country"), len(countries)
+            )
+            stored = {"company": company}
+            stored.update(review)
+            for field in ("date", "date_experience"):
+                if isinstance(stored.get(field), datetime.datetime):
+                    stored[field] = stored[field].isoformat()
+
+            line = (json.dumps(stored, ensure_ascii=False) + "\n").encode("utf-8")
+            file.write(line)
+            doc_offsets[doc_id + 1] = doc_offsets[doc_id] + len(line)
+
+    with open(os.path.join(path, "countries.json"), "w", encoding="utf-8") as file:
+        json.dump(list(countries), file)
+
+    return postings, {
+        "star_rating": np.array(
+            [int(review["star_rating"]) for _, review in docs], dtype=np.int8
+        ),
+        "date": np.array(
+            [_seconds(review["date"]) for _, review in docs], dtype=np.int64
+        ),
+        "country": country_codes,
+        "doc_offsets": doc_offsets,
+    }
+
+
+def _write_postings(path, postings):
+    """Write the sorted terms of a segment and the ids of their reviews."""
+    terms = sorted(postings)
+    lengths = [len(postings[term]) for term in terms]
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    np.save(
+        os.path.join(path, "terms.npy"),
+        np.array(terms, dtype=f"U{MAX_TERM_LENGTH}"),
+    )
+    np.save(os.path.join(path, "offsets.npy"), offsets)
+    np.save(
+        os.path.join(path, "postings.npy"),
+        np.fromiter(
+            (doc_id for term in terms for doc_id in postings[term]),
+            dtype=np.int32,
+            count=int(offsets[-1]),
+        ),
+    )
+
+
+class _Segment:
+    """Memory-mapped arrays of a segment of the index."""
+
+    def __init__(self, path):
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.terms = load("terms")
+        self.offsets = load("offsets")
+        self.postings = load("postings")
+        self.doc_offsets = load("doc_offsets")
+        # The fields of the reviews the searches filter by
+        self.columns = {name: load(name) for name in ("star_rating", "date", "country")}
+
+        # Like the arrays, the stored reviews can be read after the segment
+        # is removed by a merge
+        with open(os.path.join(path, "docs.jsonl"), "rb") as file:
+            self.docs = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        with open(os.path.join(path, "countries.json"), encoding="utf-8") as file:
+            self.countries = {
+                country: code for code, country in enumerate(json.load(file))
+            }
+
+    def __len__(self):
+        return len(self.doc_offsets) - 1
+
+    def postings_of(self, term):
+        """Return the sorted ids of the reviews with ``term``."""
+        pos = np.searchsorted(self.terms, term)
+
+        if pos == len(self.terms) or self.terms[pos] != term:
+            return np.zeros(0, dtype=np.int32)
+
+        return self.postings[self.offsets[pos] : self.offsets[pos + 1]]
+
+    def search(self, terms, star_rating, country, date_from, date_to):
+        """Return the ids of the reviews that match a query."""
+        if terms:
+            postings = sorted((self.postings_of(term) for term in terms), key=len)
+            ids = np.asarray(postings[0])
+
+            for other in postings[1:]:
+                if ids.size == 0:
+                    break
+                ids = np.intersect1d(ids, other, assume_unique=True)
+        else:
+            ids = np.arange(len(self), dtype=np.int32)
+
+        if star_rating is not None:
+            ids = ids[np.isin(self.columns["star_rating"][ids], star_rating)]
+
+        if country is not None:
+            codes = [self.countries[name] for name in country if name in self.countries]
+            ids = ids[np.isin(self.columns["country"][ids], codes)]
+
+        if date_from is not None:
+            ids = ids[self.columns["date"][ids] >= _seconds(date_from)]
+
+        if date_to is not None:
+            ids = ids[self.columns["date"][ids] < _seconds(date_to)]
+
+        return ids
+
+    def documents(self, ids):
+        """Return the stored reviews of ``ids``."""
+        docs = []
+
+        for doc_id in ids:
+            doc = json.loads(
+                self.docs[self.doc_offsets[doc_id] : self.doc_offsets[doc_id + 1]]
+            )
+
+            for field in ("date", "date_experience"):
+                if doc.get(field):
+                    doc[field] = datetime.datetime.fromisoformat(doc[field])
+
+            docs.append(doc)
+
+        return docs
+
+
+class ReviewIndex:
+    """
+    Searches an index directory written by :class:`ReviewIndexWriter`.
+
+    :param path: Index directory.
+    :type path: str
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._segments = {}
+        self.refresh()
+
+    def __len__(self):
+        return sum(len(segment) for segment in self._segments.values())
+
+    def refresh(self):
+        """
+        Open the segments written since the index was opened, and replace
+        the merged segments by the result of their merge.
+        """
+
+        while True:
+            try:
+                self._segments = {
+                    name: self._segments.get(name)
+                    or _Segment(os.path.join(self.path, name))
+                    for name in _segments(self.path)[0]
+                }
+            except FileNotFoundError:
+                # A segment was removed by a merge after it was listed
+                continue
+
+            return
+
+    def search(  # pylint: disable=too-many-arguments
+        self,
+        query="",
+        *,
+        star_rating=None,
+        country=None,
+        date_from=None,
+        date_to=None,
+        limit=None,
+    ):
+        """
+        Return the reviews that have all the terms of ``query`` in their
+        title or content and match the filters.
+
+        :param query: Terms to search. They are normalized as the indexed
+               text. If it's empty, only the filters are applied.
+        :type query: str, optional
+        :param star_rating: Rating or ratings of the reviews.
+        :type star_rating: int or iterable(int), optional
+        :param country: Country or countries of the authors, e.g. ``'ES'``.
+        :type country: str or iterable(str), optional
+        :param date_from: First publication date, included.
+        :type date_from: :class:`datetime.datetime`, optional
+        :param date_to: Last publication date, excluded.
+        :type date_to: :class:`datetime.datetime`, optional
+        :param limit: Maximum number of returned reviews.
+        :type limit: int, optional
+        :return: The stored reviews, with the key of their company under
+                 ``'company'``, in the order they were added.
+        :rtype: list(dict(str, ))
+        """
+
+        found = []
+
+        for segment, ids in self._matches(
+            query, star_rating, country, date_from, date_to
+        ):
+            if limit is not None:
+                ids = ids[: limit - len(found)]
+
+            found.extend(segment.documents(ids))
+
+            if limit is not None and len(found) >= limit:
+                break
+
+        return found
+
+    def count(
+        self, query="", *, star_rating=None, country=None, date_from=None, date_to=None
+    ):
+        """Return the number of reviews that match a query. See :meth:`search`."""
+        return sum(
+            len(ids)
+            for _, ids in self._matches(query, star_rating, country, date_from, date_to)
+        )
+
+    def _matches(self, query, star_rating, country, date_from, date_to):
+        """Yield every segment and the ids of its reviews that match a query."""
+        terms = sorted(set(tokenize(query)))
+
+        if star_rating is not None:
+            star_rating = np.atleast_1d(star_rating).astype(np.int8)
+
+        if isinstance(country, str):
+            country = [country]
+
+        for segment in self._segments.values():
+            yield (
+                segment,
+                segment.search(terms, star_rating, country, date_from, date_to),
+            )
@@ -0,0 +1,178 @@
+"""
+Cache of the selectors that matched on pages with the same structure.
+
+Trustpilot's class names are generated by CSS modules, so the markup of
+the pages changes between deployments. The extractors try several
+selectors for the elements that differ between layouts (see
+:data:`fakepilot.xray.SELECTOR_FALLBACKS`). The pages served by the same
+deployment share the class names of the containers the extractors look up,
+whatever the company, so a hash of those class names is used as the page's
+fingerprint, and the selectors that matched on a page are reused for the
+next pages with the same fingerprint. The cache keeps the selectors of the
+most recently used fingerprints only.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+#: Class-name prefixes of the containers looked up by the extractors. Every
+#: page of a layout has the ones of its layout, and the hashes of their class
+#: names change with the deployment, unlike the prefixes of the contents of a
+#: page, such as its contact details.
+FINGERPRINT_PREFIXES = (
+    "title_displayName",
+    "link_internal",
+    "styles_businessInfoSideBar",
+    "styles_reviewListContainer",
+)
+
+#: Default number of fingerprints kept by a :class:`SelectorCache`.
+MAXSIZE = 128
+
+
+def page_fingerprint(index, prefixes=FINGERPRINT_PREFIXES):
+    """
+    Return the structural fingerprint of an indexed page.
+
+    :param index: Index of the page.
+    :type index: :class:`fakepilot.xray.PageIndex`
+    :param prefixes: Class-name prefixes of the fingerprinted elements.
+    :type prefixes: sequence(str), optional
+    :return: Hexadecimal digest of the class names with the ``prefixes``.
+    :rtype: str
+    """
+
+    digest = hashlib.blake2b(digest_size=8)
+
+    for prefix in prefixes:
+        for class_name in index.class_names(prefix):
+            digest.update(class_name.encode("utf-8"))
+            digest.update(b"\0")
+
+        # A missing prefix changes the fingerprint too
+        digest.update(b"\1")
+
+    return digest.hexdigest()
+
+
+class SelectorCache:
+    """
+    Mapping from page fingerprints to the selectors that matched on them.
+
+    A fingerprint that isn't in the cache is a miss. Misses are counted,
+    logged with the ``fakepilot.selector_cache`` logger and, if given,
+    reported to ``on_miss``, so that a new Trustpilot deployment can be
+    noticed. The cache can be used by several threads.
+
+    :param path: JSON file the cache is loaded from, if it exists, and
+           saved to with :meth:`save`.
+    :type path: str, optional
+    :param on_miss: Function called with the fingerprint of every miss.
+    :type on_miss: callable, optional
+    :param maxsize: Maximum number of fingerprints. The least recently used
+           one is dropped when another one is added.
+    :type maxsize: int, optional
+    """
+
+    def __init__(self, path=None, on_miss=None, maxsize=MAXSIZE):
+        if maxsize < 1:
+            raise ValueError("The size of the selector cache must be positive.")
+
+        self.path = path
+        self.on_miss = on_miss
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path is not None and os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                self._entries.update(json.load(file))
+
+            self._evict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self._entries
+
+    @staticmethod
+    def fingerprint(index):
+        """Return the fingerprint of an indexed page. See :func:`page_fingerprint`."""
+        return page_fingerprint(index)
+
+    def get(self, fingerprint):
+        """
+        Return a copy of the selectors stored for ``fingerprint``.
+
+        :return: The stored selectors, or an empty dictionary on a miss.
+        :rtype: dict(str, str)
+        """
+
+        with self._lock:
+            selectors = self._entries.get(fingerprint)
+
+            if selectors is not None:
+                self.hits += 1
+                self._entries.move_to_end(fingerprint)
+                return dict(selectors)
+
+            self.misses += 1
+
+        logger.info("Selector cache miss for page fingerprint %s", fingerprint)
+
+        if self.on_miss is not None:
+            self.on_miss(fingerprint)
+
+        return {}
+
+    def update(self, fingerprint, selectors):
+        """Store the selectors that matched on a page with ``fingerprint``."""
+        with self._lock:
+            self._entries.setdefault(fingerprint, {}).update(selectors)
+            self._entries.move_to_end(fingerprint)
+            self._evict()
+
+    def _evict(self):
+        """Drop the least recently used fingerprints over the maximum size."""
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def save(self, path=None):
+        """
+        Write the cache as JSON to ``path`` or, if it isn't given, to the
+        path it was created with.
+
+        The file is replaced atomically, so a reader never sees a partial
+        cache.
+        """
+
+        path = path or self.path
+
+        if path is None:
+            raise ValueError("There is no path to save the selector cache to.")
+
+        with self._lock:
+            content = json.dumps(self._entries, indent=2, sort_keys=True)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                file.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
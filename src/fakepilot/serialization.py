@@ -0,0 +1,50 @@
+"""
+Lines of JSON with the companies' information returned by
+:func:`fakepilot.extract_info`.
+
+JSON can't represent its dates nor the integer keys of the rating
+distribution, so they are replaced by tagged objects, ``{"$datetime": ...}``
+and ``{"$items": [[key, value], ...]}``, and restored when a line is decoded.
+The daemon's protocol and the results of the runner use these lines.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import datetime
+import json
+
+
+def _to_json(obj):
+    """
+    Return ``obj`` with the values that JSON can't represent, dates and
+    dictionaries with non-string keys, replaced by tagged objects.
+    """
+
+    if isinstance(obj, datetime.datetime):
+        return {"$datetime": obj.isoformat()}
+    if isinstance(obj, dict):
+        if all(isinstance(key, str) for key in obj):
+            return {key: _to_json(value) for key, value in obj.items()}
+        return {"$items": [[key, _to_json(value)] for key, value in obj.items()]}
+    if isinstance(obj, (list, tuple)):
+        return [_to_json(value) for value in obj]
+    return obj
+
+
+def _from_json(obj):
+    """Restore the values replaced by :func:`_to_json`."""
+    if "$datetime" in obj:
+        return datetime.datetime.fromisoformat(obj["$datetime"])
+    if "$items" in obj:
+        return dict(obj["$items"])
+    return obj
+
+
+def dumps(message):
+    """Encode a message as a line of JSON."""
+    return (json.dumps(_to_json(message), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def loads(line):
+    """Decode a line encoded by :func:`dumps`."""
+    return json.loads(line, object_hook=_from_json)
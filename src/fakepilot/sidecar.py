@@ -0,0 +1,213 @@
+"""
+Sidecar index of the byte ranges of the review cards of a page.
+
+:func:`fakepilot.extract_info` writes it when it's given the ``sidecar``
+path. It's a JSON file with the encoding of the page and the start and end
+offsets and author id of every card of the reviews' section in the page's
+bytes, in document order. A review can be extracted later by reading only
+its range of the page and parsing that fragment, instead of the whole page.
+
+The ranges are found by scanning the bytes for the start tags with the
+cards' attribute and balancing their tag names up to the matching end tag,
+so they are offsets in the page as stored. A page read as text is encoded
+again in the encoding of its file, or UTF-8, so its ranges are right if it
+was stored in that encoding and its line endings weren't translated.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import json
+import os
+import re
+
+from . import xray
+from .spec import get_plan
+
+CARD_ATTRIBUTE = "data-service-review-card-paper"
+SIDECAR_SUFFIX = ".cards.json"
+
+_CARD_ATTRIBUTE_BYTES = CARD_ATTRIBUTE.encode("ascii")
+_START_TAG_RE = re.compile(
+    rb"""<([A-Za-z][\w:-]*)(?:\s(?:[^>"']|"[^"]*"|'[^']*')*)?>"""
+)
+
+
+def sidecar_path(page_path):
+    """Return the default path of the sidecar index of a page."""
+    return os.fspath(page_path) + SIDECAR_SUFFIX
+
+
+def card_ranges(data):
+    """
+    Return the byte ranges of the review cards of a page.
+
+    :param data: The page as stored.
+    :type data: bytes
+    :return: The start and end offset of every card, in document order.
+    :rtype: list(tuple(int, int))
+    """
+
+    ranges = []
+    pos = data.find(_CARD_ATTRIBUTE_BYTES)
+
+    while pos != -1:
+        start = data.rfind(b"<", 0, pos)
+        start_tag = _START_TAG_RE.match(data, start)
+
+        # Only the attribute of a start tag, not a mention of it in a script
+        if start_tag is None or start_tag.end() <= pos:
+            pos = data.find(_CARD_ATTRIBUTE_BYTES, pos + 1)
+            continue
+
+        end = _end_of_element(data, start_tag)
+        ranges.append((start, end))
+        pos = data.find(_CARD_ATTRIBUTE_BYTES, end)
+
+    return ranges
+
+
+def _end_of_element(data, start_tag):
+    """Return the offset after the end tag of an element."""
+    name = re.escape(start_tag.group(1))
+    tags = re.compile(
+        rb"<(/?)" + name + rb"""(?:\s(?:[^>"']|"[^"]*"|'[^']*')*)?>""", re.I
+    )
+    depth = 1
+
+    for tag in tags.finditer(data, start_tag.end()):
+        if tag.group(1):
+            depth -= 1
+        elif not tag.group(0).endswith(b"/>"):
+            depth += 1
+
+        if not depth:
+            return tag.end()
+
+    return len(data)
+
+
+def write_sidecar(path, data, index, cards, *, encoding=None):
+    """
+    Write the sidecar index of a page.
+
+    :param path: Path of the sidecar index.
+    :type path: str
+    :param data: The page as stored.
+    :type data: bytes
+    :param index: Index of the parsed page.
+    :type index: :class:`fakepilot.xray.PageIndex`
+    :param cards: Review cards of the page to be indexed.
+    :type cards: list(:class:`bs4.Tag`)
+    :param encoding: Encoding of ``data``. By default, the one detected when
+           the page was parsed.
+    :type encoding: str, optional
+    :return: The entries of the cards, with the offsets of their range
+             (``'start'`` and ``'end'``) and their author id
+             (``'author_id'``).
+    :rtype: list(dict(str, ))
+    :raises ValueError: If the cards found in the bytes aren't the cards of
+            the parsed page.
+    """
+
+    # The ranges are of all the cards in the page, in the same order as the
+    # parsed ones
+    page = index.root
+    ranges = card_ranges(data)
+    all_cards = index.find_all(page, xray.SELECTORS["review_card"])
+
+    if len(ranges) != len(all_cards):
+        raise ValueError(
+            f"Found {len(ranges)} review cards in the page's bytes, "
+            f"but {len(all_cards)} in the parsed page."
+        )
+
+    positions = {id(card): pos for pos, card in enumerate(all_cards)}
+    entries = []
+
+    for card in cards:
+        start, end = ranges[positions[id(card)]]
+        entries.append(
+            {
+                "start": start,
+                "end": end,
+                "author_id": xray.extract_review_author_id(card, index),
+            }
+        )
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "size": len(data),
+                "encoding": encoding or page.original_encoding or "utf-8",
+                "cards": entries,
+            },
+            file,
+        )
+
+    return entries
+
+
+def load_sidecar(path):
+    """
+    Return a sidecar index written by :func:`write_sidecar`.
+
+    :return: The size and encoding of the page (``'size'`` and
+             ``'encoding'``) and the entries of its cards (``'cards'``).
+    :rtype: dict(str, )
+    """
+
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def read_review(page_path, position=None, author_id=None, sidecar=None, spec=None):
+    """
+    Extract a review of a page by parsing only its card.
+
+    :param page_path: Path of the page.
+    :type page_path: str
+    :param position: Position of the card in the sidecar index, from 0. It's
+           the position of the review in the reviews returned by
+           :func:`fakepilot.extract_info`.
+    :type position: int, optional
+    :param author_id: Author id of the review, if ``position`` isn't given.
+           If the author has several reviews, the first one.
+    :type author_id: str, optional
+    :param sidecar: Sidecar index of the page. By default, it's loaded from
+           :func:`sidecar_path`.
+    :type sidecar: dict(str, ), optional
+    :param spec: Extraction spec of the review. See
+           :func:`fakepilot.spec.get_plan`.
+    :type spec: :class:`fakepilot.spec.ExtractionPlan` or dict(str, ) or str,
+          optional
+    :return: The review, as returned by
+             :func:`fakepilot.xray.extract_review_info`.
+    :rtype: dict(str, )
+    :raises KeyError: If there isn't a review by ``author_id``.
+    :raises ValueError: If the page's size isn't the indexed one.
+    """
+
+    if sidecar is None:
+        sidecar = load_sidecar(sidecar_path(page_path))
+
+    if position is not None:
+        entry = sidecar["cards"][position]
+    else:
+        entry = next(
+            (card for card in sidecar["cards"] if card["author_id"] == author_id),
+            None,
+        )
+        if entry is None:
+            raise KeyError(author_id)
+
+    with open(page_path, "rb") as file:
+        if os.fstat(file.fileno()).st_size != sidecar["size"]:
+            raise ValueError(f"{page_path} changed after its sidecar was written.")
+
+        file.seek(entry["start"])
+        fragment = file.read(entry["end"] - entry["start"])
+
+    plan = get_plan(spec)
+    fragment = xray.parse_page(fragment.decode(sidecar["encoding"]))
+    index = xray.PageIndex(fragment)
+    return plan.extract_review(plan.review_cards(fragment, index, limit=1)[0], index)
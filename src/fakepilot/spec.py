@@ -0,0 +1,846 @@
+"""
+Declarative specs of the extracted fields.
+
+A spec describes, as data that can be stored as JSON, where every field of a
+company and of its reviews is in a page and how its value is read. It's
+compiled once into an :class:`ExtractionPlan`, which is reused for every
+page. :data:`BUILTIN_SPEC` describes the current Trustpilot's markup, and it
+is used by :func:`fakepilot.extract_info` by default. When the markup
+changes, a new spec can be written and loaded with :func:`load_spec`,
+without a new release of ``fakepilot``.
+
+A spec is a dictionary with the keys:
+
+* ``'company'``: the fields of the company, a dictionary from the name of
+  every field to its description.
+* ``'reviews'``: a dictionary with the lookup of the reviews' ``'section'``,
+  optional, the lookup of the review ``'card'``, searched in the section or
+  in the whole page if there isn't one, and the ``'fields'`` of a review,
+  searched in its card.
+* ``'version'``: optional, it must be :data:`SPEC_VERSION`.
+
+A field is described by a dictionary with:
+
+* ``'select'``: a lookup, or a list of lookups where every lookup is searched
+  in the element found by the previous one. A lookup is a dictionary with a
+  class-name prefix under ``'class'``, the name of a ``data-*`` attribute
+  under ``'data'`` and optionally its ``'value'``, or a list of class-name
+  prefixes tried in order under ``'classes'``, whose match is stored in the
+  page's selectors under the key ``'cache'`` (see
+  :func:`fakepilot.xray.first_match`). It may have the tag's ``'name'``. If
+  the last lookup has ``'all'`` set, the field is the list of the values of
+  all the matching elements. Without ``'select'``, the field is read from
+  the page or the card.
+* ``'get'``: how the value is read from the element: ``'string'``, its
+  string, ``'first_string'``, its first string, ``'text'``, all its strings
+  joined, ``'lines'``, its strings and a line break for every ``<br>``, or
+  ``'exists'``, ``True``. Alternatively, ``'attr'`` is the name of
+  the attribute whose value is read. ``'get'`` can also be a list of
+  alternatives, every one a getter or a dictionary with ``'get'`` or
+  ``'attr'`` and its own ``'then'``. The first alternative that reads a
+  non-empty value is used.
+* ``'whitespace'``: how the whitespace of the ``'text'`` and ``'lines'``
+  getters is normalized, while the strings are joined. See
+  :func:`fakepilot.xray.node_text`.
+* ``'then'``: the post-processing steps applied to the value, in order. Every
+  step is the name of a function of :data:`FILTERS`, or a list with the name
+  and the arguments after the value.
+* ``'default'``: the value of the field if the element isn't found. Without
+  it, the extraction fails.
+
+Instead of ``'get'``, a field may have ``'fields'``, a dictionary of fields
+searched in the element found by its ``'select'``. Its value is the
+dictionary of their values, whose keys are converted to integers if
+``'keys'`` is ``'int'``. It may also have ``'extractor'``, the name of a
+function of :data:`EXTRACTORS` called with the element, the index of the
+page and its selectors, and ``'item'``, the index of the item of its result
+that is the field's value. Every extractor is called once per element.
+
+The lookups are made once per page or card, even if several fields share
+them, such as the side panel of the rating distribution. The spec can't be
+modified once compiled.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import copy
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import NamedTuple
+
+from . import xray
+
+#: Version of the format of the specs.
+SPEC_VERSION = 1
+
+_PAGE_SLOT = 0
+_MISSING = object()
+
+_LOOKUP_KEYS = {"class", "classes", "cache", "data", "value", "name", "all"}
+_FIELD_KEYS = {
+    "select",
+    "get",
+    "attr",
+    "whitespace",
+    "then",
+    "default",
+    "fields",
+    "keys",
+    "extractor",
+    "item",
+}
+_ALTERNATIVE_KEYS = {"get", "attr", "whitespace", "then"}
+
+
+def _split(value, sep=None, pos=0):
+    """Return the item ``pos`` of ``value`` split by ``sep``."""
+    return value.split(sep)[pos]
+
+
+def _sub(value, pattern, repl):
+    """Return ``value`` with the matches of ``pattern`` replaced by ``repl``."""
+    return re.sub(pattern, repl, value)
+
+
+def _collapse(value):
+    """Return ``value`` with every run of whitespace replaced by a space."""
+    return " ".join(value.split())
+
+
+def _normalize(value, form="NFC"):
+    """Return the Unicode normalization ``form`` of ``value``."""
+    return unicodedata.normalize(form, value)
+
+
+#: Post-processing steps of the fields. Every one is called with the value and
+#: the arguments of the step.
+FILTERS = {
+    "strip": str.strip,
+    "rstrip": str.rstrip,
+    "replace": str.replace,
+    "split": _split,
+    "sub": _sub,
+    "collapse": _collapse,
+    "normalize": _normalize,
+    "int": int,
+    "float": float,
+    "strptime": datetime.datetime.strptime,
+}
+
+#: Functions that extract the fields that a lookup can't describe. Every one is
+#: called with the element, the index of the page and the page's selectors.
+EXTRACTORS = {
+    "contact_info": xray.extract_contact_info,
+    "is_claimed": xray.extract_is_claimed,
+}
+
+
+def _first_string(node):
+    """Return the first string of ``node``."""
+    return xray.to_str(next(node.strings, None))
+
+
+_GETTERS = {
+    "string": lambda node: xray.to_str(node.string),
+    "first_string": _first_string,
+    "text": xray.node_text,
+    "lines": lambda node: xray.node_text(node, line_breaks=True),
+    "exists": lambda node: True,
+}
+
+
+def _lookup(key, **extra):
+    """
+    Return the lookup of the spec of the element ``xray.SELECTORS[key]``,
+    with the keys of ``extra``.
+    """
+
+    selector = xray.SELECTORS[key]
+
+    if selector.class_ is not None:
+        lookup = {"class": selector.class_}
+    else:
+        lookup = {"data": selector.data_attr}
+
+        if selector.value is not None:
+            lookup["value"] = selector.value
+
+    lookup.update(extra)
+    return lookup
+
+
+#: Spec of the current Trustpilot's pages, from December 2023 to May 2025. Its
+#: lookups are the extractors', :data:`fakepilot.xray.SELECTORS`.
+BUILTIN_SPEC = {
+    "version": SPEC_VERSION,
+    "company": {
+        "name": {"select": _lookup("company_name"), "get": "first_string"},
+        "url": {"select": _lookup("company_url"), "get": "text"},
+        # The thousand separator is different for some countries. On old
+        # pages, if the company closed, the number of reviews and the score
+        # aren't shown
+        "nreviews": {
+            "select": _lookup("nreviews"),
+            "get": [
+                {"get": "string", "then": [["split", None, 0]]},
+                "first_string",
+            ],
+            "then": [["sub", "[.,\xa0]", ""], "int"],
+            "default": None,
+        },
+        "score": {
+            "select": _lookup("score"),
+            "get": "string",
+            "then": [["replace", ",", "."], "float"],
+            "default": None,
+        },
+        "categories": {
+            "select": _lookup("categories", all=True),
+            "get": "string",
+        },
+        "email": {"extractor": "contact_info", "item": 1},
+        "phone": {"extractor": "contact_info", "item": 0},
+        "address": {"extractor": "contact_info", "item": 2},
+        "is_claimed": {"extractor": "is_claimed"},
+        # Other tags of the page have the data-star-rating attribute, so the
+        # rating distribution is searched in the side panel
+        "rating_distribution": {
+            "select": _lookup("side_panel"),
+            "keys": "int",
+            "fields": {
+                str(nstars): {
+                    "select": [
+                        _lookup("rating_row", value=number_stars),
+                        _lookup("rating_bar"),
+                    ],
+                    "attr": "style",
+                    "then": [["split", ":", -1], ["rstrip", "%"], "float"],
+                    "default": None,
+                }
+                for nstars, number_stars in enumerate(
+                    ("one", "two", "three", "four", "five"), 1
+                )
+            },
+        },
+    },
+    "reviews": {
+        # December 2023 pages don't have a reviews container
+        "section": {
+            "classes": list(xray.SELECTOR_FALLBACKS["reviews_section"]),
+        },
+        "card": _lookup("review_card"),
+        "fields": {
+            "author_name": {
+                "select": _lookup("author_name"),
+                "get": "string",
+            },
+            # The author link is https://www.trustpilot.com/users/66642b4...
+            "author_id": {
+                "select": _lookup("author_id"),
+                "attr": "href",
+                "then": [["split", "/", -1]],
+            },
+            "is_verified": {
+                "select": _lookup("is_verified"),
+                "get": "exists",
+                "default": False,
+            },
+            "star_rating": {
+                "select": _lookup("star_rating"),
+                "attr": xray.SELECTORS["star_rating"].data_attr,
+                "then": ["float"],
+            },
+            "date": {
+                "select": _lookup("date"),
+                "attr": "datetime",
+                "then": [["strptime", "%Y-%m-%dT%H:%M:%S.%fZ"]],
+            },
+            "title": {
+                "select": _lookup("title"),
+                "get": "string",
+                "then": ["strip"],
+            },
+            "content": {
+                "select": _lookup("content"),
+                "get": "text",
+                "whitespace": "strip_newlines",
+                "default": "",
+            },
+            "nreviews": {
+                "select": _lookup("author_nreviews"),
+                "attr": xray.SELECTORS["author_nreviews"].data_attr,
+                "then": ["int"],
+            },
+            "country": {
+                "select": _lookup("country"),
+                "get": "text",
+            },
+            "date_experience": {
+                "select": _lookup("date_experience"),
+                "get": "text",
+                "then": [["split", ":", -1], "strip", ["strptime", "%B %d, %Y"]],
+            },
+        },
+    },
+}
+
+
+def _check_keys(description, allowed, what):
+    """Raise :class:`ValueError` if ``description`` has unknown keys."""
+    if not isinstance(description, dict):
+        raise ValueError(f"The {what} must be a dictionary, not {description!r}.")
+
+    unknown = set(description) - allowed
+
+    if unknown:
+        raise ValueError(f"Unknown keys {sorted(unknown)} in the {what}.")
+
+
+def _compile_lookup(lookup, what):
+    """
+    Return a function that searches the elements of ``lookup`` in a scope.
+
+    It's called with the scope, the index of the page and the page's
+    selectors, and it returns the first element, or ``None``. If the lookup
+    has ``'all'`` set, it returns the list of elements, and it's also called
+    with their maximum number.
+    """
+
+    _check_keys(lookup, _LOOKUP_KEYS, what)
+    name = lookup.get("name")
+
+    if "classes" in lookup:
+        prefixes = tuple(lookup["classes"])
+        key = lookup.get("cache")
+
+        def find_all(scope, index, selectors, limit=None):
+            """Return the elements with the first prefix that matches."""
+            cached = selectors.get(key) if key and selectors else None
+            prefix, found = xray.first_match(
+                scope, index, prefixes, cached=cached, name=name
+            )
+
+            if key and prefix is not None and selectors is not None:
+                selectors[key] = prefix
+
+            return found[:limit] if limit else found
+
+        def find(scope, index, selectors):
+            """Return the first element with the first prefix that matches."""
+            found = find_all(scope, index, selectors)
+            return found[0] if found else None
+
+    elif "class" in lookup or "data" in lookup:
+        if "class" in lookup:
+            criteria = xray.Lookup(class_=lookup["class"], name=name)
+        else:
+            criteria = xray.Lookup(
+                data_attr=lookup["data"], value=lookup.get("value"), name=name
+            )
+
+        # The selectors are only used by the lookups with fallbacks
+        def find_all(scope, index, _selectors, limit=None):
+            """Return the matching elements."""
+            return index.find_all(scope, criteria, limit)
+
+        def find(scope, index, _selectors):
+            """Return the first matching element."""
+            return index.find(scope, criteria)
+
+    else:
+        raise ValueError(f"The {what} has no 'class', 'classes' or 'data'.")
+
+    return find_all if lookup.get("all") else find
+
+
+def _compile_steps(steps, what):
+    """Return the post-processing ``steps`` as pairs of function and arguments."""
+    compiled = []
+
+    for step in steps:
+        name, *args = [step] if isinstance(step, str) else step
+
+        if name not in FILTERS:
+            raise ValueError(f"Unknown step {name!r} of the {what}.")
+
+        compiled.append((FILTERS[name], tuple(args)))
+
+    return tuple(compiled)
+
+
+def _compile_getter(description, what):
+    """Return the getter and steps of an alternative of a field."""
+    if isinstance(description, str):
+        description = {"get": description}
+
+    _check_keys(description, _ALTERNATIVE_KEYS, what)
+    steps = _compile_steps(description.get("then", ()), what)
+    whitespace = description.get("whitespace")
+
+    if whitespace is not None:
+        if description.get("get") not in ("text", "lines"):
+            raise ValueError(
+                f"Only the 'text' and 'lines' of the {what} have 'whitespace'."
+            )
+        if whitespace not in xray.WHITESPACE_MODES:
+            raise ValueError(f"Unknown 'whitespace' of the {what}.")
+
+        line_breaks = description["get"] == "lines"
+
+        def text(node):
+            """Return the text of ``node``, with its whitespace normalized."""
+            return xray.node_text(node, whitespace=whitespace, line_breaks=line_breaks)
+
+        return text, steps
+
+    if "attr" in description:
+        attr = description["attr"]
+        return (lambda node: node.get(attr)), steps
+
+    getter = _GETTERS.get(description.get("get"))
+
+    if getter is None:
+        raise ValueError(f"The {what} has no valid 'get' or 'attr'.")
+
+    return getter, steps
+
+
+def _apply(value, steps):
+    """Return ``value`` after the post-processing ``steps``."""
+    for func, args in steps:
+        value = func(value, *args)
+    return value
+
+
+def _reader(getters, steps):
+    """
+    Return a function that reads the value of an element with the first
+    of ``getters`` that reads a non-empty value and applies ``steps``.
+    """
+
+    if len(getters) > 1:
+        last_steps = getters[-1][1]
+
+        def read(node):
+            """Return the value read by the first getter that reads one."""
+            for getter, getter_steps in getters:
+                value = getter(node)
+
+                if value:
+                    return _apply(_apply(value, getter_steps), steps)
+
+            # If none reads a non-empty value, the last one is used
+            return _apply(_apply(value, last_steps), steps)
+
+        return read
+
+    # Most fields have a single getter, which is called directly
+    getter, getter_steps = getters[0]
+    steps = getter_steps + steps
+
+    if not steps:
+        return getter
+
+    def read_one(node):
+        """Return the value read by the getter, after the steps."""
+        value = getter(node)
+
+        for func, args in steps:
+            value = func(value, *args)
+
+        return value
+
+    return read_one
+
+
+def _default(default, what):
+    """Return the value of a field whose element isn't found."""
+    if default is _MISSING:
+        raise RuntimeError(f"The element of the {what} hasn't been found.")
+    return copy.deepcopy(default) if default else default
+
+
+def _extractor_field(description, slot, default, what):
+    """
+    Return a function that returns the value of a field read by an
+    extractor.
+    """
+
+    extractor = EXTRACTORS.get(description["extractor"])
+
+    if extractor is None:
+        raise ValueError(f"Unknown extractor of the {what}.")
+
+    item = description.get("item")
+    memo_key = (description["extractor"], slot)
+
+    def extract(run):
+        """Return the field's item of the extractor's result."""
+        nodes, index, selectors, memo = run
+
+        if nodes[slot] is None:
+            return _default(default, what)
+
+        result = memo.get(memo_key, _MISSING)
+
+        if result is _MISSING:
+            result = memo[memo_key] = extractor(nodes[slot], index, selectors)
+
+        return result if item is None else result[item]
+
+    return extract
+
+
+class _Fields(NamedTuple):
+    """
+    Compiled fields searched in the same element, the page or a card.
+
+    Every distinct lookup, in the element found by another lookup, is a
+    slot of the list of the elements found, filled once per element. The
+    slot 0 is the element itself.
+    """
+
+    #: Parent slot and search function of every other slot
+    steps: tuple
+    #: Name and function of every field, called with the run of the element
+    fields: tuple
+    #: Slots every field is read from, to extract only some fields
+    needs: dict
+
+
+def _compile_fields(fields, what):
+    """Return the :class:`_Fields` of the ``fields`` of a spec."""
+    state = {"steps": [], "slots": {}, "lists": set(), "touched": set()}
+    compiled = []
+    needs = {}
+
+    for name, description in fields.items():
+        state["touched"] = set()
+        compiled.append(
+            (
+                name,
+                _field(state, description, _PAGE_SLOT, f"field {name!r} of {what}"),
+            )
+        )
+        needs[name] = state["touched"]
+
+    return _Fields(tuple(state["steps"]), tuple(compiled), needs)
+
+
+def _slot(state, parent, lookups, what):
+    """Return the slot of the last element of ``lookups``."""
+    if isinstance(lookups, dict):
+        lookups = [lookups]
+
+    for lookup in lookups:
+        if parent in state["lists"]:
+            raise ValueError(f"Only the last lookup of the {what} can be 'all'.")
+
+        key = (parent, json.dumps(lookup, sort_keys=True))
+        slot = state["slots"].get(key)
+
+        if slot is None:
+            slot = state["slots"][key] = len(state["steps"]) + 1
+            state["steps"].append((parent, _compile_lookup(lookup, what)))
+
+            if lookup.get("all"):
+                state["lists"].add(slot)
+
+        state["touched"].add(slot)
+        parent = slot
+
+    return parent
+
+
+def _field(state, description, parent, what):
+    """Return a function that returns the field's value."""
+    _check_keys(description, _FIELD_KEYS, what)
+    slot = _slot(state, parent, description.get("select", ()), what)
+    default = description.get("default", _MISSING)
+
+    if "fields" in description:
+        to_key = int if description.get("keys") == "int" else str
+        subfields = [
+            (to_key(key), _field(state, sub, slot, f"{what}.{key}"))
+            for key, sub in description["fields"].items()
+        ]
+
+        return lambda run: {key: field(run) for key, field in subfields}
+
+    if "extractor" in description:
+        return _extractor_field(description, slot, default, what)
+
+    alternatives = description.get("get")
+
+    if not isinstance(alternatives, list):
+        alternatives = [
+            {
+                key: description[key]
+                for key in ("get", "attr", "whitespace")
+                if key in description
+            }
+        ]
+
+    if not alternatives:
+        raise ValueError(f"The {what} has no alternatives in 'get'.")
+
+    getters = [_compile_getter(alternative, what) for alternative in alternatives]
+    read = _reader(getters, _compile_steps(description.get("then", ()), what))
+    many = slot in state["lists"]
+
+    def value_of(run):
+        """Return the value read from the element, or elements, found."""
+        node = run[0][slot]
+
+        if node is None:
+            return _default(default, what)
+
+        if many:
+            return [read(item) for item in node]
+        return read(node)
+
+    return value_of
+
+
+def _extract(compiled, tag, index, selectors, names=None):
+    """
+    Return the values of the :class:`_Fields` ``compiled`` of ``tag``, or
+    only of the fields in ``names``, whose lookups are the only ones made.
+    """
+
+    fields = compiled.fields
+    needed = None
+
+    if names is not None:
+        fields = [(name, field) for name, field in fields if name in names]
+        needed = set().union(*(compiled.needs[name] for name in names))
+
+    nodes = [tag]
+
+    for slot, (parent, find) in enumerate(compiled.steps, 1):
+        scope = nodes[parent]
+
+        if scope is None or (needed is not None and slot not in needed):
+            nodes.append(None)
+        else:
+            nodes.append(find(scope, index, selectors))
+
+    run = (nodes, index, selectors, {})
+    return {name: field(run) for name, field in fields}
+
+
+class ExtractionPlan:
+    """
+    Compiled extraction spec. See the module's documentation.
+
+    :param spec: Extraction spec.
+    :type spec: dict(str, )
+    :raise ValueError: If the spec isn't valid.
+    """
+
+    def __init__(self, spec):
+        _check_keys(spec, {"version", "company", "reviews"}, "spec")
+
+        if spec.get("version", SPEC_VERSION) != SPEC_VERSION:
+            raise ValueError(f"Unsupported spec version {spec['version']!r}.")
+
+        self.spec = spec
+        reviews = spec.get("reviews", {})
+        _check_keys(reviews, {"section", "card", "fields"}, "reviews of the spec")
+
+        self._company = _compile_fields(spec.get("company", {}), "the company")
+        self._review = _compile_fields(reviews.get("fields", {}), "the reviews")
+        self._section = None
+        self._cards = None
+
+        if "section" in reviews:
+            self._section = _compile_lookup(
+                reviews["section"], "section of the reviews"
+            )
+        if "card" in reviews:
+            self._cards = _compile_lookup(
+                dict(reviews["card"], all=True), "card of the reviews"
+            )
+
+    def __reduce__(self):
+        # The compiled functions can't be pickled, so the plan is taken from
+        # the plans of the process, e.g. of a worker, or compiled again
+        return (get_plan, (self.spec,))
+
+    def extract_company(self, company_page, index=None, selectors=None, fields=None):
+        """
+        Return the company's fields of a page.
+
+        :param company_page: Parsed company's page.
+        :type company_page: :class:`bs4.BeautifulSoup`
+        :param index: Index of the page. It is built if it isn't given.
+        :type index: :class:`fakepilot.xray.PageIndex`, optional
+        :param selectors: Selectors that matched on pages with the same
+               structure. See :func:`fakepilot.xray.select_all`.
+        :type selectors: dict(str, str), optional
+        :param fields: Names of the extracted fields. By default, all of
+               them.
+        :type fields: iterable(str), optional
+        :rtype: dict(str, )
+        :raises KeyError: If a field isn't in the spec.
+        """
+
+        index = xray.get_index(company_page, index)
+        return _extract(self._company, company_page, index, selectors, fields)
+
+    def review_cards(self, company_page, index=None, selectors=None, limit=None):
+        """
+        Return the review cards of a page, in document order. See
+        :func:`fakepilot.xray.review_cards`.
+        """
+
+        if self._cards is None:
+            return []
+
+        index = xray.get_index(company_page, index)
+        section = None
+
+        if self._section is not None:
+            section = self._section(company_page, index, selectors)
+
+        if section is None:
+            section = company_page
+
+        return self._cards(section, index, selectors, limit)
+
+    def extract_review(self, card, index=None, fields=None):
+        """
+        Return the fields of a review.
+
+        :param card: Review card.
+        :type card: :class:`bs4.Tag`
+        :param index: Index of the page the card belongs to. An index of the
+               card is built if it isn't given.
+        :type index: :class:`fakepilot.xray.PageIndex`, optional
+        :param fields: Names of the extracted fields. By default, all of
+               them.
+        :type fields: iterable(str), optional
+        :rtype: dict(str, )
+        :raises KeyError: If a field isn't in the spec.
+        """
+
+        index = xray.get_index(card, index)
+        return _extract(self._review, card, index, None, fields)
+
+
+#: Plan of :data:`BUILTIN_SPEC`.
+BUILTIN_PLAN = ExtractionPlan(copy.deepcopy(BUILTIN_SPEC))
+
+#: Maximum number of plans of specs given as dictionaries kept by
+#: :func:`get_plan`.
+MAX_PLANS = 32
+
+# Plans of the loaded spec files, by path, with the version of the file, and
+# of the specs given as dictionaries, by their digest, least recently used
+# first. They're shared by the threads of the process.
+_loaded = {}
+_compiled = OrderedDict()
+_lock = threading.Lock()
+
+
+def _digest(spec):
+    """Return the digest of the JSON of ``spec``."""
+    text = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+_compiled[_digest(BUILTIN_SPEC)] = BUILTIN_PLAN
+
+
+def load_spec(path):
+    """
+    Return the plan of the spec in the JSON file ``path``.
+
+    The plan is cached, and compiled again when the file is modified, so a
+    long-running process swaps the spec on the next page after the file is
+    replaced.
+
+    :param path: Path of the spec.
+    :type path: str or os.PathLike
+    :rtype: :class:`ExtractionPlan`
+    """
+
+    path = os.fspath(path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    with _lock:
+        cached = _loaded.get(path)
+
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with open(path, encoding="utf-8") as file:
+        plan = ExtractionPlan(json.load(file))
+
+    with _lock:
+        _loaded[path] = (version, plan)
+
+    return plan
+
+
+def _compile_spec(spec):
+    """
+    Return the plan of the spec ``spec``.
+
+    The plans of the last :data:`MAX_PLANS` specs are kept by the digest of
+    their JSON, so a spec equal to one of them isn't compiled again.
+
+    :param spec: Extraction spec.
+    :type spec: dict(str, )
+    :rtype: :class:`ExtractionPlan`
+    :raise ValueError: If the spec isn't valid.
+    """
+
+    digest = _digest(spec)
+
+    with _lock:
+        plan = _compiled.get(digest)
+
+        if plan is not None:
+            _compiled.move_to_end(digest)
+            return plan
+
+    plan = ExtractionPlan(spec)
+
+    with _lock:
+        _compiled[digest] = plan
+
+        while len(_compiled) > MAX_PLANS:
+            _compiled.popitem(last=False)
+
+    return plan
+
+
+def get_plan(spec=None):
+    """
+    Return the plan of ``spec``.
+
+    The plans of the last :data:`MAX_PLANS` specs given as dictionaries are
+    kept, so a spec equal to one of them isn't compiled again, e.g. when a
+    plan is unpickled by a worker process.
+
+    :param spec: An extraction plan, a spec or the path of a JSON spec. By
+           default, the plan of :data:`BUILTIN_SPEC`.
+    :type spec: :class:`ExtractionPlan` or dict(str, ) or str, optional
+    :rtype: :class:`ExtractionPlan`
+    """
+
+    if spec is None:
+        return BUILTIN_PLAN
+    if isinstance(spec, ExtractionPlan):
+        return spec
+    if isinstance(spec, dict):
+        return _compile_spec(spec)
+    return load_spec(spec)
@@ -0,0 +1,427 @@
+"""
+Storage of the extracted companies and reviews in SQLite.
+
+Every extraction run is kept as a snapshot, so the results of previous runs
+aren't overwritten. The tables mirror the dictionaries returned by
+:func:`fakepilot.xray.extract_company_info` and
+:func:`fakepilot.xray.extract_review_info`, and a company can be loaded back
+as returned by :func:`fakepilot.extract_info` without parsing its page.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import datetime
+import json
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    label TEXT
+);
+
+CREATE TABLE IF NOT EXISTS companies (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    url TEXT NOT NULL,
+    name TEXT,
+    nreviews INTEGER,
+    score REAL,
+    categories TEXT,
+    email TEXT,
+    phone TEXT,
+    address TEXT,
+    is_claimed INTEGER,
+    rating_distribution TEXT,
+    with_reviews INTEGER NOT NULL,
+    PRIMARY KEY (snapshot_id, url)
+);
+
+CREATE INDEX IF NOT EXISTS companies_url ON companies (url);
+
+CREATE TABLE IF NOT EXISTS reviews (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    company_url TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    author_name TEXT,
+    author_id TEXT NOT NULL,
+    is_verified INTEGER,
+    star_rating REAL,
+    date TEXT NOT NULL,
+    title TEXT,
+    content TEXT,
+    nreviews INTEGER,
+    country TEXT,
+    date_experience TEXT,
+    PRIMARY KEY (snapshot_id, company_url, position)
+);
+
+CREATE INDEX IF NOT EXISTS reviews_company_url ON reviews (company_url);
+CREATE INDEX IF NOT EXISTS reviews_author_id ON reviews (author_id);
+CREATE INDEX IF NOT EXISTS reviews_date ON reviews (date);
+"""
+
+_COMPANY_FIELDS = (
+    "name",
+    "nreviews",
+    "score",
+    "categories",
+    "email",
+    "phone",
+    "address",
+    "is_claimed",
+    "rating_distribution",
+    "with_reviews",
+)
+_REVIEW_FIELDS = (
+    "author_id",
+    "date",
+    "author_name",
+    "is_verified",
+    "star_rating",
+    "title",
+    "content",
+    "nreviews",
+    "country",
+    "date_experience",
+)
+
+
+_COLUMNS = {
+    "companies": {"snapshot_id", "url", *_COMPANY_FIELDS},
+    "reviews": {"snapshot_id", "company_url", "position", *_REVIEW_FIELDS},
+}
+
+
+def _upsert(table, keys, fields):
+    """Return the statement that inserts or updates a row of ``table``."""
+    columns = keys + fields
+
+    if not set(columns) <= _COLUMNS.get(table, set()):
+        raise ValueError(f"Unknown columns of {table}: {columns}.")
+
+    # The names are checked against the schema and the values are bound
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) "  # nosec B608
+        f"VALUES ({', '.join('?' for _ in columns)}) "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET "
+        + ", ".join(f"{field} = excluded.{field}" for field in fields)
+    )
+
+
+_COMPANY_UPSERT = _upsert("companies", ("snapshot_id", "url"), _COMPANY_FIELDS)
+_REVIEW_UPSERT = _upsert(
+    "reviews", ("snapshot_id", "company_url", "position"), _REVIEW_FIELDS
+)
+
+
+def _date_text(date):
+    """Return a date as ISO 8601 text, or ``None``."""
+    return date.isoformat() if date is not None else None
+
+
+def _parse_date(text):
+    """Return the date of an ISO 8601 text, or ``None``."""
+    return datetime.datetime.fromisoformat(text) if text is not None else None
+
+
+class SnapshotStore:
+    """
+    SQLite database of snapshots of companies and their reviews.
+
+    :param path: Path of the database file. It's created if it doesn't
+           exist.
+    :type path: str
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database."""
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def create_snapshot(self, label=None):
+        """
+        Create a new snapshot.
+
+        :param label: Description of the snapshot, e.g. the crawl's name.
+        :type label: str, optional
+        :return: Id of the snapshot.
+        :rtype: int
+        """
+
+        with self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO snapshots (created_at, label) VALUES (?, ?)",
+                (datetime.datetime.now(datetime.timezone.utc).isoformat(), label),
+            )
+
+        return cursor.lastrowid
+
+    def snapshots(self, url=None):
+        """
+        Return the snapshots, from the oldest to the newest.
+
+        :param url: If given, only the snapshots with this company.
+        :type url: str, optional
+        :return: Tuples of the id, creation date and label of every snapshot.
+        :rtype: list(tuple(int, str, str))
+        """
+
+        if url is None:
+            query = "SELECT id, created_at, label FROM snapshots ORDER BY id"
+            return self._conn.execute(query).fetchall()
+
+        query = (
+            "SELECT id, created_at, label FROM snapshots "
+            "JOIN companies ON companies.snapshot_id = snapshots.id "
+            "WHERE companies.url = ? ORDER BY id"
+        )
+        return self._conn.execute(query, (url,)).fetchall()
+
+    def save(self, companies, snapshot=None, batch_size=1000):
+        """
+        Insert or update companies and their reviews in a snapshot.
+
+        The rows of every batch of ``batch_size`` companies are written in a
+        single transaction. The reviews of a company already in the snapshot
+        are replaced by its new reviews, in the same transaction. If a company
+        appears more than once in a batch, the last one is kept.
+
+        :param companies: Companies' information returned by
+               :func:`fakepilot.extract_info`.
+        :type companies: iterable(dict(str, ))
+        :param snapshot: Id of the snapshot. By default, a new one is
+               created.
+        :type snapshot: int, optional
+        :return: Id of the snapshot.
+        :rtype: int
+        """
+
+        if snapshot is None:
+            snapshot = self.create_snapshot()
+
+        # Rows of the batch by company URL, so a repeated company replaces
+        # the previous one instead of merging their reviews
+        batch = {}
+
+        for company in companies:
+            url = company["url"]
+            batch[url] = (
+                self._company_row(snapshot, company),
+                [
+                    self._review_row(snapshot, url, position, review)
+                    for position, review in enumerate(company.get("reviews", ()))
+                ],
+            )
+
+            if len(batch) >= batch_size:
+                self._write(batch.values())
+                batch = {}
+
+        if batch:
+            self._write(batch.values())
+
+        return snapshot
+
+    def _write(self, rows):
+        """Write a batch of companies' and reviews' rows in a transaction."""
+        company_rows = [company_row for company_row, _ in rows]
+        review_rows = [row for _, review_rows in rows for row in review_rows]
+
+        with self._conn:
+            self._conn.executemany(
+                "DELETE FROM reviews WHERE snapshot_id = ? AND company_url = ?",
+                (row[:2] for row in company_rows),
+            )
+            self._conn.executemany(_COMPANY_UPSERT, company_rows)
+            self._conn.executemany(_REVIEW_UPSERT, review_rows)
+
+    @staticmethod
+    def _company_row(snapshot, company):
+        """Return the row of a company."""
+        distribution = company.get("rating_distribution")
+
+        return (
+            snapshot,
+            company["url"],
+            company.get("name"),
+            company.get("nreviews"),
+            company.get("score"),
+            json.dumps(company.get("categories", [])),
+            company.get("email"),
+            company.get("phone"),
+            company.get("address"),
+            company.get("is_claimed"),
+            json.dumps(distribution) if distribution is not None else None,
+            "reviews" in company,
+        )
+
+    @staticmethod
+    def _review_row(snapshot, company_url, position, review):
+        """Return the row of a review."""
+        return (
+            snapshot,
+            company_url,
+            position,
+            review["author_id"],
+            _date_text(review["date"]),
+            review.get("author_name"),
+            review.get("is_verified"),
+            review.get("star_rating"),
+            review.get("title"),
+            review.get("content"),
+            review.get("nreviews"),
+            review.get("country"),
+            _date_text(review.get("date_experience")),
+        )
+
+    def latest_snapshot(self, url):
+        """Return the id of the newest snapshot with a company, or ``None``."""
+        row = self._conn.execute(
+            "SELECT MAX(snapshot_id) FROM companies WHERE url = ?", (url,)
+        ).fetchone()
+        return row[0]
+
+    def load_company(self, url, snapshot=None):
+        """
+        Return a company as returned by :func:`fakepilot.extract_info`.
+
+        :param url: URL of the company.
+        :type url: str
+        :param snapshot: Id of the snapshot. By default, the newest one with
+               the company.
+        :type snapshot: int, optional
+        :return: The company's information, or ``None`` if it isn't in the
+                 snapshot.
+        :rtype: dict(str, )
+        """
+
+        if snapshot is None:
+            snapshot = self.latest_snapshot(url)
+
+        # The names of the columns are constants and the values are bound
+        row = self._conn.execute(
+            f"SELECT {', '.join(_COMPANY_FIELDS)} FROM companies "  # nosec B608
+            "WHERE snapshot_id = ? AND url = ?",
+            (snapshot, url),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        stored = dict(zip(_COMPANY_FIELDS, row))
+        distribution = stored["rating_distribution"]
+
+        if distribution is not None:
+            distribution = {
+                int(nstars): percentage
+                for nstars, percentage in json.loads(distribution).items()
+            }
+
+        company = {
+            "name": stored["name"],
+            "url": url,
+            "nreviews": stored["nreviews"],
+            "score": stored["score"],
+            "categories": json.loads(stored["categories"]),
+            "email": stored["email"],
+            "phone": stored["phone"],
+            "address": stored["address"],
+            "is_claimed": bool(stored["is_claimed"]),
+            "rating_distribution": distribution,
+        }
+
+        if stored["with_reviews"]:
+            company["reviews"] = self.load_reviews(url, snapshot)
+
+        return company
+
+    def companies(self, snapshot):
+        """
+        Yield the companies of a snapshot, as returned by
+        :func:`fakepilot.extract_info`, ordered by URL.
+
+        :type snapshot: int
+        :rtype: iterator(dict(str, ))
+        """
+
+        urls = [
+            url
+            for (url,) in self._conn.execute(
+                "SELECT url FROM companies WHERE snapshot_id = ? ORDER BY url",
+                (snapshot,),
+            )
+        ]
+
+        for url in urls:
+            yield self.load_company(url, snapshot)
+
+    def load_reviews(self, url, snapshot):
+        """
+        Return the reviews of a company in a snapshot, as returned by
+        :func:`fakepilot.xray.extract_review_info`, in the order of the page.
+        """
+
+        rows = self._conn.execute(
+            "SELECT author_name, author_id, is_verified, star_rating, date, "
+            "title, content, nreviews, country, date_experience FROM reviews "
+            "WHERE snapshot_id = ? AND company_url = ? ORDER BY position",
+            (snapshot, url),
+        )
+
+        return [
+            {
+                "author_name": author_name,
+                "author_id": author_id,
+                "is_verified": bool(is_verified),
+                "star_rating": star_rating,
+                "date": _parse_date(date),
+                "title": title,
+                "content": content,
+                "nreviews": nreviews,
+                "country": country,
+                "date_experience": _parse_date(date_experience),
+            }
+            for (
+                author_name,
+                author_id,
+                is_verified,
+                star_rating,
+                date,
+                title,
+                content,
+                nreviews,
+                country,
+                date_experience,
+            ) in rows
+        ]
+
+    def reviews_by_author(self, author_id):
+        """
+        Return the reviews of an author in all the snapshots.
+
+        :return: Tuples of the snapshot id, the company's URL, the rating and
+                 the date of every review.
+        :rtype: list(tuple(int, str, float, :class:`datetime.datetime`))
+        """
+
+        rows = self._conn.execute(
+            "SELECT snapshot_id, company_url, star_rating, date FROM reviews "
+            "WHERE author_id = ? ORDER BY date",
+            (author_id,),
+        )
+        return [
+            (snap, url, rating, _parse_date(date)) for snap, url, rating, date in rows
+        ]
@@ -5,18 +5,47 @@ Defines how the data is scrapped from the Trustpilot site.
 # SPDX-License-Identifier: MIT
 
 import re
-import datetime
-from functools import reduce
-import operator
+import importlib
+import importlib.util
+from bisect import bisect_right
+import unicodedata
+from types import MappingProxyType
+from typing import NamedTuple
 
-from bs4 import BeautifulSoup
+# BeautifulSoup is imported and the parser is chosen on first use, so
+# that importing fakepilot stays cheap for short-lived processes.
 
-try:
-    import lxml  # pylint: disable=unused-import
 
-    PARSER = "lxml"
-except ImportError:
-    PARSER = "html.parser"
+def get_parser():
+    """
+    Return the name of the parser used by BeautifulSoup.
+
+    The ``lxml``'s parser is used if it is installed. If not, the
+    ``html.parser`` is used. The check is made once, on the first call, and
+    it doesn't import ``lxml``. The choice can be overridden by setting
+    the module's ``PARSER`` attribute.
+    """
+
+    parser = globals().get("PARSER")
+
+    if parser is None:
+        if importlib.util.find_spec("lxml") is not None:
+            parser = "lxml"
+        else:
+            parser = "html.parser"
+
+        # setdefault is atomic, so threads racing on the first call agree on
+        # the parser and don't overwrite one set meanwhile
+        parser = globals().setdefault("PARSER", parser)
+
+    return parser
+
+
+def __getattr__(name):
+    """Return the module's attributes that are computed on first use."""
+    if name == "PARSER":
+        return get_parser()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def has_attr(attr_name):
@@ -24,7 +53,348 @@ def has_attr(attr_name):
     return lambda tag: tag.has_attr(attr_name)
 
 
-def extract_url(tag):
+def to_str(string):
+    """
+    Return a :class:`bs4.NavigableString` as a plain string.
+
+    A :class:`bs4.NavigableString` keeps a reference to its tree, so it
+    would keep the whole page alive and be pickled with it.
+    """
+
+    return None if string is None else str(string)
+
+
+def class_prefix(class_name):
+    """
+    Return the prefix of a CSS-module class name.
+
+    Trustpilot's class names are generated as ``<module>_<name>__<hash>``,
+    e.g. ``title_displayName__TtDDM``. The hash changes between
+    deployments, so the prefix (``title_displayName``) is the stable part
+    used to find the elements.
+    """
+    return class_name.split("__", 1)[0]
+
+
+class Lookup(NamedTuple):
+    """
+    Criteria of the elements searched by :meth:`PageIndex.find_all`.
+
+    :param class_: Class-name prefix, e.g. ``'styles_itemRow'``.
+    :type class_: str, optional
+    :param data_attr: Name of a ``data-*`` attribute. Ignored if
+           ``class_`` is given.
+    :type data_attr: str, optional
+    :param value: Required value of ``data_attr``.
+    :type value: str, optional
+    :param name: Required tag name.
+    :type name: str, optional
+    """
+
+    class_: str = None
+    data_attr: str = None
+    value: str = None
+    name: str = None
+
+
+class PageIndex:
+    """
+    Index of the elements of a parsed page by class-name prefix and by
+    ``data-*`` attribute name.
+
+    The index is built with a single walk over the tree. Every element is
+    numbered in document order and the range of numbers of its descendants
+    is recorded, so a lookup scoped to any element of the page (the whole
+    page or a single review card) is a dictionary access plus a binary
+    search, instead of a walk over the whole subtree that matches a regular
+    expression against every class attribute.
+
+    A class-name prefix matches exactly, unlike the regular expressions it
+    replaces, which matched anywhere in the class name: the prefix
+    ``styles_itemRow`` matches ``styles_itemRow__x1`` but neither
+    ``styles_itemRowLarge__x1`` nor ``card-styles_itemRow__x1``.
+
+    :param root: Parsed page or element whose subtree is indexed.
+    :type root: :class:`bs4.Tag`
+    :ivar root: The indexed element.
+    """
+
+    def __init__(self, root):
+        from bs4 import Tag  # pylint: disable=import-outside-toplevel
+
+        self.root = root
+        tags = [root]
+        tags.extend(node for node in root.descendants if isinstance(node, Tag))
+        positions = {id(tag): pos for pos, tag in enumerate(tags)}
+
+        # The last descendant of a tag is found walking the tags backwards,
+        # so every child is visited before its parent
+        ends = list(range(len(tags)))
+        for pos in range(len(tags) - 1, 0, -1):
+            parent_pos = positions.get(id(tags[pos].parent))
+            if parent_pos is not None and ends[pos] > ends[parent_pos]:
+                ends[parent_pos] = ends[pos]
+
+        self._spans = {id(tag): (pos, ends[pos]) for pos, tag in enumerate(tags)}
+        self._classes = {}
+        self._data_attrs = {}
+
+        for pos, tag in enumerate(tags):
+            for attr_name in tag.attrs:
+                if attr_name.startswith("data-"):
+                    self._add(self._data_attrs, attr_name, pos, tag)
+
+            for prefix in {class_prefix(name) for name in tag.get("class") or ()}:
+                self._add(self._classes, prefix, pos, tag)
+
+    @staticmethod
+    def _add(table, key, pos, tag):
+        """Append ``tag`` to the entry ``key`` of ``table``."""
+        entry = table.get(key)
+
+        if entry is None:
+            entry = table[key] = ([], [])
+
+        entry[0].append(pos)
+        entry[1].append(tag)
+
+    def find_all(self, scope, lookup, limit=None):
+        """
+        Return the descendants of ``scope`` that match a class-name prefix
+        or a ``data-*`` attribute, in document order.
+
+        :param scope: Element of the indexed tree the search is restricted to.
+        :type scope: :class:`bs4.Tag`
+        :param lookup: Criteria of the elements.
+        :type lookup: :class:`Lookup`
+        :param limit: Maximum number of returned elements.
+        :type limit: int, optional
+        :rtype: list(:class:`bs4.Tag`)
+        """
+
+        if lookup.class_ is not None:
+            entry = self._classes.get(lookup.class_)
+        else:
+            entry = self._data_attrs.get(lookup.data_attr)
+
+        if entry is None:
+            return []
+
+        span = self._spans.get(id(scope))
+
+        if span is None:
+            raise ValueError("The scope tag is not part of the indexed tree.")
+
+        positions, tags = entry
+        # The scope itself is excluded, as in BeautifulSoup's searches
+        start = bisect_right(positions, span[0])
+        end = bisect_right(positions, span[1])
+        name, value = lookup.name, lookup.value
+        found = []
+
+        for tag in tags[start:end]:
+            if name is not None and tag.name != name:
+                continue
+            if value is not None and tag.get(lookup.data_attr) != value:
+                continue
+
+            found.append(tag)
+
+            if limit and len(found) == limit:
+                break
+
+        return found
+
+    def find(self, scope, lookup):
+        """
+        Return the first descendant of ``scope`` that matches ``lookup``, or
+        ``None``.
+        """
+
+        found = self.find_all(scope, lookup, limit=1)
+        return found[0] if found else None
+
+    def class_names(self, class_):
+        """
+        Return the class names with the prefix ``class_`` in the indexed tree,
+        sorted.
+        """
+
+        entry = self._classes.get(class_)
+
+        if entry is None:
+            return []
+
+        return sorted(
+            {
+                class_name
+                for tag in entry[1]
+                for class_name in tag["class"]
+                if class_prefix(class_name) == class_
+            }
+        )
+
+    def count(self, class_):
+        """Return the number of elements with the class-name prefix ``class_``."""
+        entry = self._classes.get(class_)
+        return len(entry[0]) if entry else 0
+
+
+#: Class-name prefixes of the elements whose markup changes between
+#: Trustpilot's page layouts, in the order they are tried. It's read-only,
+#: so the extractors can run concurrently.
+SELECTOR_FALLBACKS = MappingProxyType(
+    {
+        # May 2025 and December 2023 pages
+        "contact_elements": ("styles_itemRow", "styles_contactInfoElement"),
+        # December 2023 pages don't have a reviews container
+        "reviews_section": ("styles_reviewListContainer",),
+    }
+)
+
+
+#: Lookups of the elements of the company's and reviews' fields. They're those of
+#: :data:`fakepilot.spec.BUILTIN_SPEC`, whose plan the extractors of the fields
+#: use. It's read-only.
+SELECTORS = MappingProxyType(
+    {
+        key: Lookup(**lookup)
+        for key, lookup in {
+            "company_name": {"class_": "title_displayName"},
+            "company_url": {"class_": "link_internal"},
+            "nreviews": {"data_attr": "data-reviews-count-typography", "value": "true"},
+            "score": {"data_attr": "data-rating-typography", "value": "true"},
+            "categories": {"data_attr": "data-business-unit-info-category-typography"},
+            "side_panel": {"class_": "styles_businessInfoSideBar"},
+            # The rows of the rating distribution have the number of stars as
+            # the value, e.g. "one"
+            "rating_row": {"data_attr": "data-star-rating"},
+            "rating_bar": {"class_": "rating-distribution-row_barValue"},
+            "review_card": {"data_attr": "data-service-review-card-paper"},
+            "author_name": {
+                "data_attr": "data-consumer-name-typography",
+                "value": "true",
+            },
+            "author_id": {"data_attr": "data-consumer-profile-link", "value": "true"},
+            "is_verified": {
+                "data_attr": "data-review-label-tooltip-trigger-typography",
+                "value": "true",
+            },
+            "star_rating": {"data_attr": "data-service-review-rating"},
+            "date": {
+                "data_attr": "data-service-review-date-time-ago",
+                "value": "true",
+            },
+            "title": {"data_attr": "data-service-review-title-typography"},
+            "content": {
+                "data_attr": "data-service-review-text-typography",
+                "value": "true",
+            },
+            "author_nreviews": {"data_attr": "data-consumer-reviews-count"},
+            "country": {
+                "data_attr": "data-consumer-country-typography",
+                "value": "true",
+            },
+            "date_experience": {
+                "data_attr": "data-service-review-date-of-experience-typography",
+                "value": "true",
+            },
+        }.items()
+    }
+)
+
+
+def first_match(tag, index, prefixes, *, cached=None, name=None):
+    """
+    Return the first class-name prefix of ``prefixes`` that matches some
+    descendant of ``tag``, along with the matching elements.
+
+    :param prefixes: Prefixes tried in order.
+    :type prefixes: sequence(str)
+    :param cached: Prefix tried first, e.g. the one that matched on a page
+           with the same structure.
+    :type cached: str, optional
+    :param name: Required tag name.
+    :type name: str, optional
+    :return: The prefix, or ``None`` if none matches, and the elements.
+    :rtype: tuple(str, list(:class:`bs4.Tag`))
+    """
+
+    if cached:
+        found = index.find_all(tag, Lookup(class_=cached, name=name))
+
+        if found:
+            return cached, found
+
+    for prefix in prefixes:
+        if prefix == cached:
+            continue
+
+        found = index.find_all(tag, Lookup(class_=prefix, name=name))
+
+        if found:
+            return prefix, found
+
+    return None, []
+
+
+def select_all(tag, index, key, *, selectors=None, name=None):
+    """
+    Return the first class-name prefix of ``SELECTOR_FALLBACKS[key]`` that
+    matches some descendant of ``tag``, along with the matching elements.
+
+    :param selectors: Selectors that matched on pages with the same structure,
+           as kept by :class:`fakepilot.selector_cache.SelectorCache`. The
+           prefix stored for ``key`` is tried first, and the prefix that
+           matches is stored in it. It belongs to the extraction of a page,
+           so it mustn't be shared by concurrent extractions.
+    :type selectors: dict(str, str), optional
+    :param name: Required tag name.
+    :type name: str, optional
+    :return: The prefix, or ``None`` if none matches, and the elements.
+    :rtype: tuple(str, list(:class:`bs4.Tag`))
+    """
+
+    cached = selectors.get(key) if selectors else None
+    prefix, found = first_match(
+        tag, index, SELECTOR_FALLBACKS[key], cached=cached, name=name
+    )
+
+    if prefix is not None and selectors is not None:
+        selectors[key] = prefix
+
+    return prefix, found
+
+
+def get_index(tag, index=None):
+    """
+    Return ``index`` or, if it is ``None``, a new :class:`PageIndex`
+    of ``tag``.
+    """
+
+    if index is None:
+        index = PageIndex(tag)
+    return index
+
+
+def _builtin_plan():
+    """Return :data:`fakepilot.spec.BUILTIN_PLAN`."""
+    # The spec module is built from this one's selectors, so it's imported
+    # on first use, once both are loaded
+    return importlib.import_module(f"{__package__}.spec").BUILTIN_PLAN
+
+
+def _company_field(tag, index, name):
+    """Return the company's field ``name`` read by the built-in spec."""
+    return _builtin_plan().extract_company(tag, index, fields=(name,))[name]
+
+
+def _review_field(tag, index, name):
+    """Return the review's field ``name`` read by the built-in spec."""
+    return _builtin_plan().extract_review(tag, index, (name,))[name]
+
+
+def extract_url(tag, index=None):
     """
     Return the URL of the company.
 
@@ -34,18 +404,15 @@ def extract_url(tag):
     as it is stored in Trustpilot.
     """
 
-    # For May 2025 pages
-    business_url = tag.find(class_=re.compile("link_internal"))
+    return _company_field(tag, index, "url")
 
-    return "".join(business_url.strings)
 
-
-def extract_company_name(tag):
+def extract_company_name(tag, index=None):
     """Return the name of the company."""
-    return next(tag.find(class_=re.compile("title_displayName")).strings)
+    return _company_field(tag, index, "name")
 
 
-def extract_rating_stats(tag):
+def extract_rating_stats(tag, index=None):
     """
     Extract the number of reviews and the TrustScore.
 
@@ -53,27 +420,17 @@ def extract_rating_stats(tag):
     are in the same tag.
     """
 
-    nreviews_tag = tag.find(attrs={"data-reviews-count-typography": "true"})
+    stats = _builtin_plan().extract_company(tag, index, fields=("nreviews", "score"))
 
-    if not nreviews_tag:
+    if stats["nreviews"] is None:
         raise RuntimeError(
             "The tag where the score and the number of reviews are hasn't been found."
         )
 
-    nreviews = (
-        nreviews_tag.string.split()[0]
-        if nreviews_tag.string
-        else next(nreviews_tag.strings)
-    )
-
-    # The thousand separator is different for some countries
-    nreviews = re.sub(r"[.,\xa0]", "", nreviews)
-    score_tag = tag.find(attrs={"data-rating-typography": "true"})
-    score = score_tag.string.replace(",", ".")
-    return (int(nreviews), float(score))
+    return (stats["nreviews"], stats["score"])
 
 
-def extract_contact_info(tag):
+def extract_contact_info(tag, index=None, selectors=None):
     """
     Extract the phone, address and email fields.
 
@@ -91,21 +448,17 @@ def extract_contact_info(tag):
         r"([A-Za-z0-9]+[.-_])*[A-Za-z0-9]+@[A-Za-z0-9-]+(\.[A-Z|a-z]{2,})+"
     )
 
-    # For May 2025 pages
-    contact_elements = tag.find_all("li", class_=re.compile("styles_itemRow"))
+    prefix, contact_elements = select_all(
+        tag, get_index(tag, index), "contact_elements", selectors=selectors, name="li"
+    )
 
-    # For December 2023 pages
-    if not contact_elements:
-        contact_elements = tag.find_all(
-            "li", class_=re.compile("styles_contactInfoElement")
-        )
-    else:
+    if prefix == "styles_itemRow":
         # On modern pages the last element is the company's URL,
         # so we ned to remove it from the contact element list.
         contact_elements = contact_elements[:-1]
 
     for contact_info in contact_elements:
-        line = ",".join(contact_info.strings)
+        line = node_text(contact_info, separator=",")
 
         if phone_re.search(line):
             phone = line
@@ -117,58 +470,60 @@ def extract_contact_info(tag):
     return (phone, email, address)
 
 
-def extract_categories(tag):
+def extract_categories(tag, index=None):
     """
     Return the company's category list.
     """
 
-    cat_refs = tag.find_all(has_attr("data-business-unit-info-category-typography"))
-    categories = [cat_tag.string for cat_tag in cat_refs]
-
-    return categories
+    return _company_field(tag, index, "categories")
 
 
-def extract_is_claimed(tag):
+def extract_is_claimed(tag, index=None, selectors=None):
     """
     Indicate if the Trustpilot company's page is claimed by the company.
+
+    The label is searched in the strings of the page, except its scripts.
+    When ``selectors`` is given, the class-name prefix of the element that
+    contains the label is stored in it. If the page has elements with the
+    stored prefix, the label is only searched in them.
     """
 
-    claimed_tag = tag.find(string=re.compile("Claimed profile"))
-    return bool(claimed_tag)
+    claimed_re = re.compile("Claimed profile")
+    index = get_index(tag, index)
+    label_prefix = selectors.get("claimed_label") if selectors else None
 
+    if label_prefix:
+        label_tags = index.find_all(tag, Lookup(class_=label_prefix))
 
-def extract_percentage_stars(tag):
-    """
-    Extract the percentage of reviews that the company has received for each
-    rating (1 star, 2 stars, etc.).
-    """
+        # The elements of the label are on unclaimed pages too, with
+        # another text, so the rest of the page isn't searched
+        if label_tags:
+            return any(label_tag.find(string=claimed_re) for label_tag in label_tags)
 
-    rating_dist_str = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5}
-    rating_dist = dict(
-        zip(range(1, len(rating_dist_str.keys()) + 1), [None] * len(rating_dist_str))
+    # The scripts have the texts of every label, whether it's shown or not
+    claimed_tag = tag.find(
+        string=lambda string: (
+            claimed_re.search(string) is not None and string.parent.name != "script"
+        )
     )
 
-    # The rating distribution information is in a side panel. Also,
-    # there are other tags in the page with the attributes data-star-rating,
-    # so that's why we need to get first the side panel
-    side_info_tag = tag.find(class_=re.compile("styles_businessInfoSideBar"))
+    if claimed_tag and selectors is not None:
+        for parent in claimed_tag.parents:
+            if parent.get("class"):
+                prefixes = {class_prefix(name) for name in parent["class"]}
+                selectors["claimed_label"] = min(sorted(prefixes), key=index.count)
+                break
 
-    if side_info_tag:
-        for number_stars_str, nstars in rating_dist_str.items():
-            rating_tag = side_info_tag.find(
-                attrs={"data-star-rating": number_stars_str}
-            )
+    return bool(claimed_tag)
 
-            if rating_tag:
-                bar_tag = rating_tag.find(
-                    class_=re.compile("rating-distribution-row_barValue")
-                )
-                percentage = bar_tag.attrs["style"].split(":")[-1].rstrip("%")
-                rating_dist[nstars] = float(percentage)
 
-    if any(rating_dist):
-        return rating_dist
-    return None
+def extract_percentage_stars(tag, index=None):
+    """
+    Extract the percentage of reviews that the company has received for each
+    rating (1 star, 2 stars, etc.).
+    """
+
+    return _company_field(tag, index, "rating_distribution")
 
 
 def parse_page(page):
@@ -184,156 +539,220 @@ def parse_page(page):
     :rtype: :class:`bs4.BeautifulSoup`
     """
 
-    return BeautifulSoup(page, PARSER)
-
-
-def extract_company_info(tag):
-    """Extract the data of a company."""
-    try:
-        nreviews, score = extract_rating_stats(tag)
-    # On old Trsutpilot pages, if the company closed
-    # then the company's page does not show the score or
-    # number of reviews
-    except RuntimeError:
-        score = nreviews = None
-
-    phone, email, address = extract_contact_info(tag)
-
-    return {
-        "name": extract_company_name(tag),
-        "url": extract_url(tag),
-        "nreviews": nreviews,
-        "score": score,
-        "categories": extract_categories(tag),
-        "email": email,
-        "phone": phone,
-        "address": address,
-        "is_claimed": extract_is_claimed(tag),
-        "rating_distribution": extract_percentage_stars(tag),
-    }
+    from bs4 import BeautifulSoup  # pylint: disable=import-outside-toplevel
+
+    return BeautifulSoup(page, get_parser())
+
 
+def extract_company_info(tag, index=None, selectors=None):
+    """
+    Extract the data of a company.
+
+    :param tag: Parsed company's page.
+    :type tag: :class:`bs4.BeautifulSoup`
+    :param index: Index of the page. It is built if it isn't given.
+    :type index: :class:`PageIndex`, optional
+    :param selectors: Selectors that matched on pages with the same structure.
+           See :func:`select_all`.
+    :type selectors: dict(str, str), optional
+    """
+
+    return _builtin_plan().extract_company(tag, index, selectors)
 
-def extract_review_author_name(tag):
+
+def extract_review_author_name(tag, index=None):
     """Extract the review's author's name."""
-    consumer_node = tag.find(attrs={"data-consumer-name-typography": "true"})
-    return consumer_node.string
+    return _review_field(tag, index, "author_name")
 
 
-def extract_review_author_id(tag):
+def extract_review_author_id(tag, index=None):
     """Extract the review's author id."""
-    consumer_node = tag.find(attrs={"data-consumer-profile-link": "true"})
-
-    # The author link is https://www.trustpilot.com/users/66642b4....954121bbb4cc643
-    return consumer_node.get("href").rsplit("/", 1)[-1]
+    return _review_field(tag, index, "author_id")
 
 
-def extract_review_rating(tag):
+def extract_review_rating(tag, index=None):
     """Extract the rating in the review."""
-    attr_name = "data-service-review-rating"
-    star_rating_node = tag.find(has_attr(attr_name))
-    return float(star_rating_node.attrs[attr_name])
+    return _review_field(tag, index, "star_rating")
 
 
-def extract_review_date(tag):
+def extract_review_date(tag, index=None):
     """Extract the date the review was posted."""
-    date_node = tag.find(attrs={"data-service-review-date-time-ago": "true"})
-    return datetime.datetime.strptime(date_node["datetime"], "%Y-%m-%dT%H:%M:%S.%fZ")
+    return _review_field(tag, index, "date")
 
 
-def extract_review_title(tag):
+def extract_review_title(tag, index=None):
     """Extract the title of the review."""
-    title_node = tag.find(has_attr("data-service-review-title-typography"))
-    return title_node.string.strip()
+    return _review_field(tag, index, "title")
 
 
-def concat_strings(node):
+#: Whitespace modes of :func:`node_text`.
+WHITESPACE_MODES = (None, "strip", "strip_newlines", "collapse")
+
+
+def _text_parts(node):
     """
-    Concatenate the strings contained in ``node`` as a unique and complete
-    string.
+    Yield the strings of ``node``, as :attr:`bs4.Tag.strings`, and a line
+    break for every ``<br>`` element.
+    """
+
+    types = node.interesting_string_types or node.MAIN_CONTENT_STRING_TYPES
+
+    if isinstance(types, type):
+        types = (types,)
+
+    for descendant in node.descendants:
+        if type(descendant) in types:
+            yield descendant
+        elif descendant.name == "br":
+            yield "\n"
+
 
-    We need to check if there is just one or more strings. In case of the
-    latter, then we need to concatenate them.
-    See https://www.crummy.com/software/BeautifulSoup/bs4/doc/#string
+def node_text(node, separator="", whitespace=None, normalize=None, line_breaks=False):
     """
+    Return the text of ``node``, its strings joined in a single pass.
+
+    :param node: Element whose text is returned.
+    :type node: :class:`bs4.Tag`
+    :param separator: String inserted between the strings.
+    :type separator: str, optional
+    :param whitespace: How the whitespace is normalized. ``None`` keeps it as
+           it is, ``'strip'`` removes it from both ends, ``'strip_newlines'``
+           also removes the newlines, and ``'collapse'`` replaces every run of
+           whitespace by a space, except the line breaks if ``line_breaks`` is
+           set, and removes it from both ends.
+    :type whitespace: str, optional
+    :param normalize: Unicode normalization form applied to the text, e.g.
+           ``'NFC'``. See :func:`unicodedata.normalize`.
+    :type normalize: str, optional
+    :param line_breaks: Whether ``<br>`` elements are returned as line breaks.
+    :type line_breaks: bool, optional
+    :rtype: str
+    """
+
+    if whitespace not in WHITESPACE_MODES:
+        raise ValueError(
+            f"Unknown whitespace mode {whitespace!r}, it must be one of "
+            f"{WHITESPACE_MODES}."
+        )
+
+    string = node.string
 
-    if node.string:
-        concat_string = str(node.string)
+    # Most elements have a single string, which is copied without walking
+    # the subtree. With 'strip_newlines', the newlines are dropped in the
+    # same copy, and the text is only copied again if its ends are stripped.
+    if string is not None:
+        if whitespace == "strip_newlines":
+            text = string.replace("\n", "")
+        else:
+            text = str(string)
     else:
-        concat_string = reduce(operator.add, node.strings)
-    return concat_string
+        text = separator.join(_text_parts(node) if line_breaks else node.strings)
+
+        if whitespace == "strip_newlines" and "\n" in text:
+            text = text.replace("\n", "")
+
+    if whitespace in ("strip", "strip_newlines"):
+        text = text.strip()
+    elif whitespace == "collapse":
+        if line_breaks:
+            text = "\n".join(" ".join(line.split()) for line in text.split("\n"))
+            text = text.strip()
+        else:
+            text = " ".join(text.split())
+
+    if normalize is not None:
+        text = unicodedata.normalize(normalize, text)
+
+    return text
+
+
+def concat_strings(node):
+    """
+    Concatenate the strings contained in ``node`` as a unique and complete
+    string. See :func:`node_text`.
+    """
 
+    return node_text(node)
 
-def extract_review_content(tag):
+
+def extract_review_content(tag, index=None, line_breaks=False):
     """
     Extract the content or body of the review.
 
-    It is returned in Unicode encoding.
+    It is returned in Unicode encoding. The newlines are removed, unless
+    ``line_breaks`` is set, and then the ``<br>`` elements are also returned
+    as line breaks.
     """
 
-    content_node = tag.find(attrs={"data-service-review-text-typography": "true"})
+    if not line_breaks:
+        return _review_field(tag, index, "content")
 
-    if not content_node:
-        content = ""
-    else:
-        content = concat_strings(content_node)
-        content = content.replace("\n", "").strip()
+    # The built-in spec doesn't keep the line breaks
+    content_node = get_index(tag, index).find(tag, SELECTORS["content"])
 
-    return content
+    if not content_node:
+        return ""
+    return node_text(content_node, whitespace="strip", line_breaks=True)
 
 
-def extract_number_reviews_author(tag):
+def extract_number_reviews_author(tag, index=None):
     """
     Extract the number of reviews made by the author of the current review.
     """
 
-    attr = "data-consumer-reviews-count"
-    nreviews_node = tag.find(has_attr(attr))
-    return int(nreviews_node.attrs[attr])
+    return _review_field(tag, index, "nreviews")
 
 
-def extract_authors_country(tag):
+def extract_authors_country(tag, index=None):
     """
     Extract the country where the author is from.
     """
 
-    country_node = tag.find(attrs={"data-consumer-country-typography": "true"})
-    country = concat_strings(country_node)
-    return country
+    return _review_field(tag, index, "country")
 
 
-def extract_date_experience(tag):
+def extract_date_experience(tag, index=None):
     """
     Extract the date of experience of the review.
     """
 
-    exp_node = tag.find(
-        attrs={"data-service-review-date-of-experience-typography": "true"}
-    )
-    exp_date_str = concat_strings(exp_node)
-    exp_date_str = exp_date_str.split(":")[-1].strip()
-    return datetime.datetime.strptime(exp_date_str, "%B %d, %Y")
+    return _review_field(tag, index, "date_experience")
 
 
-def extract_is_verified(tag):
+def extract_is_verified(tag, index=None):
     """
     Extract if the review is verified.
     """
 
-    ver_node = tag.find(attrs={"data-review-label-tooltip-trigger-typography": "true"})
-    return bool(ver_node)
+    return _review_field(tag, index, "is_verified")
 
 
-def extract_review_info(tag):
-    """Extract the review's data"""
-    return {
-        "author_name": extract_review_author_name(tag),
-        "author_id": extract_review_author_id(tag),
-        "is_verified": extract_is_verified(tag),
-        "star_rating": extract_review_rating(tag),
-        "date": extract_review_date(tag),
-        "title": extract_review_title(tag),
-        "content": extract_review_content(tag),
-        "nreviews": extract_number_reviews_author(tag),
-        "country": extract_authors_country(tag),
-        "date_experience": extract_date_experience(tag),
-    }
+def review_cards(company_page, index=None, limit=None):
+    """
+    Return the review cards of the reviews' section of a company's page, in
+    document order.
+
+    :param company_page: Parsed company's page.
+    :type company_page: :class:`bs4.BeautifulSoup`
+    :param index: Index of the page. It is built if it isn't given.
+    :type index: :class:`PageIndex`, optional
+    :param limit: Maximum number of returned cards.
+    :type limit: int, optional
+    :rtype: list(:class:`bs4.Tag`)
+    """
+
+    return _builtin_plan().review_cards(company_page, index, limit=limit)
+
+
+def extract_review_info(tag, index=None):
+    """
+    Extract the review's data
+
+    :param tag: Review card.
+    :type tag: :class:`bs4.Tag`
+    :param index: Index of the page the card belongs to. An index of the
+           card is built if it isn't given.
+    :type index: :class:`PageIndex`, optional
+    """
+
+    return _builtin_plan().extract_review(tag, index)
@@ -0,0 +1,38 @@
+"""
+Tests of fakepilot, and the test pages shared by them.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+
+class CorpusTestCase(unittest.TestCase):
+    """
+    Test case with the HTML test files extracted to a temporary directory.
+
+    The files are extracted to ``pages_dir``, inside ``temp_dir``, where the
+    tests can write other files. Their paths are in ``paths``, sorted.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Extract the HTML test files."""
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.pages_dir = os.path.join(cls.temp_dir, "pages")
+        shutil.unpack_archive(DATA_DIR / "text_files.zip", cls.pages_dir)
+        cls.paths = [
+            os.path.join(cls.pages_dir, filename)
+            for filename in sorted(os.listdir(cls.pages_dir))
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary directory."""
+        shutil.rmtree(cls.temp_dir)
@@ -0,0 +1,120 @@
+"""
+Tests the aggregates of the extracted reviews.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import unittest
+from datetime import datetime
+
+try:
+    import numpy as np
+
+    from fakepilot import analytics
+except ImportError:
+    np = None
+
+
+def make_review(star_rating, date, is_verified=False, nreviews=1):
+    """Return a review with the fields used by the aggregates."""
+    return {
+        "star_rating": float(star_rating),
+        "date": date,
+        "is_verified": is_verified,
+        "nreviews": nreviews,
+    }
+
+
+@unittest.skipIf(np is None, "NumPy is required")
+class TestAnalytics(unittest.TestCase):
+    """
+    Tests the aggregates on a small set of companies.
+    """
+
+    def setUp(self):
+        """Build the arrays of three companies."""
+        self.companies = [
+            {
+                "url": "a.com",
+                "rating_distribution": {1: 50.0, 2: 0.0, 3: 0.0, 4: 0.0, 5: 50.0},
+                "reviews": [
+                    make_review(5, datetime(2024, 1, 3), True, 12),
+                    make_review(1, datetime(2024, 1, 20), False, 1),
+                    make_review(5, datetime(2024, 3, 1, 10, 30), True, 2),
+                    make_review(4, datetime(2024, 3, 2), False, 150),
+                ],
+            },
+            {"url": "b.com", "rating_distribution": None, "reviews": []},
+            {
+                "url": "c.com",
+                "rating_distribution": {1: 0.0, 2: 0.0, 3: 100.0, 4: 0.0, 5: 0.0},
+                "reviews": [make_review(3, datetime(2024, 2, 14), False, 3)],
+            },
+        ]
+        self.arrays = analytics.ReviewArrays.from_companies(self.companies)
+
+    def test_arrays(self):
+        """Test the columns of the arrays."""
+        self.assertEqual(len(self.arrays), 5)
+        self.assertEqual(self.arrays.companies, ["a.com", "b.com", "c.com"])
+        self.assertEqual(self.arrays.company.tolist(), [0, 0, 0, 0, 2])
+        self.assertEqual(self.arrays.date[2], np.datetime64("2024-03-01T10:30:00", "s"))
+        self.assertTrue(np.isnan(self.arrays.rating_distribution[1]).all())
+
+    def test_rating_histogram(self):
+        """Test the number of reviews of each rating."""
+        np.testing.assert_array_equal(
+            analytics.rating_histogram(self.arrays),
+            [[1, 0, 0, 1, 2], [0, 0, 0, 0, 0], [0, 0, 1, 0, 0]],
+        )
+
+    def test_monthly_scores(self):
+        """Test the mean rating of each month."""
+        months, means, counts = analytics.monthly_scores(self.arrays)
+        np.testing.assert_array_equal(
+            months, np.array(["2024-01", "2024-02", "2024-03"], dtype="datetime64[M]")
+        )
+        np.testing.assert_array_equal(counts, [[2, 0, 2], [0, 0, 0], [0, 1, 0]])
+        np.testing.assert_array_equal(
+            means, [[3.0, np.nan, 4.5], [np.nan] * 3, [np.nan, 3.0, np.nan]]
+        )
+
+    def test_verified_split(self):
+        """Test the number and mean rating of the unverified and verified reviews."""
+        counts, means = analytics.verified_split(self.arrays)
+        np.testing.assert_array_equal(counts, [[2, 2], [0, 0], [1, 0]])
+        np.testing.assert_array_equal(means[0], [2.5, 5.0])
+
+    def test_author_nreviews_distribution(self):
+        """Test the distribution of the authors' number of reviews."""
+        distribution = analytics.author_nreviews_distribution(
+            self.arrays, bins=(1, 2, 10, 100)
+        )
+        np.testing.assert_array_equal(
+            distribution, [[1, 1, 1, 1], [0, 0, 0, 0], [0, 1, 0, 0]]
+        )
+
+    def test_check_rating_distribution(self):
+        """Test the deviation of the observed from the stated distribution."""
+        deviation = analytics.check_rating_distribution(self.arrays)
+        np.testing.assert_array_equal(deviation[0], [-25.0, 0.0, 0.0, 25.0, 0.0])
+        self.assertTrue(np.isnan(deviation[1]).all())
+        np.testing.assert_array_equal(deviation[2], [0.0] * 5)
+
+    def test_concatenate(self):
+        """Test that joined arrays give the same aggregates."""
+        joined = analytics.ReviewArrays.concatenate(
+            [
+                analytics.ReviewArrays.from_companies(self.companies[:1]),
+                analytics.ReviewArrays.from_companies(self.companies[1:]),
+            ]
+        )
+        self.assertEqual(joined.companies, self.arrays.companies)
+        np.testing.assert_array_equal(
+            analytics.rating_histogram(joined), analytics.rating_histogram(self.arrays)
+        )
+
+        empty = analytics.ReviewArrays.concatenate([])
+        self.assertEqual((len(empty), empty.ncompanies), (0, 0))
+        self.assertEqual(empty.rating_distribution.shape, (0, 5))
+        self.assertEqual(analytics.rating_histogram(empty).shape, (0, 5))
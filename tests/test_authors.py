@@ -0,0 +1,208 @@
+"""
+Tests the index of the reviews' authors across companies.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import random
+import unittest
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np
+
+    from fakepilot.authors import AuthorIndex
+except ImportError:
+    np = None
+
+
+def make_review(author_id, star_rating, date):
+    """Return a review with the fields used by the index."""
+    return {"author_id": author_id, "star_rating": float(star_rating), "date": date}
+
+
+COMPANIES = [
+    {
+        "url": "a.com",
+        "reviews": [
+            make_review("u1", 5, datetime(2024, 5, 1, 10)),
+            make_review("u2", 5, datetime(2024, 5, 1, 11)),
+            make_review("u3", 5, datetime(2024, 5, 1, 12)),
+            make_review("u4", 2, datetime(2024, 6, 20)),
+        ],
+    },
+    {
+        "url": "b.com",
+        "reviews": [
+            make_review("u2", 5, datetime(2024, 5, 2)),
+            make_review("u1", 4, datetime(2024, 5, 3)),
+        ],
+    },
+    {"url": "c.com", "reviews": [make_review("u3", 1, datetime(2023, 1, 1))]},
+]
+
+
+@unittest.skipIf(np is None, "NumPy is required")
+class TestAuthorIndex(unittest.TestCase):
+    """
+    Tests the queries of the author index.
+    """
+
+    def setUp(self):
+        """Index the reviews of three companies, added in three updates."""
+        self.index = AuthorIndex()
+
+        for company in COMPANIES:
+            self.index.add(company)
+
+    def test_queries_between_updates(self):
+        """Test that the reviews added after a query are merged into the views."""
+        index = AuthorIndex()
+        index.add(COMPANIES[0])
+        self.assertEqual(index.authors_of("a.com"), ["u1", "u2", "u3", "u4"])
+        index.add(COMPANIES[1])
+        self.assertEqual(index.shared_authors("a.com", "b.com"), ["u1", "u2"])
+        index.add(COMPANIES[2])
+
+        for author_id in ("u1", "u2", "u3", "u4"):
+            with self.subTest(author_id=author_id):
+                self.assertEqual(
+                    index.reviews_of(author_id), self.index.reviews_of(author_id)
+                )
+
+        self.assertEqual(
+            index.in_window("a.com", datetime(2000, 1, 1), datetime(2030, 1, 1)),
+            self.index.in_window("a.com", datetime(2000, 1, 1), datetime(2030, 1, 1)),
+        )
+
+    def test_interleaved_updates(self):
+        """
+        Test that the queries between many updates return the same as an
+        index built at once.
+        """
+
+        rng = random.Random(0)
+        companies = [
+            {
+                "url": f"{number}.com",
+                "reviews": [
+                    make_review(
+                        f"u{rng.randrange(40)}",
+                        rng.randint(1, 5),
+                        datetime(2024, 1, 1) + timedelta(days=rng.randrange(30)),
+                    )
+                    for _ in range(rng.randrange(12))
+                ],
+            }
+            # Some companies are added several times
+            for number in (rng.randrange(30) for _ in range(100))
+        ]
+        built, updated = AuthorIndex(), AuthorIndex()
+
+        for company in companies:
+            built.add(company)
+            updated.add(company)
+            updated.authors_of(company["url"])
+
+        self.assertEqual(len(updated), len(built))
+        start, end = datetime(2024, 1, 5), datetime(2024, 1, 25)
+
+        for company in sorted({company["url"] for company in companies}):
+            with self.subTest(company=company):
+                self.assertEqual(updated.authors_of(company), built.authors_of(company))
+                self.assertEqual(
+                    updated.in_window(company, start, end),
+                    built.in_window(company, start, end),
+                )
+                self.assertEqual(
+                    updated.bursts(company, timedelta(days=3), 4),
+                    built.bursts(company, timedelta(days=3), 4),
+                )
+
+        for author_id in built.authors:
+            with self.subTest(author_id=author_id):
+                self.assertEqual(
+                    updated.reviews_of(author_id), built.reviews_of(author_id)
+                )
+
+        self.assertEqual(
+            updated.shared_authors("1.com", "2.com"),
+            built.shared_authors("1.com", "2.com"),
+        )
+
+        for updated_array, built_array in zip(
+            updated.author_company_counts(), built.author_company_counts()
+        ):
+            np.testing.assert_array_equal(updated_array, built_array)
+
+    def test_company_without_reviews(self):
+        """Test the queries of companies without reviews."""
+        index = AuthorIndex()
+        index.add_reviews("empty.com", [])
+        self.assertEqual(index.authors_of("empty.com"), [])
+        index.add(COMPANIES[2])
+        index.add_reviews("other.com", [])
+        self.assertEqual(index.authors_of("other.com"), [])
+        self.assertEqual(index.authors_of("c.com"), ["u3"])
+
+    def test_date_out_of_range(self):
+        """Test that a date that can't be sorted is rejected."""
+        with self.assertRaises(ValueError):
+            self.index.add_reviews(
+                "d.com", [make_review("u1", 1, datetime(1600, 1, 1))]
+            )
+
+    def test_reviews_of(self):
+        """Test the reviews of an author across companies."""
+        self.assertEqual(len(self.index), 7)
+        self.assertEqual(
+            self.index.reviews_of("u1"),
+            [
+                ("a.com", 5, datetime(2024, 5, 1, 10)),
+                ("b.com", 4, datetime(2024, 5, 3)),
+            ],
+        )
+        self.assertEqual(self.index.reviews_of("unknown"), [])
+
+    def test_shared_authors(self):
+        """Test the authors shared by two companies."""
+        self.assertEqual(self.index.shared_authors("a.com", "c.com"), ["u3"])
+        self.assertEqual(self.index.shared_authors("b.com", "c.com"), [])
+        self.assertEqual(self.index.shared_authors("a.com", "unknown"), [])
+        self.assertEqual(self.index.authors_of("b.com"), ["u1", "u2"])
+
+    def test_in_window(self):
+        """Test the reviews of a company in a period."""
+        self.assertEqual(
+            [
+                author
+                for author, _, _ in self.index.in_window(
+                    "a.com", datetime(2024, 5, 1, 11), datetime(2024, 6, 20)
+                )
+            ],
+            ["u2", "u3"],
+        )
+
+    def test_bursts(self):
+        """Test the periods with many reviews."""
+        self.assertEqual(
+            self.index.bursts("a.com", timedelta(hours=3), 3),
+            [(datetime(2024, 5, 1, 10), 3)],
+        )
+        self.assertEqual(self.index.bursts("a.com", timedelta(hours=1), 2), [])
+
+    def test_author_company_counts(self):
+        """Test the coordinates of the author × company matrix."""
+        rows, columns, counts = self.index.author_company_counts()
+        self.assertEqual(
+            sorted(zip(rows.tolist(), columns.tolist(), counts.tolist())),
+            [
+                (0, 0, 1),
+                (0, 1, 1),
+                (1, 0, 1),
+                (1, 1, 1),
+                (2, 0, 1),
+                (2, 2, 1),
+                (3, 0, 1),
+            ],
+        )
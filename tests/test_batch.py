@@ -0,0 +1,230 @@
+"""
+Tests the extraction of many pages with pools of threads and processes.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import copy
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+from fakepilot import ExtractOptions, batch, extract_info, memory, xray
+from fakepilot.batch import BatchExtractor, extract_many
+from fakepilot.selector_cache import SelectorCache
+from fakepilot.spec import BUILTIN_SPEC
+
+from . import CorpusTestCase
+
+
+class TestBatch(CorpusTestCase):
+    """
+    Tests that the pages extracted concurrently are extracted as one by one.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Extract the information of the test pages one by one."""
+        super().setUpClass()
+        cls.expected = []
+
+        for path in cls.paths:
+            with open(path, encoding="utf-8") as file:
+                cls.expected.append(extract_info(file, with_reviews=True, nreviews=20))
+
+    def test_modes(self):
+        """Test that both modes return the pages' information in order."""
+        for mode in ("thread", "process"):
+            with self.subTest(mode=mode):
+                self.assertEqual(
+                    extract_many(
+                        self.paths, mode, workers=2, with_reviews=True, nreviews=20
+                    ),
+                    self.expected,
+                )
+
+    def test_spec(self):
+        """Test the spec of the extractor and a spec of a call."""
+        new_spec = copy.deepcopy(BUILTIN_SPEC)
+        new_spec["company"]["trustscore"] = new_spec["company"].pop("score")
+        expected = []
+
+        for company in self.expected[:3]:
+            company = dict(company)
+            company["trustscore"] = company.pop("score")
+            expected.append(company)
+
+        for mode in ("thread", "process"):
+            with self.subTest(mode=mode):
+                with BatchExtractor(mode, workers=2, spec=new_spec) as extractor:
+                    self.assertEqual(
+                        list(
+                            extractor.map(
+                                self.paths[:3], with_reviews=True, nreviews=20
+                            )
+                        ),
+                        expected,
+                    )
+                    self.assertEqual(
+                        list(
+                            extractor.map(
+                                self.paths[:3],
+                                with_reviews=True,
+                                nreviews=20,
+                                spec=BUILTIN_SPEC,
+                            )
+                        ),
+                        self.expected[:3],
+                    )
+
+    def test_thread_stress(self):
+        """
+        Test many threads extracting the pages several times with a shared
+        selector cache.
+        """
+
+        cache = SelectorCache()
+        rounds = 2
+
+        with BatchExtractor("thread", workers=16, selector_cache=cache) as extractor:
+            results = list(
+                extractor.map(self.paths * rounds, with_reviews=True, nreviews=20)
+            )
+
+        self.assertEqual(results, self.expected * rounds)
+        self.assertEqual(cache.hits + cache.misses, len(self.paths) * rounds)
+
+    def test_parser_race(self):
+        """Test that threads racing on the first parser choice agree."""
+        old_parser = xray.get_parser()
+        del xray.PARSER
+        barrier = threading.Barrier(16)
+        parsers = []
+
+        def choose():
+            """Choose the parser along with the other threads."""
+            barrier.wait()
+            parsers.append(xray.get_parser())
+
+        threads = [threading.Thread(target=choose) for _ in range(16)]
+
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            xray.PARSER = old_parser
+
+        self.assertEqual(parsers, [old_parser] * 16)
+
+    def test_errors(self):
+        """Test that an extraction error is raised in order."""
+        paths = [self.paths[0], os.path.join(self.temp_dir, "missing.txt")]
+
+        with open(self.paths[0], encoding="utf-8") as file:
+            first = extract_info(file)
+
+        with BatchExtractor("thread", workers=2) as extractor:
+            results = extractor.map(paths)
+            self.assertEqual(next(results), first)
+
+            with self.assertRaises(FileNotFoundError):
+                next(results)
+
+        with self.assertRaises(ValueError):
+            BatchExtractor("fiber")
+
+    def test_memory_budget(self):
+        """
+        Test that the pages in flight fit in the memory budget, and that
+        their trees are decomposed.
+        """
+
+        lock = threading.Lock()
+        running = []
+        most_running = []
+
+        def track(file, *args, **kwargs):
+            """Extract a page, recording the pages extracted meanwhile."""
+            with lock:
+                running.append(file)
+                most_running.append(len(running))
+
+            time.sleep(0.01)
+
+            try:
+                return extract_info(file, *args, **kwargs)
+            finally:
+                with lock:
+                    running.remove(file)
+
+        # At most four pages fit in the budget
+        budget = 4 * min(os.path.getsize(path) for path in self.paths) * 16
+
+        with mock.patch.object(batch, "extract_info", track):
+            for memory_budget, limit in ((1, 1), (budget, 4)):
+                most_running.clear()
+
+                with self.subTest(memory_budget=memory_budget):
+                    with BatchExtractor(
+                        "thread", workers=8, memory_budget=memory_budget
+                    ) as extractor:
+                        results = list(
+                            extractor.map(self.paths, with_reviews=True, nreviews=20)
+                        )
+
+                    self.assertEqual(results, self.expected)
+                    self.assertLessEqual(max(most_running), limit)
+
+        pages = []
+        parse_page = xray.parse_page
+
+        def keep(*args):
+            """Parse a page and keep it."""
+            pages.append(parse_page(*args))
+            return pages[-1]
+
+        with mock.patch.object(xray, "parse_page", keep):
+            with open(self.paths[0], encoding="utf-8") as file:
+                self.assertEqual(
+                    extract_info(file, True, 20, ExtractOptions(dispose=True)),
+                    self.expected[0],
+                )
+
+        self.assertTrue(pages[0].decomposed)
+
+    def test_with_memory(self):
+        """Test that the RSS of the workers is reported with every result."""
+        paths = self.paths[:3] + [os.path.join(self.temp_dir, "missing.txt")]
+        expected = []
+
+        for path in paths[:3]:
+            with open(path, encoding="utf-8") as file:
+                expected.append(extract_info(file))
+
+        for mode in ("thread", "process"):
+            with self.subTest(mode=mode):
+                with BatchExtractor(mode, workers=2, memory_budget=2**30) as extractor:
+                    results = list(
+                        extractor.map(paths, with_memory=True, return_exceptions=True)
+                    )
+
+                self.assertEqual([company for company, _ in results[:3]], expected)
+                self.assertIsInstance(results[3][0], FileNotFoundError)
+                self.assertIsNone(results[3][1])
+
+                reports = [report for _, report in results[:3]]
+                summary = memory.summarize(reports)
+                self.assertEqual(summary["pages"], 3)
+
+                if memory.current_rss() is not None:
+                    for report in reports:
+                        self.assertGreaterEqual(report["peak_rss"], report["rss"])
+                    self.assertGreater(summary["steady_rss"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+"""
+Tests the changes of companies between two extractions.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import os
+import unittest
+
+from fakepilot import extract_info
+from fakepilot.changes import diff_companies, diff_page, diff_streams
+from fakepilot.store import SnapshotStore
+
+from . import CorpusTestCase
+
+
+class TestChanges(CorpusTestCase):
+    """
+    Tests the changes between the pages of the test companies crawled in
+    two years.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Extract the information of the test pages, by name of the file
+        without the year of the crawl.
+        """
+
+        super().setUpClass()
+        cls.old = {}
+        cls.new = {}
+
+        for path in cls.paths:
+            with open(path, encoding="utf-8") as file:
+                company = extract_info(file, with_reviews=True, nreviews=100)
+
+            filename = os.path.basename(path)
+            name = filename.replace("_2025", "")
+            company["url"] = name
+            (cls.new if "_2025" in filename else cls.old)[name] = company
+
+    def test_unchanged(self):
+        """Test that there are no changes between equal extractions."""
+        for company in self.old.values():
+            with self.subTest(url=company["url"]):
+                self.assertIsNone(diff_companies(company, dict(company)))
+
+    def test_crawls(self):
+        """Test the changes between the two crawls of every company."""
+        for name, new in self.new.items():
+            old = self.old[name]
+
+            with self.subTest(url=name):
+                delta = diff_companies(old, new) or {}
+                self.assertEqual(delta.get("key"), name)
+                self.assertEqual(delta.get("status"), "changed")
+
+                for field, (old_value, new_value) in delta.get("fields", {}).items():
+                    self.assertEqual(old_value, old[field])
+                    self.assertEqual(new_value, new[field])
+                    self.assertNotEqual(old_value, new_value)
+
+                old_reviews = {
+                    (review["author_id"], review["date"]) for review in old["reviews"]
+                }
+                new_reviews = delta.get("new_reviews", [])
+                self.assertTrue(all(review in new["reviews"] for review in new_reviews))
+                self.assertEqual(
+                    len(new["reviews"]) - len(new_reviews),
+                    len(old["reviews"]) - len(delta.get("removed_reviews", [])),
+                )
+
+                for review in delta.get("removed_reviews", []):
+                    self.assertIn((review["author_id"], review["date"]), old_reviews)
+
+    def test_edited_review(self):
+        """Test that an edited review is removed and new."""
+        old = self.old["twenix.es.txt"]
+        edited = dict(old["reviews"][0], content="Edited")
+        unchanged = dict(old["reviews"][1], nreviews=old["reviews"][1]["nreviews"] + 1)
+        new = dict(
+            old,
+            is_claimed=not old["is_claimed"],
+            rating_distribution={**old["rating_distribution"], 5: 0.0},
+            reviews=[edited, unchanged] + old["reviews"][2:],
+        )
+
+        self.assertEqual(
+            diff_companies(old, new),
+            {
+                "key": "twenix.es.txt",
+                "status": "changed",
+                "fields": {"is_claimed": (old["is_claimed"], not old["is_claimed"])},
+                "rating_distribution": {5: (old["rating_distribution"][5], 0.0)},
+                "new_reviews": [edited],
+                "removed_reviews": [
+                    {"author_id": edited["author_id"], "date": edited["date"]}
+                ],
+            },
+        )
+
+    def test_streams(self):
+        """Test the changes of the companies of two extractions."""
+        old = [company for name, company in self.old.items() if name != "twenix.es.txt"]
+        new = (self.new.get(name, company) for name, company in self.old.items())
+        deltas = list(diff_streams(old, new))
+
+        self.assertEqual(
+            [(delta["key"], delta["status"]) for delta in deltas],
+            [
+                (name, "added" if name == "twenix.es.txt" else "changed")
+                for name in self.old
+                if name in self.new
+            ],
+        )
+        self.assertEqual(
+            deltas[0],
+            diff_companies(self.old[deltas[0]["key"]], self.new[deltas[0]["key"]]),
+        )
+        self.assertEqual(
+            list(diff_streams(self.old.values(), [])),
+            [{"key": name, "status": "removed"} for name in self.old],
+        )
+
+    def test_sorted_streams(self):
+        """Test the merge of two extractions sorted by key."""
+        old = [company for name, company in self.old.items() if name != "twenix.es.txt"]
+        new = [self.new.get(name, company) for name, company in self.old.items()]
+        new = [company for company in new if company["url"] != "djmania.es.txt"]
+        deltas = list(
+            diff_streams(
+                sorted(old, key=lambda company: company["url"]),
+                sorted(new, key=lambda company: company["url"]),
+                sorted_by_key=True,
+            )
+        )
+
+        self.assertEqual(
+            deltas,
+            sorted(diff_streams(old, new), key=lambda delta: delta["key"]),
+        )
+        self.assertIn({"key": "djmania.es.txt", "status": "removed"}, deltas)
+
+        with self.assertRaises(ValueError):
+            list(diff_streams([], old[::-1], sorted_by_key=True))
+
+    def test_stored(self):
+        """Test the changes between a stored snapshot and a page."""
+        path = os.path.join(self.temp_dir, "store.sqlite")
+        filename = os.path.join(self.pages_dir, "djmania.es_2025.txt")
+
+        with SnapshotStore(path) as store:
+            old = dict(self.old["djmania.es.txt"], url="")
+            store.save([old])
+
+            with open(filename, encoding="utf-8") as file:
+                delta = diff_page(store, file, with_reviews=True, nreviews=100)
+
+            new = dict(self.new["djmania.es.txt"], url="")
+            self.assertEqual(delta, diff_companies(old, new))
+            self.assertEqual(list(diff_streams(store.companies(1), [new])), [delta])
+            self.assertEqual(
+                list(diff_streams(store.companies(1), [new], sorted_by_key=True)),
+                [delta],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+"""
+Tests the extraction daemon and its client.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from fakepilot import extract_info
+from fakepilot.daemon import (
+    DaemonClient,
+    DaemonError,
+    ExtractionServer,
+    is_loopback,
+)
+from fakepilot.serialization import loads
+
+from . import CorpusTestCase
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix domain sockets required")
+class TestDaemon(CorpusTestCase):
+    """
+    Tests that the daemon returns the same data as ``extract_info``.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Extract the HTML test files and start a daemon."""
+        super().setUpClass()
+        cls.address = os.path.join(cls.temp_dir, "fakepilot.sock")
+        cls.server, cls.thread = cls.start_server(
+            cls.address, workers=2, max_in_flight=3, root=cls.temp_dir
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the daemon and remove the extracted text files."""
+        cls.stop_server(cls.server, cls.thread)
+        super().tearDownClass()
+
+    @staticmethod
+    def start_server(address, **kwargs):
+        """Start a daemon in a thread and wait until it's ready."""
+        server = ExtractionServer(address, **kwargs)
+        thread = threading.Thread(target=server.run)
+        thread.start()
+        server.ready.wait(60)
+        return server, thread
+
+    @staticmethod
+    def stop_server(server, thread):
+        """Stop a daemon started by :meth:`start_server`."""
+        server.shutdown()
+        thread.join()
+
+    def test_map(self):
+        """Test that pipelined requests return the pages' data in order."""
+        expected = []
+
+        for path in self.paths:
+            with open(path, encoding="utf-8") as file:
+                expected.append(extract_info(file, with_reviews=True, nreviews=100))
+
+        with DaemonClient(self.address) as client:
+            results = list(
+                client.map(self.paths, with_reviews=True, nreviews=100, window=8)
+            )
+
+        self.assertEqual(results, expected)
+
+    def test_file_object(self):
+        """Test that the content of a file object is sent."""
+        with open(self.paths[0], encoding="utf-8") as file:
+            expected = extract_info(file)
+
+        with DaemonClient(self.address) as client, open(
+            self.paths[0], encoding="utf-8"
+        ) as file:
+            self.assertEqual(client.extract_info(file), expected)
+
+    def test_error(self):
+        """Test that an extraction error is raised by the client."""
+        with DaemonClient(self.address) as client:
+            with self.assertRaises(DaemonError):
+                client.extract_info(os.path.join(self.temp_dir, "missing.txt"))
+
+            # The connection is still usable
+            with open(self.paths[0], encoding="utf-8") as file:
+                name = extract_info(file)["name"]
+
+            self.assertEqual(client.extract_info(self.paths[0])["name"], name)
+
+    def test_root(self):
+        """Test that the paths out of the daemon's root aren't read."""
+        fd, outside = tempfile.mkstemp(suffix=".txt")
+        os.close(fd)
+        self.addCleanup(os.unlink, outside)
+        link = os.path.join(self.temp_dir, "link.txt")
+        os.symlink(outside, link)
+        self.addCleanup(os.unlink, link)
+
+        with DaemonClient(self.address) as client:
+            for path in (
+                outside,
+                os.path.join(self.temp_dir, "..", os.path.basename(outside)),
+                link,
+            ):
+                with self.subTest(path=path):
+                    with self.assertRaisesRegex(DaemonError, "PermissionError"):
+                        client.extract_info(path)
+
+        address = os.path.join(self.temp_dir, "no-root.sock")
+        server, thread = self.start_server(address, workers=1)
+        self.addCleanup(self.stop_server, server, thread)
+
+        with DaemonClient(address) as client:
+            with self.assertRaisesRegex(DaemonError, "send the page"):
+                client.extract_info(self.paths[0])
+
+    def test_remote_host(self):
+        """Test that a host that isn't a loopback address is refused."""
+        self.assertTrue(is_loopback("localhost"))
+        self.assertTrue(is_loopback("::1"))
+        self.assertFalse(is_loopback("192.0.2.1"))
+        self.assertFalse(is_loopback("example.com"))
+
+        with self.assertRaises(ValueError):
+            ExtractionServer(("192.0.2.1", 0))
+
+        ExtractionServer(("192.0.2.1", 0), allow_remote=True)
+
+    def test_max_in_flight(self):
+        """
+        Test that the daemon doesn't extract more than ``max_in_flight``
+        requests at the same time, even if it has idle workers.
+        """
+
+        address = os.path.join(self.temp_dir, "in-flight.sock")
+        server, thread = self.start_server(
+            address, workers=3, max_in_flight=2, root=self.temp_dir
+        )
+        self.addCleanup(self.stop_server, server, thread)
+
+        # A worker blocks opening a FIFO until it's opened for writing
+        fifos = [os.path.join(self.temp_dir, f"page{n}.fifo") for n in range(4)]
+
+        for fifo in fifos:
+            os.mkfifo(fifo)
+            self.addCleanup(os.unlink, fifo)
+
+        with open(self.paths[0], encoding="utf-8") as file:
+            content = file.read()
+
+        results = []
+        client = DaemonClient(address, timeout=60)
+        self.addCleanup(client.close)
+        requests = threading.Thread(
+            target=lambda: results.extend(client.map(fifos, window=len(fifos)))
+        )
+        requests.start()
+
+        def read_fifos(expected):
+            """Wait until ``expected`` FIFOs are being read and feed them."""
+            opened = []
+            deadline = time.monotonic() + 60
+
+            while len(opened) < expected and time.monotonic() < deadline:
+                for fifo in list(fifos):
+                    try:
+                        opened.append(os.open(fifo, os.O_WRONLY | os.O_NONBLOCK))
+                        fifos.remove(fifo)
+                    except OSError:
+                        # No worker is reading it
+                        pass
+
+                time.sleep(0.05)
+
+            # No other request is extracted meanwhile
+            time.sleep(0.5)
+
+            for fifo in fifos:
+                with self.assertRaises(OSError):
+                    os.close(os.open(fifo, os.O_WRONLY | os.O_NONBLOCK))
+
+            for fd in opened:
+                os.set_blocking(fd, True)
+                with os.fdopen(fd, "w", encoding="utf-8") as file:
+                    file.write(content)
+
+            return len(opened)
+
+        self.assertEqual(read_fifos(2), 2)
+        self.assertEqual(read_fifos(2), 2)
+        requests.join(60)
+
+        with open(self.paths[0], encoding="utf-8") as file:
+            self.assertEqual(results, [extract_info(file)] * 4)
+
+    def test_long_line(self):
+        """Test that a line over the length limit is answered with an error."""
+        address = os.path.join(self.temp_dir, "long-line.sock")
+
+        with mock.patch("fakepilot.daemon.MAX_LINE_LENGTH", 1024):
+            server, thread = self.start_server(address, workers=1)
+
+        self.addCleanup(self.stop_server, server, thread)
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(60)
+            sock.connect(address)
+            sock.sendall(b'{"page": "' + b"x" * 4096 + b'"}\n')
+
+            with sock.makefile("rb") as file:
+                response = loads(file.readline())
+                self.assertEqual(file.readline(), b"")
+
+        self.assertEqual(response, {"id": None, "error": "The line is too long."})
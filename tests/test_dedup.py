@@ -0,0 +1,139 @@
+"""
+Tests the near-duplicate detection of review texts.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import os
+import random
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+
+    from fakepilot import dedup
+except ImportError:
+    np = None
+
+TEXTS = [
+    "Fast delivery and the product was exactly as described. Will buy again!",
+    "Terrible customer service, they never answered my emails about the refund.",
+    "The pizza arrived cold and the fries were soggy. Not ordering again.",
+    "Great prices, friendly staff and a very easy return process.",
+]
+
+
+@unittest.skipIf(np is None, "NumPy is required")
+class TestMinHash(unittest.TestCase):
+    """
+    Tests the MinHash signatures.
+    """
+
+    def test_normalize_text(self):
+        """Test that case, punctuation and compatibility forms are normalized."""
+        self.assertEqual(dedup.normalize_text("Ｆast,  DELIVERY!\n"), "fast delivery")
+
+    def test_signatures(self):
+        """Test that equal texts have equal signatures and different ones don't."""
+        hasher = dedup.MinHasher(num_perm=64, batch_size=2, max_block=50)
+        signatures = hasher.signatures(TEXTS + [TEXTS[0].upper(), ""])
+
+        self.assertEqual(signatures.shape, (6, 64))
+        np.testing.assert_array_equal(signatures[0], signatures[4])
+        self.assertLess((signatures[0] == signatures[1]).mean(), 0.2)
+        self.assertTrue((signatures[5] == np.iinfo(np.uint32).max).all())
+
+    def test_batches_are_independent(self):
+        """Test that the signature of a text doesn't depend on its batch."""
+        alone = dedup.MinHasher().signatures(TEXTS[2:3])
+        together = dedup.MinHasher(max_block=10).signatures(TEXTS)
+        np.testing.assert_array_equal(alone[0], together[2])
+
+
+@unittest.skipIf(np is None, "NumPy is required")
+class TestLSHIndex(unittest.TestCase):
+    """
+    Tests the queries of the LSH index.
+    """
+
+    def setUp(self):
+        """Index the texts in two batches."""
+        self.index = dedup.LSHIndex(num_perm=128, bands=32)
+        self.index.add(TEXTS[:2], keys=[("a.com", "1"), ("a.com", "2")])
+        self.index.add_reviews(
+            [{"title": "", "content": text} for text in TEXTS[2:]],
+            keys=[("b.com", "3"), ("b.com", "4")],
+        )
+
+    def test_query_near_duplicate(self):
+        """Test that a lightly edited text is found."""
+        edited = TEXTS[1].replace("never", "did not")
+        found = self.index.query(edited, threshold=0.5)
+        self.assertEqual([key for key, _ in found], [("a.com", "2")])
+
+    def test_query_unrelated(self):
+        """Test that an unrelated text isn't found."""
+        self.assertEqual(self.index.query("Nothing to do with the others."), [])
+        self.assertEqual(self.index.query(""), [])
+
+    def test_one_text_at_a_time(self):
+        """Test that texts added one at a time give the same results."""
+        index = dedup.LSHIndex(num_perm=128, bands=32)
+
+        for text in TEXTS:
+            index.add([text])
+            self.assertEqual(index.query(text), [(len(index) - 1, 1.0)])
+
+        for text in TEXTS:
+            index.add([text])
+
+        np.testing.assert_array_equal(
+            index.signatures[: len(TEXTS)], self.index.signatures
+        )
+        self.assertEqual(
+            index.query(TEXTS[1], threshold=0.5), [(1, 1.0), (len(TEXTS) + 1, 1.0)]
+        )
+
+    def test_interleaved_updates(self):
+        """
+        Test that the queries between many updates return the same as an
+        index built at once.
+        """
+
+        rng = random.Random(0)
+        words = [f"word{number}" for number in range(30)]
+        texts = [" ".join(rng.choices(words, k=12)) for _ in range(60)]
+        # Near-duplicates of some texts, and empty texts
+        texts += [text + " again" for text in texts[::7]] + ["", ""]
+        rng.shuffle(texts)
+        built = dedup.LSHIndex(num_perm=64, bands=16)
+        built.add(texts)
+        updated = dedup.LSHIndex(num_perm=64, bands=16)
+
+        for text in texts:
+            updated.add([text])
+            updated.query(text)
+
+        np.testing.assert_array_equal(updated.signatures, built.signatures)
+
+        for text in texts:
+            with self.subTest(text=text):
+                self.assertEqual(
+                    updated.query(text, threshold=0.3), built.query(text, threshold=0.3)
+                )
+
+    def test_invalid_bands(self):
+        """Test that the bands must divide the signatures."""
+        with self.assertRaises(ValueError):
+            dedup.LSHIndex(num_perm=128, bands=10)
+
+    def test_save_and_load(self):
+        """Test that a loaded index gives the same results."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "index.npz")
+            self.index.save(path)
+            loaded = dedup.LSHIndex.load(path)
+
+        self.assertEqual(len(loaded), len(self.index))
+        self.assertEqual(loaded.query(TEXTS[3]), [(("b.com", "4"), 1.0)])
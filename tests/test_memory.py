@@ -0,0 +1,59 @@
+"""
+Tests the measures of the RSS of the process.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import unittest
+
+from fakepilot import memory
+
+
+class TestMemory(unittest.TestCase):
+    """
+    Tests the RSS while a function allocates memory and the summary of the
+    reports of several workers.
+    """
+
+    @unittest.skipIf(memory.current_rss() is None, "The RSS can't be read.")
+    def test_measure(self):
+        """Test that the peak includes the memory freed by the function."""
+        size = 64 * 2**20
+
+        def allocate():
+            """Allocate and touch ``size`` bytes, and free them."""
+            data = bytearray(size)
+            # Every page is touched, so it's resident
+            data[::4096] = b"x" * len(data[::4096])
+            return len(data)
+
+        result, report = memory.measure(allocate)
+
+        self.assertEqual(result, size)
+        self.assertGreaterEqual(report["peak_rss"], report["rss"])
+
+        if memory.reset_peak_rss():
+            self.assertGreater(report["peak_rss"] - report["rss_before"], size // 2)
+            self.assertLess(report["rss"], report["peak_rss"] - size // 2)
+
+    def test_summarize(self):
+        """Test the summary of the reports of two workers."""
+        reports = [
+            {"rss_before": 100, "peak_rss": 180, "rss": 110, "pid": 1},
+            {"rss_before": 90, "peak_rss": 150, "rss": 95, "pid": 2},
+            {"rss_before": 110, "peak_rss": 160, "rss": 105, "pid": 1},
+            {"rss_before": None, "peak_rss": None, "rss": None, "pid": 3},
+        ]
+
+        self.assertEqual(
+            memory.summarize(reports),
+            {"pages": 4, "peak_rss": 180, "page_rss": 80, "steady_rss": 105},
+        )
+        self.assertEqual(
+            memory.summarize([]),
+            {"pages": 0, "peak_rss": None, "page_rss": None, "steady_rss": None},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+"""
+Tests the imports of the optional dependencies.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import json
+import unittest
+
+from fakepilot._optional import require
+
+
+class TestOptional(unittest.TestCase):
+    """
+    Tests the error raised when an optional dependency is missing.
+    """
+
+    def test_missing(self):
+        """Test that a missing dependency tells which extra installs it."""
+        with self.assertRaisesRegex(ImportError, r"pip install fakepilot\[analytics\]"):
+            require("fakepilot_missing_module", "analytics", "fakepilot.analytics")
+
+    def test_installed(self):
+        """Test that an installed dependency is returned."""
+        self.assertIs(require("json", "analytics", "fakepilot.analytics"), json)
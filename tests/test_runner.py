@@ -0,0 +1,218 @@
+"""
+Tests the extraction of a corpus split in shards by several nodes.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from fakepilot import batch, extract_info
+from fakepilot.runner import (
+    NodeSettings,
+    ShardLock,
+    ShardRunner,
+    partition,
+    shard_of,
+)
+
+from . import CorpusTestCase
+
+
+class Crash(Exception):
+    """Simulated crash of a node."""
+
+
+class TestRunner(CorpusTestCase):
+    """
+    Tests runs of the test pages, with a missing page, in four shards.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Write the manifest and extract the test pages once."""
+        super().setUpClass()
+        cls.pages = [os.path.relpath(path, cls.temp_dir) for path in cls.paths]
+        cls.manifest = os.path.join(cls.temp_dir, "manifest.txt")
+
+        with open(cls.manifest, "w", encoding="utf-8") as file:
+            file.write("# Test pages\n\n")
+            file.write("\n".join(cls.pages + ["pages/missing.txt"]) + "\n")
+
+        cls.expected = {}
+
+        for page in cls.pages:
+            with open(os.path.join(cls.temp_dir, page), encoding="utf-8") as file:
+                cls.expected[page] = extract_info(file)
+
+    def setUp(self):
+        """Create the work directory of the test."""
+        self.work_dir = tempfile.mkdtemp(dir=self.temp_dir)
+
+    def tearDown(self):
+        """Remove the work directory."""
+        shutil.rmtree(self.work_dir)
+
+    def runner(self, node_id, lock_timeout=600):
+        """Return the runner of a node."""
+        return ShardRunner(
+            self.manifest,
+            self.work_dir,
+            4,
+            node=NodeSettings(node_id, batch_size=2, lock_timeout=lock_timeout),
+        )
+
+    def check_results(self, runner):
+        """Check that every page was extracted once."""
+        records = list(runner.results())
+
+        self.assertTrue(runner.is_complete())
+        self.assertEqual(
+            sorted(record["page"] for record in records),
+            sorted(self.pages + ["pages/missing.txt"]),
+        )
+
+        for record in records:
+            if record["page"] == "pages/missing.txt":
+                self.assertIn("FileNotFoundError", record["error"])
+            else:
+                self.assertEqual(record["company"], self.expected[record["page"]])
+
+    def test_partition(self):
+        """Test that the partition is deterministic and complete."""
+        shards = partition(self.pages, 4)
+
+        self.assertEqual(shards, partition(self.pages, 4))
+        self.assertEqual(sorted(sum(shards, [])), self.pages)
+        for shard, pages in enumerate(shards):
+            self.assertTrue(all(shard_of(page, 4) == shard for page in pages))
+
+    def test_run(self):
+        """Test that a node extracts all the shards."""
+        runner = self.runner("node-a")
+
+        self.assertEqual(sorted(runner.run()), [0, 1, 2, 3])
+        self.check_results(runner)
+        self.assertEqual(runner.run(), [])
+        self.assertFalse(
+            [name for name in os.listdir(self.work_dir) if name.endswith(".lock")]
+        )
+
+    def test_resume(self):
+        """
+        Test that a node resumes the shard of a crashed node from its last
+        checkpoint.
+        """
+
+        runner = self.runner("node-a")
+        refresh = ShardLock.refresh
+        shards = []
+
+        def crash_after_first(lock):
+            """Crash when the node finishes the second batch of a shard."""
+            shards.append(lock.path)
+            if len(shards) == 2:
+                raise Crash
+            refresh(lock)
+
+        with mock.patch.object(
+            ShardLock, "refresh", autospec=True, side_effect=crash_after_first
+        ):
+            with self.assertRaises(Crash):
+                runner.run()
+
+        shard = int(os.path.basename(shards[0]).split(".")[0].split("-")[1])
+        checkpoint = runner.checkpoint(shard)
+        self.assertEqual(checkpoint["done"], 2)
+        self.assertFalse(checkpoint["complete"])
+
+        # The node died writing a batch and left its lock
+        with open(os.path.join(self.work_dir, checkpoint["results"]), "ab") as file:
+            file.write(b'{"page": "partial')
+        with open(shards[0], "w", encoding="utf-8") as file:
+            json.dump({"owner": "node-a"}, file)
+        os.utime(shards[0], (time.time() - 60, time.time() - 60))
+
+        extracted = []
+
+        def count(file, *args, **kwargs):
+            """Count the pages extracted."""
+            extracted.append(file.name)
+            return extract_info(file, *args, **kwargs)
+
+        with mock.patch.object(batch, "extract_info", count):
+            other = self.runner("node-b", lock_timeout=30)
+            self.assertIn(shard, other.run())
+
+        self.check_results(other)
+        # The pages of the first batch aren't extracted again
+        done = partition(runner.pages, 4)[shard][:2]
+        self.assertEqual(
+            sorted(os.path.relpath(name, self.temp_dir) for name in extracted),
+            sorted(set(self.pages) - set(done)),
+        )
+        self.assertFalse(
+            [name for name in os.listdir(self.work_dir) if name.endswith(".tmp")]
+        )
+
+    def test_lost_lock(self):
+        """
+        Test that a node that lost the lock of a shard doesn't write its
+        checkpoint.
+        """
+
+        runner = self.runner("node-a", lock_timeout=30)
+        refresh = ShardLock.refresh
+        stolen = []
+
+        def steal(lock):
+            """Let another node take the lock of the first shard."""
+            if not stolen:
+                shard = int(os.path.basename(lock.path).split(".")[0].split("-")[1])
+                stolen.append((lock.path, shard, runner.checkpoint(shard)))
+                with open(lock.path, "w", encoding="utf-8") as file:
+                    json.dump({"owner": "node-b"}, file)
+            refresh(lock)
+
+        with mock.patch.object(ShardLock, "refresh", autospec=True, side_effect=steal):
+            done = runner.run()
+
+        lock_path, shard, checkpoint = stolen[0]
+
+        self.assertEqual(len(done), 3)
+        self.assertNotIn(shard, done)
+        self.assertEqual(runner.checkpoint(shard), checkpoint)
+        self.assertEqual(ShardLock(lock_path, "node-b", 30).owner_of(), "node-b")
+        self.assertFalse(
+            os.path.exists(os.path.join(self.work_dir, f"shard-{shard:05d}.jsonl"))
+        )
+
+    def test_held_lock(self):
+        """Test that a shard held by a live node is skipped."""
+        lock_path = os.path.join(self.work_dir, "shard-00001.lock")
+        self.assertTrue(ShardLock(lock_path, "node-a", 30).acquire())
+
+        runner = self.runner("node-b", lock_timeout=30)
+        self.assertEqual(sorted(runner.run()), [0, 2, 3])
+        self.assertFalse(runner.is_complete())
+        self.assertFalse(ShardLock(lock_path, "node-c", 30).acquire())
+
+        ShardLock(lock_path, "node-a", 30).release()
+        self.assertEqual(runner.run(), [1])
+        self.check_results(runner)
+
+    def test_other_manifest(self):
+        """Test that a work directory can't be used with other shards."""
+        self.runner("node-a")
+
+        with self.assertRaises(ValueError):
+            ShardRunner(self.manifest, self.work_dir, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
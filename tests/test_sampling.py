@@ -0,0 +1,155 @@
+"""
+Tests the random samples of the reviews.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import contextlib
+import copy
+import unittest
+from collections import Counter
+from unittest import mock
+
+from fakepilot import ExtractOptions, extract_info, get_reviews, xray
+from fakepilot.sampling import ReservoirSampler, StratifiedSampler, sample_pages
+from fakepilot.spec import BUILTIN_SPEC, ExtractionPlan
+
+from . import CorpusTestCase
+
+UNIFORM = ExtractOptions(sample="uniform", seed=3)
+
+
+class TestSampling(CorpusTestCase):
+    """
+    Tests the samples of the reviews of the test pages.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Parse the test pages and extract all their reviews."""
+        super().setUpClass()
+        cls.pages = []
+        cls.reviews = []
+
+        for path in cls.paths:
+            with open(path, encoding="utf-8") as file:
+                page = xray.parse_page(file)
+
+            cls.pages.append(page)
+            cls.reviews.append(get_reviews(page, 100))
+
+    def test_get_reviews(self):
+        """Test a uniform sample of the reviews of a page."""
+        page, reviews = self.pages[0], self.reviews[0]
+        sample = get_reviews(page, 5, options=UNIFORM)
+
+        self.assertEqual(len(sample), 5)
+        self.assertEqual(get_reviews(page, 5, options=UNIFORM), sample)
+        # In the order of the page
+        positions = [reviews.index(review) for review in sample]
+        self.assertEqual(positions, sorted(positions))
+        # All the reviews if there are less than the sample's size
+        self.assertEqual(
+            get_reviews(page, 100, options=ExtractOptions(sample="uniform")), reviews
+        )
+
+        with self.assertRaises(ValueError):
+            get_reviews(page, 5, options=ExtractOptions(sample="first"))
+
+    def test_extract_info(self):
+        """Test that the sampling mode is passed by extract_info."""
+        with open(self.paths[0], encoding="utf-8") as file:
+            company = extract_info(file, with_reviews=True, nreviews=5, options=UNIFORM)
+
+        self.assertEqual(
+            company["reviews"], get_reviews(self.pages[0], 5, options=UNIFORM)
+        )
+
+    def test_uniform(self):
+        """Test that every review is sampled with the same probability."""
+        page, reviews = self.pages[0], self.reviews[0]
+        index = xray.PageIndex(page)
+        ntrials = 400
+        counts = Counter()
+
+        for seed in range(ntrials):
+            sampler = ReservoirSampler(5, seed)
+            sampler.add_page(page, index)
+            counts.update(review["author_id"] for _, review in sampler.sample())
+
+        expected = ntrials * 5 / len(reviews)
+        self.assertEqual(len(counts), len(reviews))
+        for count in counts.values():
+            self.assertLess(abs(count - expected), expected / 2)
+
+    def test_only_selected_extracted(self):
+        """Test that only the sampled cards are extracted."""
+        sampler = ReservoirSampler(3, seed=1)
+
+        with mock.patch.object(
+            sampler.plan, "extract_review", wraps=sampler.plan.extract_review
+        ) as extract:
+            sampler.add_page(self.pages[0])
+
+        self.assertEqual(extract.call_count, 3)
+        self.assertEqual(sampler.seen, len(self.reviews[0]))
+
+    def test_stream(self):
+        """Test a sample of the reviews of all the pages."""
+        with contextlib.ExitStack() as stack:
+            files = [
+                stack.enter_context(open(path, encoding="utf-8")) for path in self.paths
+            ]
+            sample = sample_pages(files, 30, seed=7)
+
+        self.assertEqual(len(sample), 30)
+        sources = [source for source, _ in sample]
+        self.assertEqual(sources, sorted(sources))
+
+        for source, review in sample:
+            self.assertIn(review, self.reviews[source])
+
+    def test_stratified(self):
+        """Test a sample stratified by star rating."""
+        sampler = StratifiedSampler(4, seed=2)
+        ratings = Counter()
+
+        for source, (page, reviews) in enumerate(zip(self.pages, self.reviews)):
+            sampler.add_page(page, source=source)
+            ratings.update(int(review["star_rating"]) for review in reviews)
+
+        sampled = Counter(int(review["star_rating"]) for _, review in sampler.sample())
+        self.assertEqual(sampled, {rating: min(4, n) for rating, n in ratings.items()})
+
+        sampler = StratifiedSampler({1: 2, 5: 3}, seed=2)
+        sampler.add_page(self.pages[1])
+        sampled = Counter(int(review["star_rating"]) for _, review in sampler.sample())
+        self.assertLessEqual(sampled.keys(), {1, 5})
+        self.assertLessEqual(sampled[1], 2)
+        self.assertLessEqual(sampled[5], 3)
+
+    def test_stratified_by_plan(self):
+        """Test that the strata are the ratings read by the plan."""
+        custom = copy.deepcopy(BUILTIN_SPEC)
+        custom["reviews"]["fields"]["star_rating"]["then"] = [
+            ["sub", r"^\d", "1"],
+            "float",
+        ]
+        sampler = StratifiedSampler({1: 3}, seed=2, spec=ExtractionPlan(custom))
+        sampler.add_page(self.pages[0])
+
+        self.assertEqual(
+            [review["star_rating"] for _, review in sampler.sample()], [1.0] * 3
+        )
+        self.assertGreater(
+            sum(review["star_rating"] != 1.0 for review in self.reviews[0]), 3
+        )
+
+        with open(self.paths[0], encoding="utf-8") as file:
+            sample = sample_pages([file], {1: 3}, "stratified", seed=2, spec=custom)
+
+        self.assertEqual([review["star_rating"] for _, review in sample], [1.0] * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+"""
+Tests the inverted index of the extracted reviews.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import os
+import threading
+import unittest
+from datetime import datetime
+
+from . import CorpusTestCase
+
+try:
+    import numpy as np
+
+    from fakepilot import extract_info
+    from fakepilot.search import ReviewIndex, ReviewIndexWriter, tokenize
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, "NumPy is required")
+class TestSearch(CorpusTestCase):
+    """
+    Tests the queries on an index of the reviews of the test pages.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Extract the reviews of the test pages and index them."""
+        super().setUpClass()
+        cls.companies = []
+
+        for path in cls.paths:
+            with open(path, encoding="utf-8") as file:
+                cls.companies.append(
+                    extract_info(file, with_reviews=True, nreviews=100)
+                )
+
+        cls.reviews = [
+            (company["url"], review)
+            for company in cls.companies
+            for review in company["reviews"]
+        ]
+        cls.index_dir = os.path.join(cls.temp_dir, "index")
+
+        # Small segments, so that the queries span several of them
+        with ReviewIndexWriter(cls.index_dir, segment_size=70) as writer:
+            for company in cls.companies:
+                writer.add(company)
+
+        cls.index = ReviewIndex(cls.index_dir)
+
+    def matching(self, predicate):
+        """Return the reviews that match ``predicate`` by scanning all of them."""
+        return [
+            (url, review["author_id"])
+            for url, review in self.reviews
+            if predicate(review)
+        ]
+
+    @staticmethod
+    def keys(found):
+        """Return the company and author of the found reviews."""
+        return [(review["company"], review["author_id"]) for review in found]
+
+    def test_all_indexed(self):
+        """Test that every review is indexed and stored."""
+        self.assertEqual(len(self.index), len(self.reviews))
+        self.assertGreater(len(os.listdir(self.index_dir)), 1)
+        found = self.index.search(limit=1)[0]
+        self.assertEqual(found["date"], self.reviews[0][1]["date"])
+        self.assertEqual(found["content"], self.reviews[0][1]["content"])
+
+    def test_terms(self):
+        """Test that the reviews with all the terms are found."""
+        for query in ("pedido", "burger king", "servicio rápido", "ÉXCELENTE"):
+            terms = set(tokenize(query))
+            with self.subTest(query=query):
+                expected = self.matching(
+                    lambda review, terms=terms: (
+                        terms
+                        <= set(tokenize(review["title"]) + tokenize(review["content"]))
+                    )
+                )
+                self.assertEqual(self.keys(self.index.search(query)), expected)
+
+    def test_filters(self):
+        """Test the rating, country and date filters."""
+        date_from, date_to = datetime(2024, 1, 1), datetime(2024, 7, 1)
+        expected = self.matching(
+            lambda review: (
+                review["star_rating"] in (1.0, 2.0)
+                and review["country"] in ("ES", "DK")
+                and date_from <= review["date"] < date_to
+            )
+        )
+        found = self.index.search(
+            star_rating=[1, 2],
+            country=["ES", "DK"],
+            date_from=date_from,
+            date_to=date_to,
+        )
+        self.assertTrue(expected)
+        self.assertEqual(self.keys(found), expected)
+        self.assertEqual(
+            self.index.count(star_rating=5),
+            len(self.matching(lambda review: review["star_rating"] == 5.0)),
+        )
+
+    def test_limit_and_missing_terms(self):
+        """Test the limit of results and a query without matches."""
+        self.assertEqual(len(self.index.search(limit=75)), 75)
+        self.assertEqual(self.index.search("qwertyuiop"), [])
+        self.assertEqual(self.index.count(country="XX"), 0)
+
+    def test_refresh(self):
+        """Test that new segments are found after a refresh."""
+        index_dir = os.path.join(self.temp_dir, "refresh")
+        writer = ReviewIndexWriter(index_dir)
+        writer.add(self.companies[0])
+        writer.flush()
+        index = ReviewIndex(index_dir)
+        count = len(index)
+
+        writer.add(self.companies[1])
+        writer.close()
+        self.assertEqual(len(index), count)
+        index.refresh()
+        self.assertEqual(len(index), count + len(self.companies[1]["reviews"]))
+
+    def test_merge(self):
+        """Test that small consecutive segments are merged into one."""
+        index_dir = os.path.join(self.temp_dir, "merge")
+
+        with ReviewIndexWriter(index_dir, segment_size=10) as writer:
+            for company in self.companies[:4]:
+                writer.add(company)
+
+        index = ReviewIndex(index_dir)
+        found = index.search()
+        nsegments = len(os.listdir(index_dir))
+
+        with ReviewIndexWriter(index_dir, segment_size=10) as writer:
+            self.assertEqual(writer.merge(min_size=100), nsegments)
+            self.assertEqual(writer.merge(min_size=100), 0)
+            writer.add(self.companies[4])
+
+        # The removed segments are still read until the index is refreshed
+        self.assertEqual(index.search(), found)
+        index.refresh()
+        self.assertEqual(index.search()[: len(found)], found)
+        self.assertEqual(len(index), len(found) + len(self.companies[4]["reviews"]))
+        self.assertIn(f"segment-000000-{nsegments - 1:06d}", os.listdir(index_dir))
+
+    def test_concurrent_writers(self):
+        """Test that concurrent writers never write the same segment."""
+        index_dir = os.path.join(self.temp_dir, "concurrent")
+        barrier = threading.Barrier(4)
+
+        def write(company):
+            """Add the reviews of a company in segments of one review."""
+            writer = ReviewIndexWriter(index_dir, segment_size=1)
+            barrier.wait()
+            writer.add(company)
+
+        threads = [
+            threading.Thread(target=write, args=(company,))
+            for company in self.companies[:4]
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        index = ReviewIndex(index_dir)
+        self.assertEqual(
+            len(index),
+            sum(len(company["reviews"]) for company in self.companies[:4]),
+        )
+        self.assertEqual(len(os.listdir(index_dir)), len(index))
@@ -0,0 +1,149 @@
+"""
+Tests the cache of selectors keyed by page fingerprint.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import os
+from unittest import mock
+
+from fakepilot import ExtractOptions, extract_info, xray
+from fakepilot.selector_cache import SelectorCache
+
+from . import CorpusTestCase
+
+
+class TestSelectorCache(CorpusTestCase):
+    """
+    Tests that the cached selectors are reused without changing the results.
+    """
+
+    def extract_all(self, selector_cache=None):
+        """Extract the information of every test page."""
+        companies = []
+
+        for path in self.paths:
+            with open(path, encoding="utf-8") as file:
+                companies.append(
+                    extract_info(
+                        file,
+                        with_reviews=True,
+                        nreviews=100,
+                        options=ExtractOptions(selector_cache),
+                    )
+                )
+
+        return companies
+
+    def test_same_results(self):
+        """Test that a cold and a warm cache give the same results as no cache."""
+        expected = self.extract_all()
+        cache = SelectorCache()
+
+        self.assertEqual(self.extract_all(cache), expected)
+        self.assertEqual(cache.misses, len(cache))
+        self.assertEqual(cache.hits + cache.misses, len(self.paths))
+
+        hits, misses = cache.hits, cache.misses
+        self.assertEqual(self.extract_all(cache), expected)
+        self.assertEqual(cache.hits, hits + len(self.paths))
+        self.assertEqual(cache.misses, misses)
+
+    def test_selectors_recorded(self):
+        """Test that the selectors of the layout of a page are recorded."""
+        cache = SelectorCache()
+
+        for filename, contact in (
+            ("beautytheshop.com.txt", "styles_contactInfoElement"),
+            ("beautytheshop.com_2025.txt", "styles_itemRow"),
+        ):
+            with open(os.path.join(self.pages_dir, filename), encoding="utf-8") as file:
+                index = xray.PageIndex(xray.parse_page(file))
+
+            fingerprint = cache.fingerprint(index)
+            with open(os.path.join(self.pages_dir, filename), encoding="utf-8") as file:
+                extract_info(file, options=ExtractOptions(cache))
+
+            with self.subTest(source=filename):
+                selectors = cache.get(fingerprint)
+                self.assertEqual(selectors["contact_elements"], contact)
+                self.assertIn("claimed_label", selectors)
+
+    def index_of(self, filename):
+        """Parse and index a test page."""
+        with open(os.path.join(self.pages_dir, filename), encoding="utf-8") as file:
+            page = xray.parse_page(file)
+
+        return page, xray.PageIndex(page)
+
+    def test_shared_fingerprint(self):
+        """Test that different pages of the same layout share a fingerprint."""
+        fingerprints = {
+            filename: SelectorCache.fingerprint(self.index_of(filename)[1])
+            for filename in (
+                "beautytheshop.com.txt",
+                "djmania.es.txt",
+                "burgerking.no.txt",
+                "beautytheshop.com_2025.txt",
+                "djmania.es_2025.txt",
+                "burgerking.no_2025.txt",
+            )
+        }
+
+        self.assertEqual(len(set(fingerprints.values())), 2)
+        self.assertEqual(
+            fingerprints["beautytheshop.com.txt"], fingerprints["burgerking.no.txt"]
+        )
+        self.assertEqual(
+            fingerprints["djmania.es_2025.txt"], fingerprints["burgerking.no_2025.txt"]
+        )
+        self.assertNotEqual(
+            fingerprints["djmania.es.txt"], fingerprints["djmania.es_2025.txt"]
+        )
+
+    def test_claimed_label(self):
+        """Test that a known label isn't searched in the rest of the page."""
+        selectors = {}
+        page, index = self.index_of("djmania.es_2025.txt")
+        self.assertTrue(xray.extract_is_claimed(page, index, selectors))
+
+        page, index = self.index_of("burgerking.no_2025.txt")
+        self.assertFalse(xray.extract_is_claimed(page, index))
+
+        with mock.patch.object(page, "find", side_effect=AssertionError):
+            self.assertFalse(xray.extract_is_claimed(page, index, selectors))
+
+    def test_least_recently_used(self):
+        """Test that the least recently used fingerprint is dropped."""
+        cache = SelectorCache(maxsize=2)
+        cache.update("a", {"key": "1"})
+        cache.update("b", {"key": "2"})
+        cache.get("a")
+        cache.update("c", {"key": "3"})
+
+        self.assertEqual(len(cache), 2)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+
+        with self.assertRaises(ValueError):
+            SelectorCache(maxsize=0)
+
+    def test_save_and_load(self):
+        """Test that a saved cache is loaded with the same entries."""
+        cache = SelectorCache()
+        self.extract_all(cache)
+        path = os.path.join(self.temp_dir, "selectors.json")
+        cache.save(path)
+
+        loaded = SelectorCache(path)
+        self.assertEqual(len(loaded), len(cache))
+        self.extract_all(loaded)
+        self.assertEqual(loaded.misses, 0)
+
+    def test_miss_reported(self):
+        """Test that misses are reported to the callback."""
+        missed = []
+        cache = SelectorCache(on_miss=missed.append)
+        self.extract_all(cache)
+        self.assertEqual(len(missed), cache.misses)
+        self.assertTrue(all(fingerprint in cache for fingerprint in missed))
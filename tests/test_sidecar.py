@@ -0,0 +1,145 @@
+"""
+Tests the sidecar index of the byte ranges of the review cards.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import copy
+import os
+import shutil
+import unittest
+
+from fakepilot import ExtractOptions, extract_info
+from fakepilot.sidecar import card_ranges, load_sidecar, read_review, sidecar_path
+from fakepilot.spec import BUILTIN_SPEC
+
+from . import CorpusTestCase
+
+
+class TestSidecar(CorpusTestCase):
+    """
+    Tests that the reviews of the test pages are extracted from their cards
+    as from the whole page.
+    """
+
+    def test_read_review(self):
+        """Test that every review is extracted from its card."""
+        for path in self.paths:
+            with self.subTest(page=os.path.basename(path)):
+                with open(path, "rb") as file:
+                    company = extract_info(
+                        file,
+                        with_reviews=True,
+                        nreviews=100,
+                        options=ExtractOptions(sidecar=sidecar_path(path)),
+                    )
+
+                sidecar = load_sidecar(sidecar_path(path))
+                self.assertEqual(len(sidecar["cards"]), len(company["reviews"]))
+
+                for position, review in enumerate(company["reviews"]):
+                    self.assertEqual(
+                        read_review(path, position, sidecar=sidecar), review
+                    )
+
+                last = company["reviews"][-1]
+                self.assertEqual(read_review(path, author_id=last["author_id"]), last)
+
+    def test_spec(self):
+        """Test that a review is extracted with the fields of a spec."""
+        path = self.paths[0]
+
+        with open(path, "rb") as file:
+            company = extract_info(
+                file,
+                with_reviews=True,
+                options=ExtractOptions(sidecar=sidecar_path(path)),
+            )
+
+        spec = copy.deepcopy(BUILTIN_SPEC)
+        spec["reviews"]["fields"]["title"]["then"].append(["replace", "a", "A"])
+        review = company["reviews"][0]
+
+        self.assertEqual(
+            read_review(path, 0, spec=spec),
+            dict(review, title=review["title"].replace("a", "A")),
+        )
+
+    def test_card_ranges(self):
+        """Test the ranges of nested and mentioned cards."""
+        page = (
+            b"<html><body><script>'data-service-review-card-paper'</script>"
+            b'<div data-service-review-card-paper="true"><div>A</div>'
+            b"<div><div/></div></div>"
+            b'<article data-service-review-card-paper="true">B</article>'
+            b"</body></html>"
+        )
+        ranges = card_ranges(page)
+
+        self.assertEqual(
+            [page[start:end] for start, end in ranges],
+            [
+                b'<div data-service-review-card-paper="true"><div>A</div>'
+                b"<div><div/></div></div>",
+                b'<article data-service-review-card-paper="true">B</article>',
+            ],
+        )
+
+    def test_text_page(self):
+        """
+        Test that a page read as text, without translating its line
+        endings, has the ranges of its bytes.
+        """
+
+        path = self.paths[0]
+        sidecars = {}
+
+        with open(path, "rb") as file:
+            expected = extract_info(
+                file, options=ExtractOptions(sidecar=sidecar_path(path))
+            )
+
+        sidecars["bytes"] = load_sidecar(sidecar_path(path))
+
+        with open(path, encoding="utf-8", newline="") as file:
+            self.assertEqual(
+                extract_info(file, options=ExtractOptions(sidecar=sidecar_path(path))),
+                expected,
+            )
+
+        sidecars["file"] = load_sidecar(sidecar_path(path))
+
+        with open(path, encoding="utf-8", newline="") as file:
+            text = file.read()
+
+        self.assertEqual(
+            extract_info(text, options=ExtractOptions(sidecar=sidecar_path(path))),
+            expected,
+        )
+        sidecars["str"] = load_sidecar(sidecar_path(path))
+        os.remove(sidecar_path(path))
+
+        for source in ("file", "str"):
+            with self.subTest(source=source):
+                self.assertEqual(sidecars[source], sidecars["bytes"])
+
+    def test_errors(self):
+        """Test that a changed page is rejected."""
+        path = os.path.join(self.temp_dir, "changed.html")
+        shutil.copy(self.paths[0], path)
+
+        with open(path, "rb") as file:
+            extract_info(file, options=ExtractOptions(sidecar=sidecar_path(path)))
+
+        with open(path, "ab") as file:
+            file.write(b"\n")
+
+        with self.assertRaises(ValueError):
+            read_review(path, 0)
+
+        os.remove(path)
+        os.remove(sidecar_path(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,311 @@
+"""
+Tests the extraction of the fields described by a declarative spec.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import copy
+import json
+import os
+
+# The tests only unpickle the plans they pickle
+import pickle  # nosec B403
+import unittest
+from unittest import mock
+
+from fakepilot import ExtractOptions, extract_info, spec, xray
+from fakepilot.spec import (
+    BUILTIN_PLAN,
+    BUILTIN_SPEC,
+    ExtractionPlan,
+    get_plan,
+    load_spec,
+)
+
+from . import CorpusTestCase
+
+
+class TestSpec(CorpusTestCase):
+    """
+    Tests the plans of the built-in spec and of modified specs on the test
+    pages.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Parse and index the test pages."""
+        super().setUpClass()
+        cls.pages = {}
+
+        for path in cls.paths:
+            with open(path, encoding="utf-8") as file:
+                page = xray.parse_page(file)
+                cls.pages[os.path.basename(path)] = (page, xray.PageIndex(page))
+
+    def test_builtin_spec(self):
+        """Test that the extractors of the fields read the built-in spec's."""
+        company_extractors = {
+            "name": xray.extract_company_name,
+            "url": xray.extract_url,
+            "categories": xray.extract_categories,
+            "rating_distribution": xray.extract_percentage_stars,
+        }
+        review_extractors = {
+            "author_name": xray.extract_review_author_name,
+            "author_id": xray.extract_review_author_id,
+            "is_verified": xray.extract_is_verified,
+            "star_rating": xray.extract_review_rating,
+            "date": xray.extract_review_date,
+            "title": xray.extract_review_title,
+            "content": xray.extract_review_content,
+            "nreviews": xray.extract_number_reviews_author,
+            "country": xray.extract_authors_country,
+            "date_experience": xray.extract_date_experience,
+        }
+
+        for filename, (page, index) in self.pages.items():
+            with self.subTest(filename=filename):
+                company = BUILTIN_PLAN.extract_company(page, index)
+                self.assertEqual(xray.extract_company_info(page, index), company)
+
+                for name, extract in company_extractors.items():
+                    self.assertEqual(extract(page, index), company[name])
+
+                if company["nreviews"] is not None:
+                    self.assertEqual(
+                        xray.extract_rating_stats(page, index),
+                        (company["nreviews"], company["score"]),
+                    )
+
+                cards = BUILTIN_PLAN.review_cards(page, index)
+                self.assertEqual(xray.review_cards(page, index), cards)
+
+                for card in cards:
+                    review = BUILTIN_PLAN.extract_review(card, index)
+                    self.assertEqual(xray.extract_review_info(card, index), review)
+
+                    for name, extract in review_extractors.items():
+                        self.assertEqual(extract(card, index), review[name])
+
+    def test_some_fields(self):
+        """Test the extraction of only some fields of a review."""
+        page, index = next(iter(self.pages.values()))
+        card = BUILTIN_PLAN.review_cards(page, index)[0]
+        review = BUILTIN_PLAN.extract_review(card, index)
+
+        with mock.patch.object(
+            xray.PageIndex, "find", autospec=True, side_effect=xray.PageIndex.find
+        ) as find:
+            self.assertEqual(
+                BUILTIN_PLAN.extract_review(card, index, ["star_rating", "title"]),
+                {"star_rating": review["star_rating"], "title": review["title"]},
+            )
+
+        self.assertEqual(find.call_count, 2)
+
+        with self.assertRaises(KeyError):
+            BUILTIN_PLAN.extract_review(card, index, ["stars"])
+
+    def test_hot_swap(self):
+        """
+        Test that a spec file is loaded again when it's replaced, with a
+        renamed field and a step added to the reviews' titles.
+        """
+
+        path = os.path.join(self.temp_dir, "spec.json")
+        page_path = os.path.join(self.pages_dir, "twenix.es_2025.txt")
+
+        def extract(spec_path):
+            """Extract the page with the spec in ``spec_path``."""
+            with open(page_path, encoding="utf-8") as file:
+                return extract_info(file, True, 3, ExtractOptions(spec=spec_path))
+
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(BUILTIN_SPEC, file)
+
+        expected = extract(None)
+        self.assertEqual(extract(path), expected)
+        self.assertIs(load_spec(path), load_spec(path))
+
+        new_spec = copy.deepcopy(BUILTIN_SPEC)
+        new_spec["company"]["trustscore"] = new_spec["company"].pop("score")
+        new_spec["reviews"]["fields"]["title"]["then"].append(["replace", "a", "A"])
+
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(new_spec, file, indent=1)
+
+        company = extract(path)
+        self.assertEqual(company["trustscore"], expected["score"])
+        self.assertNotIn("score", company)
+        self.assertEqual(
+            [review["title"] for review in company["reviews"]],
+            [review["title"].replace("a", "A") for review in expected["reviews"]],
+        )
+
+    def test_deprecated_arguments(self):
+        """
+        Test that the spec passed as a keyword argument, as before the
+        extraction's options, is used with a deprecation warning.
+        """
+
+        new_spec = copy.deepcopy(BUILTIN_SPEC)
+        new_spec["company"]["trustscore"] = new_spec["company"].pop("score")
+        page_path = os.path.join(self.pages_dir, "twenix.es_2025.txt")
+
+        with open(page_path, encoding="utf-8") as file:
+            expected = extract_info(file, True, 3, ExtractOptions(spec=new_spec))
+
+        with open(page_path, encoding="utf-8") as file:
+            with self.assertWarns(DeprecationWarning):
+                self.assertEqual(extract_info(file, True, 3, spec=new_spec), expected)
+
+        with open(page_path, encoding="utf-8") as file:
+            with self.assertRaises(TypeError):
+                extract_info(file, True, 3, specs=new_spec)
+
+    def test_shared_lookups(self):
+        """Test that the lookups and extractors shared by fields are made once."""
+        calls = []
+        extract_contact_info = xray.extract_contact_info
+
+        def count(*args):
+            """Count the calls of the extractor."""
+            calls.append(args)
+            return extract_contact_info(*args)
+
+        with mock.patch.dict(spec.EXTRACTORS, contact_info=count):
+            plan = ExtractionPlan(BUILTIN_SPEC)
+
+        page, index = self.pages["sumeria.eu.txt"]
+
+        with mock.patch.object(
+            xray.PageIndex,
+            "find_all",
+            autospec=True,
+            side_effect=xray.PageIndex.find_all,
+        ) as find_all:
+            company = plan.extract_company(page, index)
+
+        self.assertEqual(company, xray.extract_company_info(page, index))
+        self.assertEqual(len(calls), 1)
+
+        # The side panel is searched once for the five rows of the rating
+        # distribution
+        side_panels = [
+            call
+            for call in find_all.call_args_list
+            if call[0][2].class_ == "styles_businessInfoSideBar"
+        ]
+        self.assertEqual(len(side_panels), 1)
+
+    def test_whitespace(self):
+        """
+        Test that the reviews' content read with its whitespace normalized is
+        the content read with the steps that replaced it.
+        """
+
+        legacy_spec = copy.deepcopy(BUILTIN_SPEC)
+        content = legacy_spec["reviews"]["fields"]["content"]
+        del content["whitespace"]
+        content["then"] = [["replace", "\n", ""], "strip"]
+        legacy = ExtractionPlan(legacy_spec)
+
+        for filename, (page, index) in self.pages.items():
+            with self.subTest(filename=filename):
+                cards = BUILTIN_PLAN.review_cards(page, index)
+                self.assertEqual(
+                    [
+                        BUILTIN_PLAN.extract_review(card, index, ["content"])
+                        for card in cards
+                    ],
+                    [legacy.extract_review(card, index, ["content"]) for card in cards],
+                )
+
+    def test_defaults(self):
+        """Test the fields whose element isn't found."""
+        page, index = self.pages["twenix.es.txt"]
+        plan = ExtractionPlan(
+            {
+                "company": {
+                    "rating": {
+                        "select": {"class": "missing"},
+                        "get": "string",
+                        "default": 0,
+                    },
+                    "tags": {
+                        "select": {"class": "missing", "all": True},
+                        "get": "string",
+                    },
+                }
+            }
+        )
+
+        self.assertEqual(plan.extract_company(page, index), {"rating": 0, "tags": []})
+        self.assertEqual(plan.review_cards(page, index), [])
+
+        plan = ExtractionPlan(
+            {"company": {"rating": {"select": {"class": "missing"}, "get": "string"}}}
+        )
+
+        with self.assertRaises(RuntimeError):
+            plan.extract_company(page, index)
+
+    def test_invalid_specs(self):
+        """Test that the invalid specs aren't compiled."""
+        field = {"select": {"class": "title_displayName"}, "get": "string"}
+        invalid = [
+            {"version": 2},
+            {"companies": {}},
+            {"company": {"name": dict(field, selector={})}},
+            {"company": {"name": dict(field, get="strings")}},
+            {"company": {"name": dict(field, then=["upper"])}},
+            {"company": {"name": dict(field, whitespace="strip")}},
+            {"company": {"name": dict(field, get="text", whitespace="trim")}},
+            {"company": {"name": dict(field, select={"id": "name"})}},
+            {"company": {"name": {"extractor": "name"}}},
+            {
+                "company": {
+                    "name": dict(
+                        field, select=[{"class": "title", "all": True}, {"class": "a"}]
+                    )
+                }
+            },
+        ]
+
+        for description in invalid:
+            with self.subTest(spec=description):
+                with self.assertRaises(ValueError):
+                    ExtractionPlan(description)
+
+    def test_compiled_once(self):
+        """Test that an equal spec isn't compiled again."""
+        new_spec = copy.deepcopy(BUILTIN_SPEC)
+        new_spec["company"]["trustscore"] = new_spec["company"].pop("score")
+
+        self.assertIs(get_plan(BUILTIN_SPEC), BUILTIN_PLAN)
+        self.assertIs(get_plan(new_spec), get_plan(copy.deepcopy(new_spec)))
+        self.assertIsNot(get_plan(new_spec), BUILTIN_PLAN)
+
+    def test_pickle(self):
+        """
+        Test that an unpickled plan is the plan of its spec in the process,
+        compiled again if there isn't one.
+        """
+
+        page, index = self.pages["burgerking.no_2025.txt"]
+        new_spec = copy.deepcopy(BUILTIN_SPEC)
+        new_spec["company"]["company_url"] = new_spec["company"].pop("url")
+        data = [pickle.dumps(ExtractionPlan(new_spec)), pickle.dumps(BUILTIN_PLAN)]
+
+        # The data was pickled above
+        plan, builtin_plan = [pickle.loads(item) for item in data]  # nosec B301
+        company = plan.extract_company(page, index)
+        company["url"] = company.pop("company_url")
+
+        self.assertIs(plan, get_plan(new_spec))
+        self.assertEqual(company, BUILTIN_PLAN.extract_company(page, index))
+        self.assertIs(builtin_plan, BUILTIN_PLAN)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Tests the storage of the extracted companies in SQLite.
+"""
+
+# SPDX-License-Identifier: MIT
+
+import os
+import unittest
+
+from fakepilot import extract_info
+from fakepilot.store import SnapshotStore
+
+from . import CorpusTestCase
+
+
+class TestSnapshotStore(CorpusTestCase):
+    """
+    Tests that the test pages are stored and loaded back unchanged.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Extract the information of the test pages. Their URL is empty, so
+        the name of the file is used.
+        """
+        super().setUpClass()
+        cls.companies = []
+
+        for path in cls.paths:
+            with open(path, encoding="utf-8") as file:
+                company = extract_info(file, with_reviews=True, nreviews=100)
+
+            company["url"] = os.path.basename(path)
+            cls.companies.append(company)
+
+    def setUp(self):
+        """Open an empty store."""
+        self.store = SnapshotStore(os.path.join(self.temp_dir, "store.sqlite"))
+
+    def tearDown(self):
+        """Close and remove the store."""
+        self.store.close()
+
+        for suffix in ("", "-wal", "-shm"):
+            path = os.path.join(self.temp_dir, "store.sqlite" + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_roundtrip(self):
+        """Test that the stored companies are equal to the extracted ones."""
+        snapshot = self.store.save(self.companies, batch_size=4)
+
+        for company in self.companies:
+            with self.subTest(url=company["url"]):
+                self.assertEqual(
+                    self.store.load_company(company["url"], snapshot), company
+                )
+
+        self.assertIsNone(self.store.load_company("missing.com"))
+
+    def test_without_reviews(self):
+        """Test that a company without reviews is loaded without them."""
+        company = dict(self.companies[0])
+        del company["reviews"]
+        self.store.save([company])
+
+        self.assertEqual(self.store.load_company(company["url"]), company)
+
+    def test_snapshots(self):
+        """Test that every run is kept in its own snapshot."""
+        first, second = self.companies[0], self.companies[-1]
+        old = self.store.create_snapshot("old")
+        self.store.save([first, second], old)
+        changed = dict(first, score=first["score"] + 1, reviews=first["reviews"][:1])
+        new = self.store.save([changed])
+
+        self.assertEqual(
+            [snapshot[0] for snapshot in self.store.snapshots()], [old, new]
+        )
+        self.assertEqual(
+            [snapshot[0] for snapshot in self.store.snapshots(second["url"])], [old]
+        )
+        self.assertEqual(self.store.load_company(first["url"]), changed)
+        self.assertEqual(self.store.load_company(first["url"], old), first)
+
+    def test_upsert(self):
+        """Test that saving a company again in a snapshot replaces it."""
+        company = self.companies[0]
+        snapshot = self.store.save([company])
+        changed = dict(company, name="Other", reviews=company["reviews"][::-1])
+        self.store.save([changed], snapshot)
+
+        self.assertEqual(len(self.store.snapshots()), 1)
+        self.assertEqual(self.store.load_company(company["url"]), changed)
+
+    def test_replaced_reviews(self):
+        """Test that saving a company again drops its reviews not in it."""
+        company = self.companies[0]
+        first, second, third = company["reviews"][:3]
+        snapshot = self.store.save([dict(company, reviews=[first, second])])
+        self.store.save([dict(company, reviews=[third])], snapshot)
+
+        self.assertEqual(self.store.load_reviews(company["url"], snapshot), [third])
+
+    def test_same_day_reviews(self):
+        """Test that two reviews of an author on the same day are both kept."""
+        company = self.companies[0]
+        first = company["reviews"][0]
+        second = dict(first, title="Second", star_rating=1)
+        company = dict(company, reviews=[first, second])
+        self.store.save([company])
+
+        self.assertEqual(self.store.load_company(company["url"]), company)
+
+    def test_repeated_company(self):
+        """Test that a company repeated in a batch is replaced by the last."""
+        company = self.companies[0]
+        first, second, third = company["reviews"][:3]
+        old = dict(company, reviews=[first, second])
+        new = dict(company, name="Other", reviews=[third])
+        self.store.save([old, new])
+
+        self.assertEqual(self.store.load_company(company["url"]), new)
+
+    def test_reviews_by_author(self):
+        """Test the reviews of an author across the stored companies."""
+        self.store.save(self.companies)
+        review = self.companies[0]["reviews"][0]
+        found = self.store.reviews_by_author(review["author_id"])
+
+        self.assertIn(
+            (self.companies[0]["url"], review["star_rating"], review["date"]),
+            [(url, rating, date) for _, url, rating, date in found],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,11 +7,13 @@ Tests the extraction of companies' attributes.
 import json
 import os
 import shutil
+import subprocess  # nosec B404
+import sys
 from datetime import datetime
 import unittest
 from pathlib import Path
 
-from fakepilot import extract_info
+from fakepilot import extract_info, xray
 
 PARSER = "lxml"
 BASE_DIR = Path(__file__).resolve().parent
@@ -167,3 +169,161 @@ class TestXray(unittest.TestCase):
                     # than extracted
                     for review in self.data[filename]["reviews"]:
                         self.assertIn(review, company["reviews"])
+
+
+class TestPageIndex(unittest.TestCase):
+    """
+    Tests the lookups made through a page index.
+    """
+
+    def setUp(self):
+        """Parse a small page and index it."""
+        self.page = xray.parse_page(
+            '<div class="styles_list__a1">'
+            '<article data-card="true"><p class="title_name__x9 other">A</p>'
+            '<span data-rating="4">4</span></article>'
+            '<article data-card="true"><p class="title_name__y7">B</p></article>'
+            "</div>"
+            '<p class="title_name__z0">C</p>'
+        )
+        self.index = xray.PageIndex(self.page)
+
+    def test_find_all_class_prefix(self):
+        """Test that elements are found by class-name prefix in document order."""
+        found = self.index.find_all(self.page, xray.Lookup(class_="title_name"))
+        self.assertEqual([tag.string for tag in found], ["A", "B", "C"])
+
+    def test_exact_class_prefix(self):
+        """Test that a prefix doesn't match a longer class name."""
+        page = xray.parse_page(
+            '<p class="title_nameLarge__x1">A</p><p class="x-title_name__x2">B</p>'
+            '<p class="title_name">C</p><p class="title_name__x3__x4">D</p>'
+        )
+        found = xray.PageIndex(page).find_all(page, xray.Lookup(class_="title_name"))
+        self.assertEqual([tag.string for tag in found], ["C", "D"])
+
+    def test_scoped_lookup(self):
+        """Test that a lookup is restricted to the descendants of the scope."""
+        title = xray.Lookup(class_="title_name")
+        rating = xray.Lookup(data_attr="data-rating")
+        cards = self.index.find_all(
+            self.page, xray.Lookup(data_attr="data-card", value="true")
+        )
+        self.assertEqual(len(cards), 2)
+        self.assertEqual(self.index.find(cards[1], title).string, "B")
+        self.assertIsNone(self.index.find(cards[1], rating))
+        self.assertEqual(self.index.find(cards[0], rating).string, "4")
+
+    def test_limit_and_name(self):
+        """Test the ``limit`` and ``name`` filters."""
+        title = xray.Lookup(class_="title_name")
+        self.assertEqual(len(self.index.find_all(self.page, title, limit=2)), 2)
+        self.assertEqual(self.index.find_all(self.page, title._replace(name="div")), [])
+        self.assertEqual(self.index.find_all(self.page, xray.Lookup("missing")), [])
+
+    def test_foreign_scope(self):
+        """Test that a tag of another tree is rejected."""
+        other = xray.parse_page('<p class="title_name__q">D</p>')
+        with self.assertRaises(ValueError):
+            self.index.find(other.p, xray.Lookup(class_="title_name"))
+
+
+class TestNodeText(unittest.TestCase):
+    """
+    Tests the text assembled from the strings of an element.
+    """
+
+    def setUp(self):
+        """Parse a review's text split by line breaks."""
+        self.page = xray.parse_page(
+            "<p> First  line\n<br/>Cafe\u0301 <!-- hidden --><b>bold</b>"
+            "<br/>\tlast\n</p><span>single</span>"
+        )
+
+    def test_default(self):
+        """Test that the strings are joined as they are."""
+        self.assertEqual(
+            xray.node_text(self.page.p), " First  line\nCafe\u0301 bold\tlast\n"
+        )
+        self.assertEqual(xray.node_text(self.page.span), "single")
+        self.assertEqual(
+            xray.node_text(self.page.p, separator="|"),
+            " First  line\n|Cafe\u0301 |bold|\tlast\n",
+        )
+
+    def test_whitespace(self):
+        """Test the whitespace modes."""
+        expected = {
+            "strip": "First  line\nCafe\u0301 bold\tlast",
+            "strip_newlines": "First  lineCafe\u0301 bold\tlast",
+            "collapse": "First line Cafe\u0301 bold last",
+        }
+
+        for whitespace, text in expected.items():
+            with self.subTest(whitespace=whitespace):
+                self.assertEqual(
+                    xray.node_text(self.page.p, whitespace=whitespace), text
+                )
+
+        single = xray.parse_page("<i>\n a\nb \n</i>").i
+        self.assertEqual(xray.node_text(single, whitespace="strip_newlines"), "ab")
+
+        with self.assertRaises(ValueError):
+            xray.node_text(self.page.p, whitespace="trim")
+
+    def test_line_breaks(self):
+        """Test that the ``<br>`` elements are kept as line breaks."""
+        self.assertEqual(
+            xray.node_text(self.page.p, whitespace="collapse", line_breaks=True),
+            "First line\n\nCafe\u0301 bold\nlast",
+        )
+
+    def test_normalize(self):
+        """Test the Unicode normalization of the text."""
+        self.assertEqual(
+            xray.node_text(self.page.p, whitespace="collapse", normalize="NFC"),
+            "First line Caf\u00e9 bold last",
+        )
+
+    def test_many_strings(self):
+        """Test a review split in thousands of strings."""
+        page = xray.parse_page(
+            '<div data-service-review-text-typography="true">'
+            + "word<br/>\n" * 5000
+            + "</div>"
+        )
+        index = xray.PageIndex(page)
+
+        self.assertEqual(xray.extract_review_content(page, index), "word" * 5000)
+        self.assertEqual(
+            xray.extract_review_content(page, index, line_breaks=True),
+            "\n".join(["word\n"] * 5000).strip(),
+        )
+
+
+class TestLazyImport(unittest.TestCase):
+    """
+    Tests that the heavy dependencies are imported on first use.
+    """
+
+    def test_import_without_bs4(self):
+        """Test that importing fakepilot doesn't import BeautifulSoup."""
+        # The command is fixed and runs the interpreter running the tests, so
+        # subprocess isn't given untrusted input
+        completed = subprocess.run(  # nosec B603
+            [
+                sys.executable,
+                "-c",
+                "import sys, fakepilot; "
+                "print('bs4' in sys.modules, 'lxml' in sys.modules)",
+            ],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        self.assertEqual(completed.stdout.split(), ["False", "False"])
+
+    def test_parser(self):
+        """Test that the parser is chosen on first use."""
+        self.assertIn(xray.PARSER, ("lxml", "html.parser"))
+        self.assertEqual(xray.get_parser(), xray.PARSER)